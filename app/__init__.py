@@ -2,23 +2,55 @@
 Инициализация Flask приложения (Application Factory Pattern)
 """
 import os
-from flask import Flask, redirect, url_for
+import time
+
+# Начало импорта пакета - для профиля запуска (STARTUP_PROFILE)
+_import_started = time.perf_counter()
+
+from flask import Flask, redirect, url_for, render_template
 
 from app.config import config
 from app.extensions import db, login_manager
+from app.database import init_database
+from app.startup import StartupProfile, init_templates, warm_up
+
+_import_seconds = time.perf_counter() - _import_started
 
 
-def create_app(config_name=None):
-    """Создает и конфигурирует Flask приложение"""
+def create_app(config_name=None, check_schema=True):
+    """
+    Создает и конфигурирует Flask приложение
+    check_schema=False пропускает проверку версии схемы (для python manage.py db ...)
+    """
     
     if config_name is None:
         config_name = os.environ.get('FLASK_ENV', 'development')
     
+    # Импорт - один раз на процесс, в профиле только первого приложения
+    global _import_seconds
+    startup = StartupProfile(_import_seconds)
+    _import_seconds = 0.0
+    
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.extensions['startup'] = startup
+    
+    # Папка instance (SQLite по умолчанию, кэш шаблонов, загруженные файлы)
+    os.makedirs(app.instance_path, exist_ok=True)
+    init_templates(app)
+    startup.mark('конфигурация')
+    
+    # Инициализируй расширения (с настройками движка БД)
+    init_database(app, db)
     
-        # Инициализируй расширения
-    db.init_app(app)
+    # Чтение с реплик (только если заданы SQLALCHEMY_REPLICA_URIS)
+    from app.replicas import init_replicas
+    init_replicas(app)
+    startup.mark('база данных')
+    
+    # Инструментирование запросов (только если включено в конфигурации)
+    from app.instrumentation import init_instrumentation
+    init_instrumentation(app, db)
     
     # Инициализируй LoginManager
     from flask_login import LoginManager
@@ -28,55 +60,104 @@ def create_app(config_name=None):
     login_manager.login_message = '⚠️ Пожалуйста, залогинься'
     login_manager.login_message_category = 'warning'
     login_manager.init_app(app)
-
     
+    # Хеширование паролей (пул процессов создается при первом входе)
+    from app.auth.passwords import init_passwords
+    init_passwords(app)
+
     # Импортируй модели
-    from app.models import User, Task, SharedTask
+    from app.models import User, Task, TaskArchive, SharedTask, UserTaskCounters, UserDailyStats, UserLatencyStats, Job, ReplicaHeartbeat
+    startup.mark('модели')
+    
+    # Регистрируй user_loader (через кэш: без SELECT users на каждом запросе)
+    from app.user_cache import init_user_cache
+    user_cache = init_user_cache(app)
     
-    # Регистрируй user_loader
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
-    
-    with app.app_context():
-        # Создай таблицы
-        db.create_all()
-        
-        # Регистрируй blueprints
-        from app.auth.routes import auth_bp
-        from app.tasks.routes import tasks_bp
-        from app.shared.routes import shared_bp
-        from app.statistics.routes import statistics_bp
-        
-        app.register_blueprint(auth_bp)
-        app.register_blueprint(tasks_bp)
-        app.register_blueprint(shared_bp)
-        app.register_blueprint(statistics_bp)
-        
-        # Главная страница
-        @app.route('/')
-        def index():
-            from flask_login import current_user
-            if current_user.is_authenticated:
-                return redirect(url_for('tasks.task_list'))
-            return redirect(url_for('auth.login'))
+        return user_cache.load(int(user_id))
+    
+    # Кэш ответов статистики
+    from app.statistics.cache import init_stats_cache
+    init_stats_cache(app)
+    
+    # Кэш общих задач по токену
+    from app.shared.cache import init_shared_cache
+    init_shared_cache(app)
+    
+    # Очередь фоновых задач (потоки стартуют с первым запросом)
+    from app.jobs.worker import init_jobs
+    init_jobs(app)
+    
+    # События для открытых вкладок (/events)
+    from app.events.hub import init_events
+    init_events(app)
+    
+    # Сброс локальных кэшей во всех процессах (serve.py) - через хаб событий
+    from app.cache import init_cache_broadcast
+    init_cache_broadcast(app)
+    startup.mark('кэши и очередь')
+    
+    # Проверь версию схемы (одна выборка; миграции - python manage.py db upgrade)
+    # Таблицы создают только миграции - без db.create_all() на каждом старте
+    if check_schema:
+        from app import migrations
+        with app.app_context():
+            try:
+                migrations.check(db.engine)
+            except migrations.PendingMigrationsError:
+                if not app.config.get('AUTO_MIGRATE'):
+                    raise
+                migrations.upgrade(db.engine)
+    startup.mark('проверка схемы')
+    
+    # Регистрируй blueprints
+    from app.auth.routes import auth_bp
+    from app.tasks.routes import tasks_bp
+    from app.shared.routes import shared_bp
+    from app.statistics.routes import statistics_bp
+    from app.jobs.routes import jobs_bp
+    from app.events.routes import events_bp
+    
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(tasks_bp)
+    app.register_blueprint(shared_bp)
+    app.register_blueprint(statistics_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(events_bp)
+    
+    # CLI команды (python manage.py ...)
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Главная страница
+    @app.route('/')
+    def index():
+        from flask_login import current_user
+        if current_user.is_authenticated:
+            return redirect(url_for('tasks.task_list'))
+        return redirect(url_for('auth.login'))
 
-        
-        # Обработка ошибок
-        @app.errorhandler(404)
-        def not_found_error(error):
-            from flask import render_template
-            return render_template('404.html'), 404
-        
-        @app.errorhandler(500)
-        def internal_error(error):
-            db.session.rollback()
-            from flask import render_template
-            return render_template('500.html'), 500
-        
-        @app.errorhandler(403)
-        def forbidden_error(error):
-            from flask import render_template
-            return render_template('403.html'), 403
     
+    # Обработка ошибок
+    @app.errorhandler(404)
+    def not_found_error(error):
+        return render_template('404.html'), 404
+    
+    @app.errorhandler(500)
+    def internal_error(error):
+        db.session.rollback()
+        return render_template('500.html'), 500
+    
+    @app.errorhandler(403)
+    def forbidden_error(error):
+        return render_template('403.html'), 403
+    startup.mark('blueprints и CLI')
+    
+    if app.config['STARTUP_WARMUP']:
+        warm_up(app)
+        startup.mark('прогрев шаблонов и мапперов')
+    
+    if app.config['STARTUP_PROFILE']:
+        startup.report()
     return app
@@ -3,7 +3,7 @@
 """
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField
-from wtforms.validators import DataRequired, Email, EqualTo, ValidationError, Length
+from wtforms.validators import DataRequired, Email, EqualTo, Length
 from app.models import User
 
 
@@ -40,14 +40,20 @@ class RegisterForm(FlaskForm):
     ])
     submit = SubmitField('Зарегистрироваться')
 
-    def validate_email(self, email):
-        """Проверка что email не зарегистрирован"""
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('Этот email уже зарегистрирован')
-
-    def validate_username(self, username):
-        """Проверка что username не занят"""
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('Это имя пользователя уже занято')
+    def validate(self, extra_validators=None):
+        """
+        Поля формы + занятость email и имени одним запросом
+        (только если сами поля корректны - иначе искать нечего)
+        """
+        valid = super().validate(extra_validators)
+        if self.email.errors or self.username.errors:
+            return valid
+        
+        taken = User.query.with_entities(User.email, User.username).filter(
+            (User.email == self.email.data) | (User.username == self.username.data)
+        ).all()
+        if any(email == self.email.data for email, _ in taken):
+            self.email.errors.append('Этот email уже зарегистрирован')
+        if any(username == self.username.data for _, username in taken):
+            self.username.errors.append('Это имя пользователя уже занято')
+        return valid and not taken
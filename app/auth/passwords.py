@@ -0,0 +1,143 @@
+"""
+Хеширование паролей вне потока запроса
+scrypt/pbkdf2 - это 50-250 мс процессора на вход; при утреннем шторме входов
+потоки сервера стояли бы в хешировании. Проверка и хеширование идут в ограниченном
+пуле процессов (PASSWORD_HASH_WORKERS), очередь к нему тоже ограничена
+(PASSWORD_HASH_MAX_PENDING): лишние входы получают 503, а не бесконечное ожидание
+
+Стоимость - PASSWORD_HASH_METHOD в конфигурации окружения (формат werkzeug,
+например scrypt:32768:8:1). Хеш со старыми параметрами пересчитывается
+при следующем успешном входе (needs_rehash)
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Очередь хеширования заполнена дольше PASSWORD_HASH_TIMEOUT"""
+
+
+# Как часто процесс пула проверяет, жив ли процесс сервера
+PARENT_CHECK_SECONDS = 1.0
+
+
+def _watch_parent(pid):
+    """
+    Инициализатор процесса пула: выйти, когда процесс сервера умер
+    (иначе после SIGKILL сервера процессы пула висят вечно - их родитель forkserver)
+    """
+    def watch():
+        while True:
+            time.sleep(PARENT_CHECK_SECONDS)
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                os._exit(0)
+    threading.Thread(target=watch, name='password-pool-parent', daemon=True).start()
+
+
+def _context():
+    # Не fork из многопоточного сервера: процессы пула - от чистого forkserver (или spawn)
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class PasswordHasher:
+    """
+    Хеширование паролей в пуле процессов
+    workers=0 - в текущем потоке (тесты). Пул создается при первом пароле
+    в каждом процессе (после fork сервера - свой)
+    """
+    
+    def __init__(self, method, workers, max_pending, timeout):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pool = None
+        self._slots = None
+        self._pid = None
+        self._prefix = None
+    
+    def _executor(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(
+                        self.workers,
+                        mp_context=_context(),
+                        initializer=_watch_parent,
+                        initargs=(os.getpid(),)
+                    )
+                    self._slots = threading.BoundedSemaphore(self.max_pending)
+                    self._pid = os.getpid()
+        return self._pool
+    
+    def _reset(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pid = None
+    
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        
+        pool = self._executor()
+        slots = self._slots
+        if not slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy('Очередь проверки паролей заполнена')
+        try:
+            return pool.submit(func, *args).result()
+        except BrokenProcessPool:
+            # Процесс пула убит (OOM и т.п.) - следующий пароль получит новый пул
+            self._reset()
+            return func(*args)
+        finally:
+            slots.release()
+    
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+    
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+    
+    @property
+    def prefix(self):
+        """
+        Метод в том виде, в каком werkzeug пишет его в хеш: короткая запись дополняется
+        параметрами по умолчанию (scrypt -> scrypt:32768:8:1, pbkdf2:sha256 ->
+        pbkdf2:sha256:600000). Один пробный хеш при первой проверке, не при старте
+        """
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._prefix
+    
+    def needs_rehash(self, stored_hash):
+        """Хеш сделан с другими параметрами (метод$соль$хеш)"""
+        return stored_hash.split('$', 1)[0] != self.prefix
+    
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown()
+        self._pid = None
+
+
+def init_passwords(app):
+    app.extensions['passwords'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    )
+
+
+def hasher():
+    return current_app.extensions['passwords']
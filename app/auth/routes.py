@@ -3,17 +3,20 @@
 """
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.exc import IntegrityError
 import traceback
 
 from app.extensions import db
-from app.models import User
+from app.models import User, UserTaskCounters
 from app.auth.forms import LoginForm, RegisterForm
+from app.auth.passwords import PasswordHasherBusy
+from app.query_budget import query_budget
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@query_budget(3)  # пользователь, пересчет хеша и повторное чтение после commit
 def login():
     """Страница входа"""
     if current_user.is_authenticated:
@@ -26,13 +29,22 @@ def login():
             user = User.query.filter_by(email=form.email.data).first()
             
             if user and user.check_password(form.password.data):
+                # Хеш со старыми параметрами - пересчитать, пока пароль известен
+                if user.password_needs_rehash():
+                    user.set_password(form.password.data)
+                    db.session.commit()
+                
                 login_user(user, remember=form.remember_me.data)
                 flash('✅ Вы успешно вошли!', 'success')
                 next_page = request.args.get('next')
                 return redirect(next_page) if next_page else redirect(url_for('tasks.task_list'))
             else:
                 flash('❌ Неправильный email или пароль', 'danger')
+        except PasswordHasherBusy:
+            flash('⏳ Сервер перегружен входами. Попробуйте через несколько секунд', 'warning')
+            return render_template('auth/login.html', form=form), 503
         except Exception as e:
+            db.session.rollback()
             print(f"Ошибка при входе: {str(e)}")
             print(traceback.format_exc())
             flash('❌ Ошибка при входе. Попробуйте ещё раз', 'danger')
@@ -41,6 +53,7 @@ def login():
 
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
+@query_budget(3)
 def register():
     """Страница регистрации"""
     if current_user.is_authenticated:
@@ -48,19 +61,8 @@ def register():
     
     form = RegisterForm()
     if form.validate_on_submit():
+        # Занятость email и имени уже проверила форма (RegisterForm.validate)
         try:
-            # Проверяем что email не существует
-            existing_user = User.query.filter_by(email=form.email.data).first()
-            if existing_user:
-                flash('❌ Этот email уже зарегистрирован', 'danger')
-                return redirect(url_for('auth.register'))
-            
-            # Проверяем что username не существует
-            existing_username = User.query.filter_by(username=form.username.data).first()
-            if existing_username:
-                flash('❌ Это имя пользователя уже занято', 'danger')
-                return redirect(url_for('auth.register'))
-            
             # Создаём нового пользователя
             user = User(
                 username=form.username.data,
@@ -73,6 +75,9 @@ def register():
             print(f"Создаём пользователя: {form.username.data} ({form.email.data})")
             
             db.session.add(user)
+            db.session.flush()
+            # Пустые счетчики сразу: первая задача и первый список их не пересобирают
+            db.session.add(UserTaskCounters(user_id=user.id))
             db.session.commit()
             
             print(f"Пользователь успешно создан!")
@@ -80,6 +85,13 @@ def register():
             flash('✅ Регистрация успешна! Теперь войдите в аккаунт', 'success')
             return redirect(url_for('auth.login'))
             
+        except IntegrityError:
+            # Между проверкой формы и commit тот же email/имя зарегистрировал другой запрос
+            db.session.rollback()
+            flash('❌ Этот email или имя пользователя уже заняты', 'danger')
+        except PasswordHasherBusy:
+            flash('⏳ Сервер перегружен. Попробуйте через несколько секунд', 'warning')
+            return render_template('auth/register.html', form=form), 503
         except Exception as e:
             db.session.rollback()
             print(f"ОШИБКА ПРИ РЕГИСТРАЦИИ: {str(e)}")
@@ -0,0 +1,166 @@
+"""
+Кэши приложения: локальный LRU с TTL и Redis-совместимый бэкенд
+Общий интерфейс: get(key), set(key, value, ttl=None), delete(key), clear()
+Значения для Redis сериализуются в JSON, поэтому кладем только простые типы
+Локальные кэши нескольких процессов (serve.py) сбрасываются вместе: delete и clear
+рассылаются через хаб событий (EVENTS_BACKEND socket или postgres)
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """
+    LRU кэш в памяти процесса с ограничением размера и временем жизни записей
+    Потокобезопасен (Werkzeug запускается с threaded=True)
+    """
+    
+    def __init__(self, max_size=1000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+
+class BroadcastCache(LocalCache):
+    """
+    LocalCache, сброс которого (delete, clear) доходит до кэша с тем же именем
+    в других процессах - иначе там отозванная ссылка или старый снимок жили бы до TTL
+    broadcast(name, key) рассылает сброс (key None - clear)
+    """
+    
+    def __init__(self, name, broadcast, max_size=1000, ttl=300):
+        super().__init__(max_size=max_size, ttl=ttl)
+        self.name = name
+        self.broadcast = broadcast
+    
+    def delete(self, key):
+        super().delete(key)
+        self.broadcast(self.name, key)
+    
+    def clear(self):
+        super().clear()
+        self.broadcast(self.name, None)
+    
+    def drop(self, key):
+        """Сброс из другого процесса (дальше не рассылается)"""
+        if key is None:
+            super().clear()
+        else:
+            super().delete(key)
+
+
+class RedisCache:
+    """
+    Кэш в Redis (или совместимом хранилище: KeyDB, Valkey, fakeredis)
+    client - объект с методами get, set(name, value, ex=...), delete
+    Размер ограничивается политикой вытеснения самого Redis (maxmemory-policy allkeys-lru)
+    """
+    
+    def __init__(self, client, prefix='mytasks:', ttl=300):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+    
+    def get(self, key):
+        raw = self.client.get(self.prefix + str(key))
+        if raw is None:
+            return None
+        return json.loads(raw)
+    
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + str(key), json.dumps(value), ex=ttl or None)
+    
+    def delete(self, key):
+        self.client.delete(self.prefix + str(key))
+    
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def make_cache(app, name, max_size, ttl):
+    """
+    Создает кэш по конфигурации приложения
+    CACHE_BACKEND = 'local' (по умолчанию) или 'redis' (нужен пакет redis и CACHE_REDIS_URL)
+    Локальный кэш при EVENTS_BACKEND, отличном от 'local', рассылает сбросы другим процессам
+    """
+    backend = app.config.get('CACHE_BACKEND', 'local')
+    if backend == 'local':
+        if app.config.get('EVENTS_BACKEND', 'local') == 'local':
+            return LocalCache(max_size=max_size, ttl=ttl)
+        
+        def broadcast(cache_name, key):
+            app.extensions['events'].broadcast('cache', {'name': cache_name, 'key': key})
+        
+        cache = BroadcastCache(name, broadcast, max_size=max_size, ttl=ttl)
+        app.extensions.setdefault('broadcast_caches', {})[name] = cache
+        return cache
+    if backend == 'redis':
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_BACKEND=redis требует пакет redis: pip install redis')
+        client = app.config.get('CACHE_REDIS_CLIENT') or redis.Redis.from_url(app.config['CACHE_REDIS_URL'])
+        return RedisCache(client, prefix=f'mytasks:{name}:', ttl=ttl)
+    raise RuntimeError(f'Неизвестный CACHE_BACKEND: {backend}')
+
+
+def init_cache_broadcast(app):
+    """
+    Принимает сбросы локальных кэшей из других процессов (после init_events)
+    Хаб начинает слушать с первым запросом процесса - до него кэш процесса пуст
+    """
+    caches = app.extensions.get('broadcast_caches')
+    if not caches:
+        return
+    
+    def receive(payload):
+        cache = caches.get(payload.get('name'))
+        if cache is not None:
+            cache.drop(payload.get('key'))
+    
+    hub = app.extensions['events']
+    hub.on('cache', receive)
+    app.before_request(hub.start)
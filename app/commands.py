@@ -0,0 +1,273 @@
+"""
+CLI команды приложения (flask <команда> или python manage.py <команда>)
+"""
+import click
+from flask.cli import AppGroup
+from app.extensions import db
+
+
+counters_cli = AppGroup('counters', help='Счетчики задач пользователей')
+db_cli = AppGroup('db', help='Миграции схемы БД')
+tasks_cli = AppGroup('tasks', help='Задачи пользователей')
+jobs_cli = AppGroup('jobs', help='Очередь фоновых задач')
+shared_cli = AppGroup('shared', help='Общие ссылки на задачи')
+
+
+def _user_ids(user_id):
+    """Список id пользователей для обработки"""
+    from app.models import User
+    if user_id is not None:
+        return [user_id]
+    return [row.id for row in db.session.query(User.id).order_by(User.id)]
+
+
+@counters_cli.command('rebuild')
+@click.option('--user', 'user_id', type=int, default=None, help='Только этот пользователь')
+@click.option('--background', is_flag=True, help='Поставить в очередь фоновых задач и выйти')
+def counters_rebuild(user_id, background):
+    """Пересобирает счетчики по таблице задач"""
+    from app.counters import rebuild_user
+    
+    if background:
+        from app.jobs.queue import enqueue
+        job = enqueue('counters.rebuild', {'user_id': user_id})
+        click.echo(f'⏳ Поставлено в очередь: задача {job.id}')
+        return
+    
+    ids = _user_ids(user_id)
+    for uid in ids:
+        rebuild_user(uid)
+        db.session.commit()
+    click.echo(f'✅ Пересобрано пользователей: {len(ids)}')
+
+
+@counters_cli.command('verify')
+@click.option('--user', 'user_id', type=int, default=None, help='Только этот пользователь')
+@click.option('--fix', is_flag=True, help='Пересобрать счетчики с расхождениями')
+def counters_verify(user_id, fix):
+    """Ищет расхождения счетчиков с таблицей задач"""
+    from app.counters import verify_user, rebuild_user
+    
+    drifted = 0
+    for uid in _user_ids(user_id):
+        problems = verify_user(uid)
+        if not problems:
+            continue
+        drifted += 1
+        click.echo(f'❌ Пользователь {uid}: ' + '; '.join(problems))
+        if fix:
+            rebuild_user(uid)
+            db.session.commit()
+    
+    if drifted and not fix:
+        raise SystemExit(1)
+    click.echo(f'✅ Проверка завершена, расхождений: {drifted}')
+
+
+@db_cli.command('upgrade')
+@click.option('--to', 'target', type=int, default=None, help='Остановиться на этой версии')
+def db_upgrade(target):
+    """Применяет непримененные миграции"""
+    from app import migrations
+    
+    applied = migrations.upgrade(db.engine, target=target, echo=click.echo)
+    with db.engine.connect() as conn:
+        version = migrations.current_version(conn)
+    click.echo(f'✅ Применено миграций: {len(applied)}, версия схемы: {version}')
+
+
+@db_cli.command('check')
+def db_check():
+    """Проверяет что все миграции применены (код выхода 1 если нет)"""
+    from app import migrations
+    
+    with db.engine.connect() as conn:
+        todo = migrations.pending(conn)
+        version = migrations.current_version(conn)
+    if todo:
+        click.echo(f'❌ Версия схемы {version}, не применены:')
+        for _, name in todo:
+            click.echo(f'  - {name}')
+        raise SystemExit(1)
+    click.echo(f'✅ Схема актуальна, версия {version}')
+
+
+@db_cli.command('generate')
+@click.argument('name')
+def db_generate(name):
+    """Создает файл новой миграции (с отличиями моделей от БД в комментариях)"""
+    from app import migrations
+    
+    with db.engine.connect() as conn:
+        notes = migrations.diff_models(conn, db.metadata)
+    path = migrations.generate(name, notes)
+    click.echo(f'📝 Создан {path}')
+    for note in notes:
+        click.echo(f'  - {note}')
+
+
+@db_cli.command('sync-replicas')
+@click.option('--every', 'interval', type=float, default=None, help='Повторять раз в N секунд (до Ctrl+C)')
+def db_sync_replicas(interval):
+    """Копирует основную SQLite БД в SQLite-реплики (локальная проверка реплик)"""
+    import time
+    from app.replicas import sync_sqlite_replicas
+    
+    while True:
+        try:
+            report = sync_sqlite_replicas()
+        except RuntimeError as e:
+            click.echo(f'❌ {e}')
+            raise SystemExit(1)
+        for path, seconds in report:
+            click.echo(f'🔁 {path}: {seconds * 1000:.1f} мс')
+        if interval is None:
+            break
+        try:
+            time.sleep(interval)
+        except KeyboardInterrupt:
+            break
+
+
+@tasks_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'user_id', type=int, required=True, help='Владелец задач')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl', 'ndjson']), default=None,
+              help='Формат файла (по умолчанию - по расширению)')
+@click.option('--chunk-size', type=int, default=None, help='Строк в одной транзакции')
+def tasks_import(path, user_id, fmt, chunk_size):
+    """Импортирует задачи из CSV / JSON Lines файла"""
+    from flask import current_app
+    from app.models import User
+    from app.tasks.importer import import_tasks, detect_format, ImportFileError
+    
+    if db.session.get(User, user_id) is None:
+        raise click.BadParameter(f'пользователь {user_id} не найден', param_hint='--user')
+    fmt = fmt or detect_format(path)
+    if fmt is None:
+        raise click.BadParameter('не удалось определить формат по расширению', param_hint='--format')
+    
+    def progress(report):
+        rate = report['imported'] / max(report['seconds'], 1e-9)
+        click.echo(f"  ... импортировано {report['imported']}, ошибок {report['failed']} ({rate:.0f} строк/с)")
+    
+    try:
+        with open(path, 'rb') as stream:
+            report = import_tasks(
+                user_id, stream, fmt,
+                chunk_size=chunk_size or current_app.config['IMPORT_CHUNK_SIZE'],
+                max_errors=current_app.config['IMPORT_MAX_ERRORS'],
+                progress=progress
+            )
+    except ImportFileError as e:
+        click.echo(f'❌ {e}')
+        raise SystemExit(1)
+    
+    for item in report['errors']:
+        messages = '; '.join(f'{field}: {", ".join(errors)}' for field, errors in item['errors'].items())
+        click.echo(f"❌ Строка {item['row']}: {messages}")
+    if report['failed'] > len(report['errors']):
+        click.echo(f"  ... и еще {report['failed'] - len(report['errors'])}")
+    click.echo(f"✅ Импортировано задач: {report['imported']}, с ошибками: {report['failed']}, "
+               f"{report['seconds']:.2f} с")
+
+
+@tasks_cli.command('archive')
+@click.option('--older-than', 'days', type=int, default=None,
+              help='Завершенные раньше стольких дней назад (по умолчанию TASKS_ARCHIVE_AFTER_DAYS)')
+@click.option('--batch-size', type=int, default=None, help='Задач в пачке (по умолчанию TASKS_ARCHIVE_BATCH_SIZE)')
+@click.option('--dry-run', is_flag=True, help='Только посчитать задачи для переноса')
+def tasks_archive(days, batch_size, dry_run):
+    """Переносит давно завершенные задачи в архив пачками"""
+    from flask import current_app
+    from app.tasks.archive import archive_completed, count_archivable
+    
+    days = current_app.config['TASKS_ARCHIVE_AFTER_DAYS'] if days is None else days
+    if dry_run:
+        click.echo(f'🔍 Задач для переноса в архив: {count_archivable(days)}')
+        return
+    
+    def progress(number, rows, seconds):
+        click.echo(f'  ... пачка {number}: перенесено {rows} за {seconds * 1000:.1f} мс')
+    
+    report = archive_completed(
+        days,
+        batch_size=batch_size or current_app.config['TASKS_ARCHIVE_BATCH_SIZE'],
+        on_batch=progress
+    )
+    click.echo(f"✅ Перенесено в архив задач: {report['archived']}, пользователей: {len(report['users'])}, "
+               f"пачек: {len(report['batches'])}, {report['seconds']:.2f} с")
+
+
+@tasks_cli.command('optimize-search')
+def tasks_optimize_search():
+    """Сливает сегменты индекса поиска (SQLite FTS5; держит блокировку записи)"""
+    import time
+    from app.tasks.search import optimize_index
+    
+    started = time.perf_counter()
+    if not optimize_index():
+        click.echo('ℹ️ Индекс поиска обслуживает сама БД (PostgreSQL), делать нечего')
+        return
+    click.echo(f'✅ Индекс поиска оптимизирован за {time.perf_counter() - started:.2f} с')
+
+
+@jobs_cli.command('worker')
+@click.option('--threads', type=int, default=None, help='Потоков (по умолчанию JOBS_WORKERS)')
+def jobs_worker(threads):
+    """Отдельный процесс-обработчик очереди (до Ctrl+C)"""
+    import time
+    from flask import current_app
+    from app.jobs.worker import make_pool
+    
+    app = current_app._get_current_object()
+    pool = make_pool(app, threads or app.config['JOBS_WORKERS'] or 1)
+    pool.ensure_started()
+    click.echo(f'👷 Обработчик очереди запущен, потоков: {pool.workers}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        click.echo('⏹️ Остановка (текущие задачи дорабатывают)...')
+        pool.stop(timeout=30)
+
+
+@jobs_cli.command('run')
+def jobs_run():
+    """Выполняет готовые задачи очереди и выходит (например, из cron)"""
+    from app.jobs.worker import run_pending
+    
+    done = run_pending(worker_id='cli')
+    click.echo(f'✅ Выполнено задач: {done}')
+
+
+@shared_cli.command('sweep')
+@click.option('--batch-size', type=int, default=None, help='Строк в пачке (по умолчанию SHARED_SWEEP_BATCH_SIZE)')
+@click.option('--dry-run', is_flag=True, help='Только посчитать истекшие ссылки')
+def shared_sweep(batch_size, dry_run):
+    """Удаляет истекшие общие ссылки пачками"""
+    from flask import current_app
+    from app.shared.sweeper import sweep_expired, count_expired
+    
+    if dry_run:
+        click.echo(f'🔍 Истекших ссылок: {count_expired()}')
+        return
+    
+    def progress(number, rows, seconds):
+        click.echo(f'  ... пачка {number}: удалено {rows} за {seconds * 1000:.1f} мс')
+    
+    report = sweep_expired(
+        batch_size=batch_size or current_app.config['SHARED_SWEEP_BATCH_SIZE'],
+        on_batch=progress
+    )
+    click.echo(f"✅ Удалено истекших ссылок: {report['deleted']}, пачек: {len(report['batches'])}, "
+               f"{report['seconds']:.2f} с")
+
+
+def register_commands(app):
+    """Регистрирует CLI команды в приложении"""
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(tasks_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(shared_cli)
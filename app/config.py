@@ -7,19 +7,140 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(basedir, "..", "instance", "app.db")}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # SQLite: PRAGMA для каждого соединения
+    # WAL - читатели не блокируют писателя, synchronous=NORMAL - fsync только на checkpoint,
+    # busy_timeout - ждать блокировку вместо ошибки "database is locked"
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'cache_size': -20000,  # ~20 МБ
+        'mmap_size': 268435456,  # 256 МБ
+        'temp_store': 'MEMORY',
+    }
+    
+    # PostgreSQL и другие серверные СУБД: пул соединений
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    
+    # Реплики только для чтения (app/replicas.py): URL через запятую. Маршруты с @read_only
+    # читают реплику, если она отстает не больше DB_REPLICA_MAX_LAG_SECONDS (по отметке
+    # replica_heartbeat, ее пишут обработчики очереди); пользователь, чьи задачи менялись,
+    # столько же секунд читает основную БД
+    SQLALCHEMY_REPLICA_URIS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    DB_REPLICA_MAX_LAG_SECONDS = int(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', 5))
+    DB_REPLICA_HEARTBEAT_SECONDS = 1
+    DB_REPLICA_CHECK_SECONDS = 1  # как часто процесс перепроверяет отставание реплики
+    
+    # Кэши: 'local' (память процесса) или 'redis' (общий для процессов, CACHE_REDIS_URL)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    
+    # Кэш пользователей для user_loader
+    USER_CACHE_SIZE = 10000
+    USER_CACHE_TTL = 300  # секунд
+    
+    # Кэш ответов статистики (JSON и отрендеренные фрагменты)
+    STATS_CACHE_SIZE = 5000
+    STATS_CACHE_TTL = 300  # секунд
+    
+    # Кэш общих задач по токену (не дольше срока действия ссылки)
+    SHARED_CACHE_SIZE = 10000
+    SHARED_CACHE_TTL = 600  # секунд
+    
+    # Чистка истекших общих ссылок обработчиками очереди (0 - выключена)
+    SHARED_SWEEP_SECONDS = int(os.environ.get('SHARED_SWEEP_SECONDS', 3600))
+    SHARED_SWEEP_BATCH_SIZE = 1000
+    
+    # Архив задач (app/tasks/archive.py): завершенные раньше TASKS_ARCHIVE_AFTER_DAYS дней
+    # назад переносятся из tasks в tasks_archive обработчиками очереди (0 - выключено)
+    TASKS_ARCHIVE_AFTER_DAYS = int(os.environ.get('TASKS_ARCHIVE_AFTER_DAYS', 180))
+    TASKS_ARCHIVE_SECONDS = int(os.environ.get('TASKS_ARCHIVE_SECONDS', 3600))
+    TASKS_ARCHIVE_BATCH_SIZE = 1000
+    
+    # Проверять бюджеты SQL-запросов маршрутов (@query_budget)
+    QUERY_BUDGET_ENFORCE = False
+    
+    # Инструментирование: Server-Timing, лог медленных запросов, /_metrics
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION', 'false').lower() == 'true'
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 100))
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+    INSTRUMENTATION_SLOWEST = 5  # сколько самых медленных SQL держать на запрос
+    
+    # Импорт задач: строк в одной транзакции, сколько ошибок строк показывать
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
+    IMPORT_MAX_ERRORS = 100
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # предел загружаемого файла
+    
+    # Файлы больше этого импортируются фоновой задачей (ответ сразу, статус - /jobs/<id>)
+    IMPORT_SYNC_MAX_BYTES = 256 * 1024
+    
+    # Фоновые задачи (app/jobs): потоков-обработчиков в процессе веб-сервера
+    # (0 - не запускать, задачи выполняет python manage.py jobs worker)
+    JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 2))
+    JOBS_POLL_SECONDS = 1.0  # как часто смотреть в очередь без notify
+    JOBS_MAX_ATTEMPTS = 3
+    JOBS_BACKOFF_SECONDS = 5  # пауза перед первым повтором, дальше вдвое больше
+    JOBS_BACKOFF_MAX_SECONDS = 600
+    JOBS_LEASE_SECONDS = 900  # 'running' без прогресса дольше - обработчик считается упавшим
+    
+    # События для открытых вкладок (/events, Server-Sent Events): доставка между процессами
+    # 'local' - один процесс, 'socket' - процессы на одной машине (unix-сокеты в
+    # EVENTS_SOCKET_DIR), 'postgres' - LISTEN/NOTIFY (несколько машин, драйвер psycopg2)
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'local')
+    EVENTS_SOCKET_DIR = os.environ.get('EVENTS_SOCKET_DIR', os.path.join(basedir, '..', 'instance', 'events'))
+    EVENTS_KEEPALIVE_SECONDS = 20  # пинг в тихом потоке
+    EVENTS_QUEUE_SIZE = 100  # событий в очереди вкладки, дальше - перечитать целиком
+    EVENTS_MAX_STREAMS = 1000  # открытых потоков на процесс (каждый занимает поток сервера)
+    
+    # Применять миграции при старте, если схема отстает (в продакшене - только проверка)
+    AUTO_MIGRATE = True
+    
+    # Пароли (app/auth/passwords.py): параметры хеша werkzeug, пул процессов для
+    # проверки и хеширования, сколько проверок может ждать пул (остальным - 503)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = 32
+    PASSWORD_HASH_TIMEOUT = 10  # секунд ждать места в очереди
+    
+    # Запуск (app/startup.py): профиль фаз в stderr, кэш байткода шаблонов,
+    # прогрев шаблонов и мапперов при старте вместо первого запроса
+    STARTUP_PROFILE = os.environ.get('STARTUP_PROFILE', 'false').lower() == 'true'
+    JINJA_BYTECODE_CACHE = True
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get(
+        'JINJA_BYTECODE_CACHE_DIR',
+        os.path.join(basedir, '..', 'instance', 'jinja_cache')
+    )
+    STARTUP_WARMUP = False
 
 class DevelopmentConfig(Config):
     """Конфигурация для разработки"""
     DEBUG = True
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:16384:8:1')
 
 class TestingConfig(Config):
     """Конфигурация для тестирования"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLITE_PRAGMAS = {}
+    SQLALCHEMY_REPLICA_URIS = []
+    QUERY_BUDGET_ENFORCE = True  # N+1 в маршрутах роняет тесты
+    JOBS_WORKERS = 0  # фоновые задачи выполняет сам тест (run_pending)
+    JINJA_BYTECODE_CACHE_DIR = None  # временная папка Jinja, не instance/
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # дешево: тесты не ждут хеширования
+    PASSWORD_HASH_WORKERS = 0
 
 class ProductionConfig(Config):
     """Конфигурация для продакшена"""
     DEBUG = False
+    AUTO_MIGRATE = False
+    STARTUP_WARMUP = True  # первый запрос каждого процесса не компилирует шаблоны
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'socket')  # serve.py - несколько процессов
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or Config.SQLALCHEMY_DATABASE_URI
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,424 @@
+"""
+Инкрементальные счетчики задач пользователя
+Обновляются в той же транзакции, что и сама задача (commit делает вызывающий код),
+поэтому страницы читают готовые числа вместо COUNT(*) по таблице tasks
+Кроме итогов и дневных сводок - гистограмма времени выполнения по дням завершения
+(для процентилей в аналитике, app/statistics/analytics.py)
+Задачи, перенесенные в архив (app/tasks/archive.py), из счетчиков не вычитаются
+"""
+import math
+from datetime import date, datetime, timedelta
+from sqlalchemy import bindparam, func, select, union_all
+from app.extensions import db
+from app.models import Task, TaskArchive, UserTaskCounters, UserDailyStats, UserLatencyStats
+from app.replicas import reading_replica, use_primary
+
+
+# Больше стольких затронутых дней - дневные сводки обновляются пачкой (импорт)
+BULK_DAYS = 8
+
+# Корзины времени выполнения: BUCKETS_PER_DOUBLING на каждое удвоение, корзина i -
+# от 2 ** (i / 4) секунд (ширина ~19%: процентиль по гистограмме точен до ~10%)
+BUCKETS_PER_DOUBLING = 4
+
+
+def latency_bucket(created_at, completed_at):
+    """Корзина гистограммы для задачи, выполненной за completed_at - created_at"""
+    seconds = (completed_at - created_at).total_seconds()
+    if seconds < 1:
+        return 0
+    return int(math.log2(seconds) * BUCKETS_PER_DOUBLING)
+
+
+def _as_date(value):
+    """func.date() в SQLite возвращает строку, в PostgreSQL - date"""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def _ensure(user_id):
+    """
+    Проверяет что счетчики пользователя уже есть
+    Если нет - строит их по таблице tasks (изменение уже видно после flush)
+    и возвращает False: применять дельту поверх не нужно
+    """
+    db.session.flush()
+    if db.session.get(UserTaskCounters, user_id) is not None:
+        return True
+    rebuild_user(user_id)
+    return False
+
+
+def _bump_totals(user_id, total=0, completed=0):
+    """Атомарно сдвигает итоговые счетчики (UPDATE ... SET x = x + d)"""
+    db.session.query(UserTaskCounters).filter_by(user_id=user_id).update({
+        UserTaskCounters.total: UserTaskCounters.total + total,
+        UserTaskCounters.completed: UserTaskCounters.completed + completed,
+        UserTaskCounters.updated_at: datetime.now(),
+    })
+
+
+def _bump_day(user_id, day, created=0, completed=0):
+    """Сдвигает дневную сводку, создавая строку дня при необходимости"""
+    updated = db.session.query(UserDailyStats).filter_by(user_id=user_id, day=day).update({
+        UserDailyStats.created: UserDailyStats.created + created,
+        UserDailyStats.completed: UserDailyStats.completed + completed,
+    })
+    if not updated:
+        db.session.add(UserDailyStats(
+            user_id=user_id,
+            day=day,
+            created=max(created, 0),
+            completed=max(completed, 0)
+        ))
+
+
+def _bump_days(user_id, days):
+    """
+    Много дней сразу (импорт истории): один SELECT существующих дней,
+    UPDATE и INSERT через executemany вместо пары запросов на каждый день
+    """
+    stats = UserDailyStats.__table__
+    existing = {
+        _as_date(day) for day, in db.session.query(UserDailyStats.day).filter(
+            UserDailyStats.user_id == user_id,
+            UserDailyStats.day.in_(list(days))
+        )
+    }
+    
+    updates = [
+        {'b_user_id': user_id, 'b_day': day, 'b_created': created, 'b_completed': completed}
+        for day, (created, completed) in days.items() if day in existing
+    ]
+    inserts = [
+        {'user_id': user_id, 'day': day, 'created': max(created, 0), 'completed': max(completed, 0)}
+        for day, (created, completed) in days.items() if day not in existing
+    ]
+    
+    conn = db.session.connection()
+    if updates:
+        conn.execute(
+            stats.update()
+            .where(stats.c.user_id == bindparam('b_user_id'), stats.c.day == bindparam('b_day'))
+            .values(
+                created=stats.c.created + bindparam('b_created'),
+                completed=stats.c.completed + bindparam('b_completed')
+            ),
+            updates
+        )
+    if inserts:
+        conn.execute(stats.insert(), inserts)
+
+
+def _bump_latency(user_id, day, bucket, completed):
+    """Сдвигает корзину гистограммы времени выполнения, создавая строку при необходимости"""
+    updated = db.session.query(UserLatencyStats).filter_by(user_id=user_id, day=day, bucket=bucket).update({
+        UserLatencyStats.completed: UserLatencyStats.completed + completed,
+    })
+    if not updated:
+        db.session.add(UserLatencyStats(user_id=user_id, day=day, bucket=bucket, completed=max(completed, 0)))
+
+
+def _bump_latencies(user_id, latency):
+    """Много корзин сразу (импорт истории) - как _bump_days"""
+    stats = UserLatencyStats.__table__
+    existing = {
+        (_as_date(day), bucket) for day, bucket in db.session.query(
+            UserLatencyStats.day, UserLatencyStats.bucket
+        ).filter(
+            UserLatencyStats.user_id == user_id,
+            UserLatencyStats.day.in_({day for day, _ in latency})
+        )
+    }
+    
+    updates = [
+        {'b_user_id': user_id, 'b_day': day, 'b_bucket': bucket, 'b_completed': completed}
+        for (day, bucket), completed in latency.items() if (day, bucket) in existing
+    ]
+    inserts = [
+        {'user_id': user_id, 'day': day, 'bucket': bucket, 'completed': max(completed, 0)}
+        for (day, bucket), completed in latency.items() if (day, bucket) not in existing
+    ]
+    
+    conn = db.session.connection()
+    if updates:
+        conn.execute(
+            stats.update()
+            .where(
+                stats.c.user_id == bindparam('b_user_id'),
+                stats.c.day == bindparam('b_day'),
+                stats.c.bucket == bindparam('b_bucket')
+            )
+            .values(completed=stats.c.completed + bindparam('b_completed')),
+            updates
+        )
+    if inserts:
+        conn.execute(stats.insert(), inserts)
+
+
+class Deltas:
+    """
+    Накопитель изменений счетчиков одного пользователя
+    Для пакетных операций: одна запись на итоги и по одной на каждый затронутый день
+    и корзину гистограммы времени выполнения
+    """
+    
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.days = {}
+        self.latency = {}
+    
+    def _day(self, day):
+        return self.days.setdefault(day, [0, 0])
+    
+    def _latency(self, created_at, completed_at, change):
+        if created_at is None:
+            return
+        key = (completed_at.date(), latency_bucket(created_at, completed_at))
+        self.latency[key] = self.latency.get(key, 0) + change
+    
+    def added(self, created_at, completed_at=None):
+        self.total += 1
+        self._day(created_at.date())[0] += 1
+        if completed_at:
+            self.completed += 1
+            self._day(completed_at.date())[1] += 1
+            self._latency(created_at, completed_at, 1)
+    
+    def removed(self, created_at, completed_at=None):
+        self.total -= 1
+        self._day(created_at.date())[0] -= 1
+        if completed_at:
+            self.completed -= 1
+            self._day(completed_at.date())[1] -= 1
+            self._latency(created_at, completed_at, -1)
+    
+    def marked_completed(self, completed_at, created_at):
+        self.completed += 1
+        self._day(completed_at.date())[1] += 1
+        self._latency(created_at, completed_at, 1)
+    
+    def marked_active(self, previous_completed_at, created_at):
+        self.completed -= 1
+        if previous_completed_at:
+            self._day(previous_completed_at.date())[1] -= 1
+            self._latency(created_at, previous_completed_at, -1)
+
+
+def apply(user_id, deltas, bulk=False):
+    """
+    Применяет накопленные изменения (после того как сами задачи изменены)
+    bulk - сразу executemany: число запросов не зависит от числа дней (импорт)
+    """
+    if not _ensure(user_id):
+        return
+    if deltas.total or deltas.completed:
+        _bump_totals(user_id, total=deltas.total, completed=deltas.completed)
+    days = {day: change for day, change in deltas.days.items() if any(change)}
+    if days and (bulk or len(days) > BULK_DAYS):
+        _bump_days(user_id, days)
+    else:
+        for day, (created, completed) in days.items():
+            _bump_day(user_id, day, created=created, completed=completed)
+    
+    latency = {key: change for key, change in deltas.latency.items() if change}
+    if latency and (bulk or len(latency) > BULK_DAYS):
+        _bump_latencies(user_id, latency)
+    else:
+        for (day, bucket), completed in latency.items():
+            _bump_latency(user_id, day, bucket, completed)
+
+
+def task_added(task):
+    """Вызывается после db.session.add(task)"""
+    db.session.flush()
+    deltas = Deltas()
+    deltas.added(task.created_at, task.completed_at if task.completed else None)
+    apply(task.user_id, deltas)
+
+
+def task_removed(task):
+    """Вызывается после db.session.delete(task)"""
+    deltas = Deltas()
+    deltas.removed(task.created_at, task.completed_at if task.completed else None)
+    apply(task.user_id, deltas)
+
+
+def task_completion_changed(task, previous_completed_at):
+    """Вызывается после смены task.completed (previous_completed_at - значение до смены)"""
+    deltas = Deltas()
+    if task.completed:
+        deltas.marked_completed(task.completed_at, task.created_at)
+    else:
+        deltas.marked_active(previous_completed_at, task.created_at)
+    apply(task.user_id, deltas)
+
+
+def _user_tasks(user_id):
+    """Задачи пользователя из tasks и архива одним подзапросом (UNION ALL)"""
+    def columns(model):
+        return select(model.id, model.completed, model.created_at, model.completed_at).where(
+            model.user_id == user_id
+        )
+    return union_all(columns(Task), columns(TaskArchive)).subquery()
+
+
+def _expected(user_id):
+    """Считает правильные значения счетчиков по задачам (tasks и архив)"""
+    tasks = _user_tasks(user_id).c
+    total, completed = db.session.query(
+        func.count(tasks.id),
+        func.coalesce(func.sum(db.case((tasks.completed == True, 1), else_=0)), 0)
+    ).one()
+
+    days = {}
+    created_rows = db.session.query(
+        func.date(tasks.created_at), func.count(tasks.id)
+    ).group_by(func.date(tasks.created_at))
+    for day, count in created_rows:
+        days.setdefault(_as_date(day), [0, 0])[0] = count
+
+    # Завершенных задач нет - выборки по завершению не нужны
+    if not completed:
+        return int(total), 0, days, {}
+
+    completed_rows = db.session.query(
+        func.date(tasks.completed_at), func.count(tasks.id)
+    ).filter(
+        tasks.completed == True,
+        tasks.completed_at.isnot(None)
+    ).group_by(func.date(tasks.completed_at))
+    for day, count in completed_rows:
+        days.setdefault(_as_date(day), [0, 0])[1] = count
+
+    # Корзина считается в Python (log2 в SQL зависит от СУБД); строки - пачками
+    latency = {}
+    latency_rows = db.session.query(tasks.created_at, tasks.completed_at).filter(
+        tasks.completed == True,
+        tasks.completed_at.isnot(None),
+        tasks.created_at.isnot(None)
+    ).yield_per(10000)
+    for created_at, completed_at in latency_rows:
+        key = (completed_at.date(), latency_bucket(created_at, completed_at))
+        latency[key] = latency.get(key, 0) + 1
+
+    return int(total), int(completed), days, latency
+
+
+def rebuild_user(user_id):
+    """Пересобирает счетчики пользователя с нуля (без commit)"""
+    total, completed, days, latency = _expected(user_id)
+
+    UserDailyStats.query.filter_by(user_id=user_id).delete()
+    UserLatencyStats.query.filter_by(user_id=user_id).delete()
+    counters = db.session.get(UserTaskCounters, user_id)
+    if counters is None:
+        counters = UserTaskCounters(user_id=user_id)
+        db.session.add(counters)
+    counters.total = total
+    counters.completed = completed
+
+    db.session.add_all([
+        UserDailyStats(user_id=user_id, day=day, created=created, completed=done)
+        for day, (created, done) in days.items()
+    ])
+    db.session.add_all([
+        UserLatencyStats(user_id=user_id, day=day, bucket=bucket, completed=count)
+        for (day, bucket), count in latency.items()
+    ])
+    db.session.flush()
+    return counters
+
+
+def verify_user(user_id):
+    """
+    Сравнивает сохраненные счетчики с задачами (tasks и архив)
+    Возвращает список расхождений (пустой - все сходится)
+    """
+    total, completed, days, latency = _expected(user_id)
+    problems = []
+
+    counters = db.session.get(UserTaskCounters, user_id)
+    if counters is None:
+        return ['нет строки счетчиков']
+    if counters.total != total:
+        problems.append(f'total: {counters.total} != {total}')
+    if counters.completed != completed:
+        problems.append(f'completed: {counters.completed} != {completed}')
+
+    stored = {
+        row.day: [row.created, row.completed]
+        for row in UserDailyStats.query.filter_by(user_id=user_id)
+    }
+    for day in sorted(set(stored) | set(days)):
+        have = stored.get(day, [0, 0])
+        want = days.get(day, [0, 0])
+        if have != want:
+            problems.append(f'{day}: {have} != {want}')
+
+    stored = {
+        (row.day, row.bucket): row.completed
+        for row in UserLatencyStats.query.filter_by(user_id=user_id)
+    }
+    for key in sorted(set(stored) | set(latency)):
+        have = stored.get(key, 0)
+        want = latency.get(key, 0)
+        if have != want:
+            problems.append(f'время выполнения {key[0]} #{key[1]}: {have} != {want}')
+
+    return problems
+
+
+def get_counters(user_id):
+    """Возвращает счетчики пользователя, при первом обращении строит их"""
+    counters = db.session.get(UserTaskCounters, user_id)
+    if counters is None and reading_replica():
+        # Реплика могла еще не получить счетчики - решает основная БД
+        use_primary()
+        counters = db.session.get(UserTaskCounters, user_id)
+    if counters is None:
+        counters = rebuild_user(user_id)
+        db.session.commit()
+    return counters
+
+
+def read_stats(user_id, first_day=None, days=0, today=None):
+    """
+    Статистика из счетчиков: итоги (total, completed, active), сегодняшние счетчики
+    (today_created, today_completed) и days - создано и завершено за каждый день
+    Две выборки по первичному ключу вместо сканирования задач
+    """
+    today = today or datetime.now().date()
+    counters = get_counters(user_id)
+
+    dates = [first_day + timedelta(days=i) for i in range(days)]
+    wanted = set(dates) | {today}
+    rows = {
+        row.day: row
+        for row in UserDailyStats.query.filter(
+            UserDailyStats.user_id == user_id,
+            UserDailyStats.day >= min(wanted),
+            UserDailyStats.day <= max(wanted)
+        )
+    }
+
+    def day_values(day):
+        row = rows.get(day)
+        return (row.created, row.completed) if row else (0, 0)
+
+    today_created, today_completed = day_values(today)
+    buckets = []
+    for day in dates:
+        created, completed = day_values(day)
+        buckets.append({'date': day, 'created': created, 'completed': completed})
+
+    return {
+        'total': counters.total,
+        'completed': counters.completed,
+        'active': counters.active,
+        'today_created': today_created,
+        'today_completed': today_completed,
+        'days': buckets,
+    }
@@ -0,0 +1,151 @@
+"""
+Настройка движка БД
+SQLite: PRAGMA при каждом новом соединении (WAL, busy_timeout и т.д.)
+PostgreSQL и другие: параметры пула соединений из конфигурации
+После fork пул соединений в дочернем процессе сбрасывается (serve.py, gunicorn --preload)
+Реплики только для чтения (SQLALCHEMY_REPLICA_URIS) - дополнительные движки replica_N,
+выбор движка для выборки - RoutingSession (см. app/replicas.py)
+"""
+import os
+import weakref
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+
+# PRAGMA, которые меняют файл БД: на реплике (открыта только на чтение) не выполняются
+WRITE_PRAGMAS = ('journal_mode', 'synchronous')
+
+
+def normalize_url(url):
+    """postgres:// (Heroku и др.) -> postgresql:// для SQLAlchemy"""
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def is_sqlite(url):
+    return url.startswith('sqlite')
+
+
+def engine_options(config, url=None):
+    """SQLALCHEMY_ENGINE_OPTIONS по конфигурации приложения (url - другой движок, например реплика)"""
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if is_sqlite(url or config['SQLALCHEMY_DATABASE_URI']):
+        return options
+    
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    return options
+
+
+def replica_keys(config):
+    """Ключи движков реплик в db.engines: replica_0, replica_1, ..."""
+    return [f'replica_{i}' for i in range(len(config.get('SQLALCHEMY_REPLICA_URIS') or ()))]
+
+
+def replica_url(url):
+    """
+    URL реплики. SQLite открывается только на чтение (file:...?mode=ro&uri=true):
+    запись на реплику - ошибка, а не тихое расхождение с основной БД
+    """
+    url = make_url(normalize_url(url))
+    if url.get_backend_name() != 'sqlite' or url.query.get('uri') or url.database in (None, '', ':memory:'):
+        return url
+    return url.set(database=f'file:{url.database}', query={**url.query, 'mode': 'ro', 'uri': 'true'})
+
+
+def replica_binds(config):
+    """
+    SQLALCHEMY_BINDS для реплик. SQLite - без пула (NullPool): файл реплики целиком
+    подменяется копией (python manage.py db sync-replicas), новое соединение
+    открывает свежую копию, а соединение из пула читало бы старую
+    """
+    binds = {}
+    for key, url in zip(replica_keys(config), config.get('SQLALCHEMY_REPLICA_URIS') or ()):
+        url = replica_url(url)
+        if url.get_backend_name() == 'sqlite':
+            binds[key] = {'url': url, 'poolclass': NullPool}
+        else:
+            binds[key] = {'url': url, **engine_options(config, url.render_as_string(hide_password=False))}
+    return binds
+
+
+class RoutingSession(Session):
+    """
+    Сессия с чтением с реплик: выборки маршрутов с @read_only идут на реплику,
+    запись (flush, UPDATE/DELETE) и все выборки после нее в том же запросе - на основную БД
+    Без реплик в конфигурации - обычная сессия Flask-SQLAlchemy
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            router = current_app.extensions.get('replicas')
+            if router is not None:
+                if getattr(clause, 'is_select', False):
+                    replica = router.engine_for_read()
+                    if replica is not None:
+                        return replica
+                else:
+                    router.wrote()
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Выполняет PRAGMA на каждом новом соединении движка SQLite"""
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+    
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def dispose_after_fork(app, db):
+    """
+    Соединения пула не переживают fork: дочерний процесс получил бы копии сокетов
+    родителя, и два процесса писали бы в одно соединение. В дочернем процессе пул
+    забывает унаследованные соединения без закрытия (dispose(close=False) - они
+    остаются рабочими у родителя) и открывает свои
+    """
+    if not hasattr(os, 'register_at_fork'):
+        return
+    
+    app_ref = weakref.ref(app)
+    
+    def after_fork():
+        app = app_ref()
+        if app is None:
+            return
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+    
+    os.register_at_fork(after_in_child=after_fork)
+
+
+def init_database(app, db):
+    """Подключает db к приложению с настройками движка"""
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    replicas = replica_binds(app.config)
+    if replicas:
+        app.config['SQLALCHEMY_BINDS'] = {**(app.config.get('SQLALCHEMY_BINDS') or {}), **replicas}
+    
+    db.init_app(app)
+    
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    read_pragmas = {name: value for name, value in pragmas.items() if name not in WRITE_PRAGMAS}
+    with app.app_context():
+        for key, engine in db.engines.items():
+            apply_sqlite_pragmas(engine, read_pragmas if key in replicas else pragmas)
+    
+    dispose_after_fork(app, db)
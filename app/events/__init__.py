@@ -0,0 +1,4 @@
+"""
+Модуль событий: изменения задач приходят в открытые вкладки потоком /events
+(Server-Sent Events) вместо перезагрузки страниц
+"""
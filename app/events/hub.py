@@ -0,0 +1,393 @@
+"""
+Публикация изменений задач в открытые вкладки пользователя
+Маршрут после commit вызывает publish_task(...), хаб процесса раскладывает событие
+по очередям подписок (/events) этого пользователя и через бэкенд - в другие процессы:
+
+    'local'     один процесс (run.py, serve.py --workers 1)
+    'socket'    процессы на одной машине (serve.py): datagram unix-сокеты в EVENTS_SOCKET_DIR
+    'postgres'  несколько машин: LISTEN/NOTIFY PostgreSQL (драйвер psycopg2)
+
+Процесс без открытых потоков /events ничего не слушает: сокет создается
+и LISTEN выполняется при первой подписке (или первом запросе, если процесс
+принимает служебные сообщения - сброс локальных кэшей, app/cache.py)
+"""
+import json
+import os
+import queue
+import select
+import socket
+import threading
+import time
+import uuid
+from flask import current_app
+from sqlalchemy import text
+
+
+# Описание задачи в событии не длиннее (NOTIFY PostgreSQL - до 8000 байт)
+DESCRIPTION_MAX_LENGTH = 500
+
+# Конец потока (сервер останавливается)
+CLOSED = object()
+
+
+def sse(event, data):
+    """Событие в формате text/event-stream (JSON в одну строку)"""
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(",", ":"))}\n\n'
+
+
+# Подписка переполнилась (вкладка не читает поток) - клиенту перечитать данные целиком
+RESYNC = sse('resync', {})
+
+
+class Subscription:
+    """Очередь готовых SSE сообщений одного потока /events"""
+    
+    def __init__(self, user_id, size):
+        self.user_id = user_id
+        self.queue = queue.Queue(size)
+    
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # Вкладка отстала: копить дальше бессмысленно, она перечитает данные
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(RESYNC)
+    
+    def get(self, timeout):
+        """Следующее сообщение или None (timeout - пора отправить keep-alive)"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventStream:
+    """
+    Тело ответа /events: итерируется, пока поток не закроют
+    close() вызывает WSGI сервер, когда клиент отключился (даже если итерация
+    еще не началась) - подписка снимается в любом случае
+    """
+    
+    def __init__(self, hub, subscription, keepalive, retry_ms=5000):
+        self.hub = hub
+        self.subscription = subscription
+        self.keepalive = keepalive
+        self.retry_ms = retry_ms
+    
+    def __iter__(self):
+        # Первый кусок сразу: заголовки уходят клиенту, EventSource открыт
+        yield f'retry: {self.retry_ms}\n: ok\n\n'
+        while True:
+            message = self.subscription.get(self.keepalive)
+            if message is CLOSED:
+                return
+            # Комментарий-пинг: прокси не закрывают тихое соединение,
+            # а запись в закрытый сокет освобождает поток отключившегося клиента
+            yield message if message is not None else ': ping\n\n'
+    
+    def close(self):
+        self.hub.unsubscribe(self.subscription)
+
+
+class LocalBackend:
+    """Один процесс: доставлять в другие процессы некому"""
+    
+    def start(self, receive):
+        pass
+    
+    def publish(self, envelope, wait=False):
+        pass
+    
+    def close(self):
+        pass
+
+
+class SocketBackend:
+    """
+    Процессы на одной машине: у каждого процесса с подписками свой datagram
+    unix-сокет в общей папке, событие отправляется во все сокеты папки
+    Сокет упавшего процесса удаляется при первой неудачной отправке
+    """
+    
+    # Сколько ждать места в очереди сокета процесса, если сообщение терять нельзя
+    WAIT_TIMEOUT = 1.0
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = None
+        self._sock = None
+        self._senders = {}
+    
+    def start(self, receive):
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.sock')
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        threading.Thread(target=self._listen, args=(self._sock, receive), name='events-socket', daemon=True).start()
+    
+    def _listen(self, sock, receive):
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                return  # сокет закрыт
+            receive(data)
+    
+    def _sender(self, wait):
+        """Неблокирующий сокет для событий, с таймаутом - для сообщений с wait"""
+        sender = self._senders.get(wait)
+        if sender is None:
+            sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sender.settimeout(self.WAIT_TIMEOUT if wait else 0)
+            self._senders[wait] = sender
+        return sender
+    
+    def publish(self, envelope, wait=False):
+        """wait - ждать места в очереди занятого процесса (сброс кэша), а не терять сообщение"""
+        sender = self._sender(wait)
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return  # подписок еще не было ни в одном процессе
+        for entry in entries:
+            if entry.path == self.path or not entry.name.endswith('.sock'):
+                continue
+            try:
+                sender.sendto(envelope, entry.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Процесс остановлен, а сокет остался
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+            except (BlockingIOError, TimeoutError):
+                # Очередь сокета полна (процесс занят): событие теряется, вкладки
+                # того процесса увидят изменения при следующем событии или перезагрузке
+                pass
+    
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+class PostgresBackend:
+    """
+    LISTEN/NOTIFY PostgreSQL: процессы на любых машинах с общей БД
+    Слушает отдельное соединение (не из пула) в своем потоке
+    """
+    
+    def __init__(self, engine, logger, channel='mytasks_events'):
+        if engine.dialect.name != 'postgresql' or engine.dialect.driver != 'psycopg2':
+            raise RuntimeError('EVENTS_BACKEND=postgres требует PostgreSQL с драйвером psycopg2')
+        self.engine = engine
+        self.logger = logger
+        self.channel = channel
+        self._stop = threading.Event()
+    
+    def start(self, receive):
+        self._stop.clear()
+        threading.Thread(target=self._listen, args=(receive,), name='events-postgres', daemon=True).start()
+    
+    def _listen(self, receive):
+        while not self._stop.is_set():
+            try:
+                raw = self.engine.raw_connection()
+                connection = raw.dbapi_connection
+                raw.detach()  # соединение живет в этом потоке, в пул не возвращается
+                connection.autocommit = True
+                connection.cursor().execute(f'LISTEN {self.channel}')
+                try:
+                    while not self._stop.is_set():
+                        if select.select([connection], [], [], 5)[0]:
+                            connection.poll()
+                            while connection.notifies:
+                                receive(connection.notifies.pop(0).payload.encode('utf-8'))
+                finally:
+                    connection.close()
+            except Exception:
+                # БД перезапускается и т.п.: события за это время теряются, вкладки догонят
+                self.logger.exception('Поток LISTEN событий упал, переподключение')
+                time.sleep(1)
+    
+    def publish(self, envelope, wait=False):
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT pg_notify(:channel, :payload)'),
+                               {'channel': self.channel, 'payload': envelope.decode('utf-8')})
+            connection.commit()
+    
+    def close(self):
+        self._stop.set()
+
+
+class EventHub:
+    """
+    Подписки процесса по пользователям и рассылка событий
+    Бэкенд запускается при первой подписке в процессе (после fork - заново)
+    """
+    
+    def __init__(self, backend, logger, queue_size=100, max_streams=1000):
+        self.backend = backend
+        self.logger = logger
+        self.queue_size = queue_size
+        self.max_streams = max_streams
+        self._subscriptions = {}  # user_id -> set подписок
+        self._handlers = {}  # канал служебных сообщений -> обработчик
+        self._count = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._origin = None
+        self.closed = False
+    
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        self._origin = uuid.uuid4().hex
+        self.backend.start(self._receive)
+        self._pid = os.getpid()
+    
+    def start(self):
+        """Слушать другие процессы уже сейчас (до первой подписки) - для служебных каналов"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if not self.closed:
+                self._ensure_started()
+    
+    def on(self, channel, handler):
+        """handler(payload) получает служебные сообщения канала из других процессов"""
+        self._handlers[channel] = handler
+    
+    def broadcast(self, channel, payload):
+        """
+        Служебное сообщение другим процессам (сброс кэшей): в отличие от событий
+        вкладок при полной очереди получателя отправка ждет, а не теряет его
+        """
+        envelope = json.dumps({'o': self._origin, 'c': channel, 'p': payload}, ensure_ascii=False)
+        try:
+            self.backend.publish(envelope.encode('utf-8'), wait=True)
+        except Exception:
+            self.logger.exception('Не удалось разослать сообщение %s', channel)
+    
+    def subscribe(self, user_id):
+        """Новая подписка; None - процесс остановлен или потоков уже max_streams"""
+        with self._lock:
+            if self.closed or self._count >= self.max_streams:
+                return None
+            self._ensure_started()
+            subscription = Subscription(user_id, self.queue_size)
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+            self._count -= 1
+    
+    @property
+    def streams(self):
+        return self._count
+    
+    def publish(self, user_id, event, data):
+        """Событие во вкладки пользователя во всех процессах"""
+        message = sse(event, data)
+        self._deliver(user_id, message)
+        envelope = json.dumps({'o': self._origin, 'u': user_id, 'm': message}, ensure_ascii=False)
+        try:
+            self.backend.publish(envelope.encode('utf-8'))
+        except Exception:
+            # Изменение уже сохранено: без события вкладки просто увидят его позже
+            self.logger.exception('Не удалось разослать событие %s', event)
+    
+    def _deliver(self, user_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+    
+    def _receive(self, data):
+        """Событие из другого процесса (свои через бэкенд не доставляются второй раз)"""
+        try:
+            envelope = json.loads(data)
+        except ValueError:
+            return
+        if envelope.get('o') == self._origin:
+            return
+        if 'c' in envelope:
+            handler = self._handlers.get(envelope['c'])
+            if handler is not None:
+                handler(envelope['p'])
+        else:
+            self._deliver(envelope['u'], envelope['m'])
+    
+    def close(self):
+        """Завершает все потоки процесса (остановка сервера не ждет открытые вкладки)"""
+        with self._lock:
+            self.closed = True
+            subscriptions = [s for group in self._subscriptions.values() for s in group]
+        for subscription in subscriptions:
+            subscription.queue.put(CLOSED)
+        self.backend.close()
+
+
+def make_backend(app):
+    """Бэкенд доставки между процессами по EVENTS_BACKEND"""
+    backend = app.config.get('EVENTS_BACKEND', 'local')
+    if backend == 'local':
+        return LocalBackend()
+    if backend == 'socket':
+        if not hasattr(socket, 'AF_UNIX'):
+            # Windows: serve.py все равно работает одним процессом
+            return LocalBackend()
+        return SocketBackend(app.config['EVENTS_SOCKET_DIR'])
+    if backend == 'postgres':
+        from app.extensions import db
+        with app.app_context():
+            return PostgresBackend(db.engine, app.logger)
+    raise RuntimeError(f'Неизвестный EVENTS_BACKEND: {backend}')
+
+
+def init_events(app):
+    app.extensions['events'] = EventHub(
+        make_backend(app),
+        app.logger,
+        queue_size=app.config['EVENTS_QUEUE_SIZE'],
+        max_streams=app.config['EVENTS_MAX_STREAMS'],
+    )
+
+
+def hub():
+    return current_app.extensions['events']
+
+
+def publish_task(user_id, op, task=None, counters=None):
+    """
+    Изменение задачи (вызывать после commit)
+    op: created, updated, toggled, deleted (task - данные задачи, для deleted - {'id': ...}),
+    bulk - много задач сразу (пакет, импорт), вкладки перечитывают список.
+    counters - UserTaskCounters, если итоги изменились
+    """
+    data = {'op': op}
+    if task is not None:
+        if task.get('description') and len(task['description']) > DESCRIPTION_MAX_LENGTH:
+            task = dict(task, description=task['description'][:DESCRIPTION_MAX_LENGTH])
+        data['task'] = task
+    if counters is not None:
+        data['counters'] = {'total': counters.total, 'completed': counters.completed, 'active': counters.active}
+    hub().publish(user_id, 'task', data)
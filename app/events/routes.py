@@ -0,0 +1,44 @@
+"""
+Поток событий пользователя (Server-Sent Events)
+"""
+from flask import Blueprint, Response, current_app
+from flask_login import login_required, current_user
+from app.events.hub import EventStream, hub
+
+
+# Создай blueprint
+events_bp = Blueprint('events', __name__)
+
+# Через сколько переподключаться, если поток сейчас не открыть
+RETRY_STOPPING_MS = 1000  # процесс останавливается (перезагрузка) - к следующему процессу
+RETRY_BUSY_MS = 60000  # у процесса уже EVENTS_MAX_STREAMS потоков
+
+
+
+def _event_stream_response(body):
+    response = Response(body, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: не буферизовать поток
+    return response
+
+
+
+@events_bp.route('/events')
+@login_required
+def stream():
+    """
+    Изменения задач текущего пользователя, пока вкладка открыта
+    Поток не держит соединение с БД: сессия закрывается до первого события
+    """
+    
+    events = hub()
+    subscription = events.subscribe(current_user.id)
+    if subscription is None:
+        # Не ошибка (после нее EventSource не переподключается): пустой поток
+        # с паузой до повторной попытки
+        retry = RETRY_STOPPING_MS if events.closed else RETRY_BUSY_MS
+        return _event_stream_response(f'retry: {retry}\n\n')
+    
+    return _event_stream_response(
+        EventStream(events, subscription, keepalive=current_app.config['EVENTS_KEEPALIVE_SECONDS'])
+    )
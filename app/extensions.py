@@ -3,9 +3,10 @@
 SQLAlchemy для работы с БД, LoginManager для авторизации
 """
 from flask_sqlalchemy import SQLAlchemy
+from app.database import RoutingSession
 
-# Инициализируем SQLAlchemy
-db = SQLAlchemy()
+# Инициализируем SQLAlchemy (сессия умеет читать с реплик, см. app/replicas.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # LoginManager будет инициализирован позже в __init__.py
 login_manager = None
@@ -0,0 +1,237 @@
+"""
+Инструментирование запросов (включается INSTRUMENTATION=true)
+Для каждого HTTP-запроса считает SQL-запросы, время в БД, время рендеринга шаблонов
+и самые медленные выражения; отдает заголовок Server-Timing, пишет медленные
+запросы в лог и публикует гистограммы по blueprint на /_metrics (формат Prometheus)
+
+Выключено - ни один обработчик не регистрируется, накладных расходов нет
+Метрики живут в памяти процесса: при нескольких воркерах у каждого свои
+"""
+import heapq
+import threading
+import time
+from contextvars import ContextVar
+from flask import request, g, Response, before_render_template, template_rendered
+from sqlalchemy import event
+
+
+# Границы корзин гистограмм, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Состояние текущего запроса (None - запрос не измеряется)
+_current = ContextVar('instrumentation_request', default=None)
+
+
+class Histogram:
+    """Гистограмма Prometheus с меткой blueprint"""
+
+    def __init__(self, name, help_text, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label, value):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series['counts']):
+                    lines.append(f'{self.name}_bucket{{blueprint="{label}",le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{blueprint="{label}",le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{blueprint="{label}"}} {series["sum"]:.6f}')
+                lines.append(f'{self.name}_count{{blueprint="{label}"}} {series["count"]}')
+        return lines
+
+
+class Counter:
+    """Счетчик Prometheus с меткой blueprint"""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label, value=1):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{{blueprint="{label}"}} {value}')
+        return lines
+
+
+class Metrics:
+    """Все метрики приложения"""
+
+    def __init__(self):
+        self.request_duration = Histogram('todo_request_duration_seconds', 'Время обработки запроса')
+        self.db_duration = Histogram('todo_db_duration_seconds', 'Время в БД за запрос')
+        self.template_duration = Histogram('todo_template_duration_seconds', 'Время рендеринга шаблонов за запрос')
+        self.queries = Counter('todo_db_queries_total', 'Выполнено SQL-запросов')
+        self.slow_queries = Counter('todo_db_slow_queries_total', 'SQL-запросов дольше SLOW_QUERY_MS')
+
+    def render(self):
+        lines = []
+        for metric in (self.request_duration, self.db_duration, self.template_duration,
+                       self.queries, self.slow_queries):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _new_state():
+    return {'queries': 0, 'slow': 0, 'db': 0.0, 'template': 0.0, 'template_depth': 0, 'slowest': []}
+
+
+def _short(statement):
+    return ' '.join(statement.split())[:200]
+
+
+def _listen_engine(engine, keep, slow_query):
+    """Время каждого SQL-выражения текущего запроса (через conn.info)"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault('instrumentation_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        state = _current.get()
+        started = conn.info.get('instrumentation_started')
+        if state is None or not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        state['queries'] += 1
+        state['db'] += elapsed
+        if elapsed >= slow_query:
+            state['slow'] += 1
+        # Держим только keep самых медленных (min-куча)
+        item = (elapsed, state['queries'], statement)
+        if len(state['slowest']) < keep:
+            heapq.heappush(state['slowest'], item)
+        elif elapsed > state['slowest'][0][0]:
+            heapq.heapreplace(state['slowest'], item)
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        # after_cursor_execute не будет - не оставляем чужое время начала в соединении
+        if context.connection is not None:
+            context.connection.info.pop('instrumentation_started', None)
+
+
+def _listen_templates(app):
+    """Время рендеринга шаблонов (вложенные шаблоны не считаются дважды)"""
+
+    def started(sender, template, context, **extra):
+        state = _current.get()
+        if state is None:
+            return
+        if state['template_depth'] == 0:
+            state['template_started'] = time.perf_counter()
+        state['template_depth'] += 1
+
+    def finished(sender, template, context, **extra):
+        state = _current.get()
+        if state is None or not state['template_depth']:
+            return
+        state['template_depth'] -= 1
+        if state['template_depth'] == 0:
+            state['template'] += time.perf_counter() - state['template_started']
+
+    before_render_template.connect(started, app, weak=False)
+    template_rendered.connect(finished, app, weak=False)
+
+
+def server_timing(state, total):
+    """Значение заголовка Server-Timing (миллисекунды)"""
+    return ', '.join([
+        f'db;dur={state["db"] * 1000:.1f};desc="{state["queries"]} queries"',
+        f'tpl;dur={state["template"] * 1000:.1f}',
+        f'app;dur={total * 1000:.1f}',
+    ])
+
+
+def init_instrumentation(app, db):
+    """Подключает инструментирование, если INSTRUMENTATION_ENABLED"""
+    if not app.config.get('INSTRUMENTATION_ENABLED'):
+        return None
+
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    slow_query = app.config['SLOW_QUERY_MS'] / 1000
+    slow_request = app.config['SLOW_REQUEST_MS'] / 1000
+    keep = app.config['INSTRUMENTATION_SLOWEST']
+
+    with app.app_context():
+        for engine in db.engines.values():
+            _listen_engine(engine, keep, slow_query)
+    _listen_templates(app)
+
+    @app.before_request
+    def start_measuring():
+        if request.endpoint == 'metrics':
+            return
+        g.instrumentation_token = _current.set(_new_state())
+        g.instrumentation_started = time.perf_counter()
+
+    @app.after_request
+    def finish_measuring(response):
+        state = _current.get()
+        if state is None:
+            return response
+        total = time.perf_counter() - g.instrumentation_started
+        blueprint = request.blueprint or 'app'
+
+        metrics.request_duration.observe(blueprint, total)
+        metrics.db_duration.observe(blueprint, state['db'])
+        metrics.template_duration.observe(blueprint, state['template'])
+        metrics.queries.inc(blueprint, state['queries'])
+
+        response.headers['Server-Timing'] = server_timing(state, total)
+
+        if state['slow']:
+            metrics.slow_queries.inc(blueprint, state['slow'])
+        # В лог - только самые медленные (не больше INSTRUMENTATION_SLOWEST)
+        slow = [item for item in state['slowest'] if item[0] >= slow_query]
+        if slow:
+            for elapsed, number, statement in sorted(slow, reverse=True):
+                app.logger.warning(
+                    'Медленный SQL %.1f мс (%s %s, #%d): %s',
+                    elapsed * 1000, request.method, request.path, number, _short(statement)
+                )
+        if total >= slow_request:
+            app.logger.warning(
+                'Медленный запрос %.1f мс: %s %s (%d SQL, БД %.1f мс, шаблоны %.1f мс)',
+                total * 1000, request.method, request.path,
+                state['queries'], state['db'] * 1000, state['template'] * 1000
+            )
+        return response
+
+    @app.teardown_request
+    def stop_measuring(error=None):
+        token = g.pop('instrumentation_token', None)
+        if token is not None:
+            _current.reset(token)
+
+    @app.route('/_metrics', endpoint='metrics')
+    def metrics_endpoint():
+        """Метрики в текстовом формате Prometheus"""
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    return metrics
@@ -0,0 +1,3 @@
+"""
+Модуль фоновых задач (очередь в БД и обработчики в потоках)
+"""
@@ -0,0 +1,52 @@
+"""
+Обработчики фоновых задач (регистрируются при init_jobs)
+"""
+import os
+from app.extensions import db
+from app.jobs.queue import job, PermanentJobError
+
+
+@job('tasks.import', max_attempts=1)
+def import_file(ctx, path, fmt):
+    """
+    Импорт загруженного файла (app/tasks/importer.py)
+    Без повторов: пачки до ошибки уже сохранены, повтор задвоил бы задачи
+    """
+    from flask import current_app
+    from app.tasks.importer import import_tasks, ImportFileError
+
+    try:
+        with open(path, 'rb') as stream:
+            return import_tasks(
+                ctx.user_id,
+                stream,
+                fmt,
+                chunk_size=current_app.config['IMPORT_CHUNK_SIZE'],
+                max_errors=current_app.config['IMPORT_MAX_ERRORS'],
+                progress=ctx.progress
+            )
+    except ImportFileError as e:
+        raise PermanentJobError(str(e))
+    except FileNotFoundError:
+        raise PermanentJobError('Загруженный файл не найден')
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@job('counters.rebuild')
+def rebuild_counters(ctx, user_id=None):
+    """Пересборка счетчиков пользователя (или всех) по таблице задач"""
+    from app.models import User
+    from app.counters import rebuild_user
+    from app.statistics.cache import tasks_changed
+
+    if user_id is None:
+        ids = [row.id for row in db.session.query(User.id).order_by(User.id)]
+    else:
+        ids = [user_id]
+    for uid in ids:
+        rebuild_user(uid)
+        db.session.commit()
+        tasks_changed(uid)
+    return {'users': len(ids)}
@@ -0,0 +1,196 @@
+"""
+Очередь фоновых задач в таблице jobs
+Маршрут ставит задачу (enqueue) и сразу отвечает 202, обработчики в потоках
+(app/jobs/worker.py) забирают задачи из БД, повторяют упавшие с нарастающей паузой
+Без внешнего брокера: очередь - обычная таблица, поэтому задачи переживают перезапуск
+
+    @job('tasks.import', max_attempts=1)
+    def import_file(ctx, path, fmt):
+        ...
+        ctx.progress({'imported': 5000})
+        return {'imported': 10000}
+
+    enqueue('tasks.import', {'path': path, 'fmt': 'csv'}, user_id=user_id)
+"""
+import json
+import random
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app, jsonify, url_for
+from app.extensions import db
+from app.models import Job
+
+
+# Обработчики по имени задачи: name -> (функция, max_attempts или None)
+HANDLERS = {}
+
+# Текст ошибки в таблице не длиннее (traceback целиком - в лог)
+MAX_ERROR_LENGTH = 2000
+
+
+class PermanentJobError(Exception):
+    """Ошибка, при которой повтор бессмысленен (плохой файл, нет пользователя)"""
+
+
+def job(name, max_attempts=None):
+    """Регистрирует обработчик задачи: handler(ctx, **payload) -> результат (JSON)"""
+    def decorator(handler):
+        HANDLERS[name] = (handler, max_attempts)
+        return handler
+    return decorator
+
+
+def enqueue(name, payload=None, user_id=None, delay=0, max_attempts=None):
+    """
+    Ставит задачу в очередь и фиксирует ее (commit): после возврата задача
+    не потеряется, даже если процесс сразу упадет
+    """
+    if name not in HANDLERS:
+        raise KeyError(f'Неизвестная фоновая задача: {name}')
+
+    _, handler_attempts = HANDLERS[name]
+    new_job = Job(
+        name=name,
+        payload=json.dumps(payload or {}, ensure_ascii=False),
+        user_id=user_id,
+        status='queued',
+        attempts=0,
+        max_attempts=max_attempts or handler_attempts or current_app.config['JOBS_MAX_ATTEMPTS'],
+        run_at=datetime.now() + timedelta(seconds=delay),
+    )
+    db.session.add(new_job)
+    db.session.commit()
+
+    # Разбудить обработчики этого процесса, не дожидаясь опроса
+    pool = current_app.extensions.get('jobs')
+    if pool is not None:
+        pool.notify()
+    return new_job
+
+
+def accepted(queued_job):
+    """Ответ 202 Accepted: статус задачи и где его опрашивать"""
+    response = jsonify(queued_job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = url_for('jobs.job_status', job_id=queued_job.id)
+    return response
+
+
+def backoff(attempt):
+    """Пауза перед повтором: base * 2^(попытка-1), не больше максимума, +-25% разброса"""
+    config = current_app.config
+    delay = min(config['JOBS_BACKOFF_SECONDS'] * 2 ** (attempt - 1), config['JOBS_BACKOFF_MAX_SECONDS'])
+    return delay * random.uniform(0.75, 1.25)
+
+
+def claim(worker_id):
+    """
+    Забирает одну готовую задачу: id или None, если очередь пуста
+    Условный UPDATE (status = 'queued') атомарен - из нескольких потоков
+    и процессов задачу получит ровно один
+    """
+    while True:
+        now = datetime.now()
+        job_id = db.session.query(Job.id).filter(
+            Job.status == 'queued',
+            Job.run_at <= now
+        ).order_by(Job.run_at, Job.id).limit(1).scalar()
+        if job_id is None:
+            db.session.commit()
+            return None
+
+        claimed = db.session.query(Job).filter(Job.id == job_id, Job.status == 'queued').update({
+            Job.status: 'running',
+            Job.attempts: Job.attempts + 1,
+            Job.locked_by: worker_id,
+            Job.locked_at: now,
+            Job.started_at: now,
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return job_id
+
+
+class JobContext:
+    """Передается обработчику: номер попытки и запись прогресса"""
+
+    def __init__(self, job_row):
+        self.job_id = job_row.id
+        self.user_id = job_row.user_id
+        self.attempt = job_row.attempts
+
+    def progress(self, data):
+        """Промежуточный результат (виден в /jobs/<id>), заодно продлевает аренду задачи"""
+        db.session.query(Job).filter_by(id=self.job_id).update({
+            Job.result: json.dumps(data, ensure_ascii=False, default=str),
+            Job.locked_at: datetime.now(),
+        }, synchronize_session=False)
+        db.session.commit()
+
+
+def run(job_id):
+    """Выполняет забранную задачу (внутри app context) и записывает итог"""
+    job_row = db.session.get(Job, job_id)
+    handler, _ = HANDLERS.get(job_row.name, (None, None))
+
+    try:
+        if handler is None:
+            raise PermanentJobError(f'Нет обработчика для {job_row.name}')
+        result = handler(JobContext(job_row), **json.loads(job_row.payload))
+    except Exception as e:
+        db.session.rollback()
+        _failed(job_id, e)
+        return False
+
+    db.session.query(Job).filter_by(id=job_id).update({
+        Job.status: 'done',
+        Job.result: json.dumps(result, ensure_ascii=False, default=str) if result is not None else Job.result,
+        Job.error: None,
+        Job.locked_by: None,
+        Job.finished_at: datetime.now(),
+    }, synchronize_session=False)
+    db.session.commit()
+    return True
+
+
+def _failed(job_id, error):
+    """Ошибка обработчика: повтор после паузы или окончательный провал"""
+    job_row = db.session.get(Job, job_id)
+    permanent = isinstance(error, PermanentJobError)
+    message = str(error) if permanent else f'{type(error).__name__}: {error}'
+    current_app.logger.warning(
+        'Фоновая задача %s (%s) упала, попытка %s/%s: %s',
+        job_row.id, job_row.name, job_row.attempts, job_row.max_attempts,
+        message if permanent else traceback.format_exc()
+    )
+
+    values = {Job.error: message[:MAX_ERROR_LENGTH], Job.locked_by: None}
+    if permanent or job_row.attempts >= job_row.max_attempts:
+        values.update({Job.status: 'failed', Job.finished_at: datetime.now()})
+    else:
+        values.update({Job.status: 'queued', Job.run_at: datetime.now() + timedelta(seconds=backoff(job_row.attempts))})
+    db.session.query(Job).filter_by(id=job_id).update(values, synchronize_session=False)
+    db.session.commit()
+
+
+def requeue_stale(lease_seconds):
+    """
+    Задачи 'running' без признаков жизни дольше аренды (процесс обработчика упал):
+    снова в очередь, если попытки остались, иначе - провал. Возвращает число задач
+    """
+    deadline = datetime.now() - timedelta(seconds=lease_seconds)
+    stale = (Job.status == 'running', Job.locked_at < deadline)
+
+    failed = db.session.query(Job).filter(*stale, Job.attempts >= Job.max_attempts).update({
+        Job.status: 'failed',
+        Job.error: 'Обработчик не ответил (процесс остановлен?)',
+        Job.locked_by: None,
+        Job.finished_at: datetime.now(),
+    }, synchronize_session=False)
+    requeued = db.session.query(Job).filter(*stale).update({
+        Job.status: 'queued',
+        Job.locked_by: None,
+        Job.run_at: datetime.now(),
+    }, synchronize_session=False)
+    db.session.commit()
+    return failed + requeued
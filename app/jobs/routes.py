@@ -0,0 +1,37 @@
+"""
+Статус фоновых задач
+"""
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+from app.extensions import db
+from app.models import Job
+from app.query_budget import query_budget
+from app.replicas import user_wrote
+
+
+# Создай blueprint
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+
+
+@jobs_bp.route('/<int:job_id>')
+@login_required
+@query_budget(1)
+def job_status(job_id):
+    """Статус задачи для опроса (Retry-After - когда спросить снова)"""
+    
+    job = db.session.get(Job, job_id)
+    
+    # Чужие и служебные задачи не показываем
+    if job is None or job.user_id != current_user.id:
+        return jsonify({'error': 'Задача не найдена'}), 404
+    
+    # Задача писала в другом процессе: следующие запросы пользователя читают основную БД
+    if job.finished and job.finished_at:
+        user_wrote(current_user.id, at=job.finished_at.timestamp())
+    
+    response = jsonify(job.to_dict())
+    if not job.finished:
+        response.headers['Retry-After'] = '1'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
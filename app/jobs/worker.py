@@ -0,0 +1,183 @@
+"""
+Обработчики очереди: потоки в процессе веб-сервера или отдельный процесс
+(python manage.py jobs worker). Потоки стартуют с первым запросом - так их нет
+в родительском процессе перезагрузчика Werkzeug, в CLI командах и в процессе
+до fork. Свободные от задач потоки выполняют периодическое обслуживание
+(pool.every): возврат зависших задач, чистка истекших общих ссылок, отметка
+времени для замера отставания реплик
+"""
+import os
+import socket
+import threading
+import time
+from app.extensions import db
+from app.jobs import queue
+
+
+# Зависшие задачи ищутся не чаще (UPDATE на каждом опросе - лишние блокировки записи)
+STALE_CHECK_SECONDS = 60
+
+
+class WorkerPool:
+    """
+    N потоков: забрать задачу -> выполнить -> следующая; очередь пуста - ждать
+    notify() (задача поставлена этим процессом) или опроса раз в poll секунд
+    (задачи других процессов, отложенные повторы)
+    """
+
+    def __init__(self, app, workers, poll_seconds, lease_seconds):
+        self.app = app
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._periodic = []
+
+    def ensure_started(self):
+        """Запускает потоки один раз на процесс (после fork - заново)"""
+        if self._pid == os.getpid() or not self.workers:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._loop, name=f'jobs-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def notify(self):
+        self._wake.set()
+    
+    def every(self, seconds, func):
+        """Периодическое обслуживание: func() не чаще раза в seconds (в свободном потоке)"""
+        self._periodic.append({'seconds': seconds, 'func': func, 'last': None})
+
+    def stop(self, timeout=5):
+        """Останавливает потоки (текущие задачи дорабатывают до timeout)"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def _worker_id(self):
+        return f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'
+
+    def _loop(self):
+        worker_id = self._worker_id()
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    if run_next(worker_id):
+                        continue
+                    self._run_periodic()
+            except Exception:
+                # БД недоступна и т.п. - поток не должен умереть, пробуем после паузы
+                self.app.logger.exception('Ошибка обработчика очереди')
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+    
+    def _due(self):
+        """Периодические функции, которым пора (отмечаются под блокировкой - одна на все потоки)"""
+        now = time.monotonic()
+        with self._lock:
+            due = [item for item in self._periodic if item['last'] is None or now - item['last'] >= item['seconds']]
+            for item in due:
+                item['last'] = now
+        return due
+    
+    def _run_periodic(self):
+        for item in self._due():
+            try:
+                item['func']()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('Ошибка периодического обслуживания %s', item['func'].__name__)
+
+
+def run_next(worker_id):
+    """Забирает и выполняет одну задачу; False - очередь пуста"""
+    job_id = queue.claim(worker_id)
+    if job_id is None:
+        return False
+    try:
+        queue.run(job_id)
+    finally:
+        db.session.remove()
+    return True
+
+
+def run_pending(worker_id='inline'):
+    """Выполняет все готовые задачи в текущем потоке (тесты, CLI). Возвращает их число"""
+    done = 0
+    while run_next(worker_id):
+        done += 1
+    return done
+
+
+def _sweep_shared(app):
+    """Периодическая чистка истекших общих ссылок"""
+    from app.shared.sweeper import sweep_expired
+    
+    def sweep_shared():
+        report = sweep_expired(batch_size=app.config['SHARED_SWEEP_BATCH_SIZE'])
+        if report['deleted']:
+            app.logger.info('Удалено истекших общих ссылок: %s за %.2f с (пачек: %s)',
+                            report['deleted'], report['seconds'], len(report['batches']))
+    return sweep_shared
+
+
+def _archive_tasks(app):
+    """Периодический перенос давно завершенных задач в архив"""
+    from app.tasks.archive import archive_completed
+    
+    def archive_tasks():
+        report = archive_completed(
+            app.config['TASKS_ARCHIVE_AFTER_DAYS'],
+            batch_size=app.config['TASKS_ARCHIVE_BATCH_SIZE']
+        )
+        if report['archived']:
+            app.logger.info('Перенесено задач в архив: %s за %.2f с (пачек: %s)',
+                            report['archived'], report['seconds'], len(report['batches']))
+    return archive_tasks
+
+
+def make_pool(app, workers):
+    """Пул обработчиков с периодическим обслуживанием из конфигурации"""
+    pool = WorkerPool(
+        app,
+        workers=workers,
+        poll_seconds=app.config['JOBS_POLL_SECONDS'],
+        lease_seconds=app.config['JOBS_LEASE_SECONDS'],
+    )
+    pool.every(STALE_CHECK_SECONDS, lambda: queue.requeue_stale(pool.lease_seconds))
+    if app.config['SHARED_SWEEP_SECONDS']:
+        pool.every(app.config['SHARED_SWEEP_SECONDS'], _sweep_shared(app))
+    if app.config['TASKS_ARCHIVE_SECONDS']:
+        pool.every(app.config['TASKS_ARCHIVE_SECONDS'], _archive_tasks(app))
+    if app.config['SQLALCHEMY_REPLICA_URIS']:
+        from app.replicas import write_heartbeat
+        pool.every(app.config['DB_REPLICA_HEARTBEAT_SECONDS'], write_heartbeat)
+    return pool
+
+
+def init_jobs(app):
+    """Регистрирует обработчики задач и пул потоков (запуск - с первым запросом)"""
+    # Обработчики регистрируются декоратором @job при импорте
+    from app.jobs import handlers
+
+    pool = make_pool(app, app.config['JOBS_WORKERS'])
+    app.extensions['jobs'] = pool
+
+    if pool.workers:
+        app.before_request(pool.ensure_started)
+    return pool
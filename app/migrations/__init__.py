@@ -0,0 +1,144 @@
+"""
+Версионные миграции схемы БД
+Каждая миграция - модуль app/migrations/versions/NNNN_имя.py с функцией upgrade(conn)
+Примененные версии хранятся в таблице schema_migrations
+
+    python manage.py db upgrade     # применить новые миграции
+    python manage.py db check       # есть ли непримененные миграции
+    python manage.py db generate имя
+"""
+import importlib
+import os
+import pkgutil
+import re
+from datetime import datetime
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, DateTime, inspect, select, func
+)
+
+
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), 'versions')
+VERSIONS_PACKAGE = 'app.migrations.versions'
+
+_meta = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _meta,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+class PendingMigrationsError(RuntimeError):
+    """Схема БД отстает от кода"""
+
+
+def _discover():
+    """Возвращает [(version, name)] из папки versions, по возрастанию"""
+    found = []
+    for module in pkgutil.iter_modules([VERSIONS_DIR]):
+        match = re.match(r'^(\d{4})_(\w+)$', module.name)
+        if match:
+            found.append((int(match.group(1)), module.name))
+    return sorted(found)
+
+
+def latest_version():
+    """Номер последней миграции в коде"""
+    versions = _discover()
+    return versions[-1][0] if versions else 0
+
+
+def current_version(conn):
+    """Номер последней примененной миграции (0 для пустой БД)"""
+    if not inspect(conn).has_table('schema_migrations'):
+        return 0
+    return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+def pending(conn):
+    """Список непримененных миграций [(version, module_name)]"""
+    current = current_version(conn)
+    return [(version, name) for version, name in _discover() if version > current]
+
+
+def upgrade(engine, target=None, echo=None):
+    """
+    Применяет непримененные миграции по порядку
+    Каждая миграция - отдельная транзакция вместе с записью в schema_migrations
+    """
+    with engine.begin() as conn:
+        _meta.create_all(conn, checkfirst=True)
+        todo = pending(conn)
+
+    applied = []
+    for version, module_name in todo:
+        if target is not None and version > target:
+            break
+        module = importlib.import_module(f'{VERSIONS_PACKAGE}.{module_name}')
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                name=module_name,
+                applied_at=datetime.now()
+            ))
+        applied.append(module_name)
+        if echo:
+            echo(f'  ✔ {module_name}')
+    return applied
+
+
+def check(engine):
+    """Быстрая проверка при старте: одна выборка max(version)"""
+    with engine.connect() as conn:
+        current = current_version(conn)
+    latest = latest_version()
+    if current < latest:
+        raise PendingMigrationsError(
+            f'Схема БД устарела (версия {current}, нужна {latest}). '
+            f'Выполни: python manage.py db upgrade'
+        )
+    return current
+
+
+def diff_models(conn, metadata):
+    """Чего из моделей нет в БД: таблицы, колонки, индексы (для generate)"""
+    inspector = inspect(conn)
+    problems = []
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            problems.append(f'нет таблицы {table.name}')
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                problems.append(f'нет колонки {table.name}.{column.name}')
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                problems.append(f'нет индекса {index.name} на {table.name}')
+    return problems
+
+
+TEMPLATE = '''"""
+{title}
+"""
+from sqlalchemy import text
+from app.migrations import ops
+
+
+def upgrade(conn):
+{body}
+'''
+
+
+def generate(name, notes=()):
+    """Создает файл новой миграции со следующим номером, возвращает путь"""
+    slug = re.sub(r'\W+', '_', name.strip().lower()).strip('_') or 'migration'
+    version = latest_version() + 1
+    path = os.path.join(VERSIONS_DIR, f'{version:04d}_{slug}.py')
+    body = ''.join(f'    # TODO: {note}\n' for note in notes) + '    pass'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(TEMPLATE.format(title=name.strip(), body=body))
+    return path
@@ -0,0 +1,43 @@
+"""
+Вспомогательные операции для миграций (идемпотентные: БД, созданные
+старым db.create_all(), уже могут содержать часть объектов)
+"""
+from sqlalchemy import inspect, text
+
+
+def has_table(conn, table):
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn, table, column):
+    return column in {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def has_index(conn, table, index):
+    return index in {i['name'] for i in inspect(conn).get_indexes(table)}
+
+
+def create_tables(conn, metadata):
+    """Создает таблицы и их индексы, если их еще нет"""
+    metadata.create_all(conn, checkfirst=True)
+
+
+def create_index(conn, index):
+    """Создает индекс, если его еще нет"""
+    if not has_index(conn, index.table.name, index.name):
+        index.create(conn)
+
+
+def drop_index(conn, table, name):
+    """Удаляет индекс, если он есть"""
+    if has_index(conn, table, name):
+        conn.execute(text(f'DROP INDEX {name}'))
+
+
+def add_column(conn, table, column_sql):
+    """ALTER TABLE ... ADD COLUMN, если колонки еще нет (column_sql - 'имя ТИП ...')"""
+    name = column_sql.split()[0]
+    if has_column(conn, table, name):
+        return False
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column_sql}'))
+    return True
@@ -0,0 +1,54 @@
+"""
+Начальная схема: users, tasks, shared_tasks
+"""
+from datetime import datetime
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index
+)
+from app.migrations import ops
+
+
+def upgrade(conn):
+    meta = MetaData()
+    
+    Table(
+        'users', meta,
+        Column('id', Integer, primary_key=True),
+        Column('username', String(80), unique=True, nullable=False, index=True),
+        Column('email', String(120), unique=True, nullable=False, index=True),
+        Column('password_hash', String(200), nullable=False),
+        Column('created_at', DateTime, default=datetime.now),
+        Column('updated_at', DateTime, default=datetime.now),
+    )
+    
+    tasks = Table(
+        'tasks', meta,
+        Column('id', Integer, primary_key=True),
+        Column('title', String(255), nullable=False),
+        Column('description', Text, nullable=True),
+        Column('completed', Boolean, default=False, index=True),
+        Column('priority', String(20), default='medium'),
+        Column('user_id', Integer, ForeignKey('users.id'), nullable=False, index=True),
+        Column('created_at', DateTime, index=True),
+        Column('updated_at', DateTime),
+        Column('completed_at', DateTime, nullable=True),
+    )
+    Index('idx_tasks_user_completed', tasks.c.user_id, tasks.c.completed)
+    Index('idx_tasks_user_created', tasks.c.user_id, tasks.c.created_at)
+    
+    Table(
+        'shared_tasks', meta,
+        Column('id', Integer, primary_key=True),
+        Column('token', String(32), unique=True, nullable=False, index=True),
+        Column('task_id', Integer, ForeignKey('tasks.id'), nullable=False, index=True),
+        Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+        Column('allowed_email', String(120), nullable=True),
+        Column('created_at', DateTime),
+        Column('expires_at', DateTime, nullable=True),
+    )
+    
+    ops.create_tables(conn, meta)
+    
+    # БД, созданные db.create_all() до появления индексов
+    for index in tasks.indexes:
+        ops.create_index(conn, index)
@@ -0,0 +1,30 @@
+"""
+Счетчики задач пользователя и дневные сводки
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, Date, DateTime, ForeignKey
+from app.migrations import ops
+
+
+def upgrade(conn):
+    meta = MetaData()
+    
+    # Для внешних ключей
+    Table('users', meta, Column('id', Integer, primary_key=True))
+    
+    Table(
+        'user_task_counters', meta,
+        Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+        Column('total', Integer, nullable=False, default=0),
+        Column('completed', Integer, nullable=False, default=0),
+        Column('updated_at', DateTime),
+    )
+    
+    Table(
+        'user_daily_stats', meta,
+        Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+        Column('day', Date, primary_key=True),
+        Column('created', Integer, nullable=False, default=0),
+        Column('completed', Integer, nullable=False, default=0),
+    )
+    
+    ops.create_tables(conn, meta)
@@ -0,0 +1,38 @@
+"""
+Числовой приоритет tasks.priority_rank и индекс списка задач по нему
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, String, Boolean, DateTime, Index, case
+from app.migrations import ops
+
+
+def upgrade(conn):
+    meta = MetaData()
+    tasks = Table(
+        'tasks', meta,
+        Column('id', Integer, primary_key=True),
+        Column('user_id', Integer),
+        Column('completed', Boolean),
+        Column('priority', String(20)),
+        Column('priority_rank', Integer),
+        Column('created_at', DateTime),
+    )
+    
+    # Заполняем ранг по строковому приоритету (low=1, medium=2, high=3)
+    if ops.add_column(conn, 'tasks', 'priority_rank INTEGER NOT NULL DEFAULT 2'):
+        conn.execute(tasks.update().values(priority_rank=case(
+            (tasks.c.priority == 'high', 3),
+            (tasks.c.priority == 'low', 1),
+            else_=2
+        )))
+    
+    # Индекс по строковому priority из ранней версии списка
+    ops.drop_index(conn, 'tasks', 'idx_tasks_user_list')
+    
+    ops.create_index(conn, Index(
+        'idx_tasks_user_rank',
+        tasks.c.user_id,
+        tasks.c.completed,
+        tasks.c.priority_rank.desc(),
+        tasks.c.created_at.desc(),
+        tasks.c.id.desc()
+    ))
@@ -0,0 +1,68 @@
+"""
+Полнотекстовый поиск по задачам
+SQLite: FTS5 таблица tasks_fts (external content - представление над tasks)
+и триггеры синхронизации
+PostgreSQL: генерируемая колонка tasks.search_vector и GIN индекс
+"""
+from sqlalchemy import text
+from app.migrations import ops
+
+
+SQLITE_STATEMENTS = [
+    # Источник индекса: owner = 'u<user_id>' - поиск сужается до задач пользователя
+    # внутри самого FTS (пересечение списков), а не фильтром после MATCH по всей таблице
+    """
+    CREATE VIEW IF NOT EXISTS tasks_fts_source AS
+    SELECT id, title, description, 'u' || user_id AS owner FROM tasks
+    """,
+    # Текст хранится только в tasks, в tasks_fts - индекс (rowid = tasks.id)
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description, owner,
+        content='tasks_fts_source', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description, owner)
+        VALUES (new.id, new.title, new.description, 'u' || new.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description, owner)
+        VALUES ('delete', old.id, old.title, old.description, 'u' || old.user_id);
+    END
+    """,
+    # Только при смене текста: завершение и смена приоритета индекс не трогают
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description, user_id ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description, owner)
+        VALUES ('delete', old.id, old.title, old.description, 'u' || old.user_id);
+        INSERT INTO tasks_fts(rowid, title, description, owner)
+        VALUES (new.id, new.title, new.description, 'u' || new.user_id);
+    END
+    """,
+    # Индекс по уже существующим задачам
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_COLUMN = (
+    "search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+    ") STORED"
+)
+
+
+def upgrade(conn):
+    dialect = conn.dialect.name
+    
+    if dialect == 'sqlite':
+        for statement in SQLITE_STATEMENTS:
+            conn.execute(text(statement))
+    elif dialect == 'postgresql':
+        ops.add_column(conn, 'tasks', POSTGRES_COLUMN)
+        if not ops.has_index(conn, 'tasks', 'idx_tasks_search'):
+            conn.execute(text('CREATE INDEX idx_tasks_search ON tasks USING GIN (search_vector)'))
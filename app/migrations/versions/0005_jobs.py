@@ -0,0 +1,34 @@
+"""
+Очередь фоновых задач (app/jobs)
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, String, Text, DateTime, ForeignKey, Index
+from app.migrations import ops
+
+
+def upgrade(conn):
+    meta = MetaData()
+    
+    # Для внешних ключей
+    Table('users', meta, Column('id', Integer, primary_key=True))
+    
+    jobs = Table(
+        'jobs', meta,
+        Column('id', Integer, primary_key=True),
+        Column('name', String(80), nullable=False),
+        Column('payload', Text, nullable=False),
+        Column('user_id', Integer, ForeignKey('users.id'), nullable=True, index=True),
+        Column('status', String(20), nullable=False),
+        Column('attempts', Integer, nullable=False),
+        Column('max_attempts', Integer, nullable=False),
+        Column('run_at', DateTime, nullable=False),
+        Column('locked_by', String(100)),
+        Column('locked_at', DateTime),
+        Column('result', Text),
+        Column('error', Text),
+        Column('created_at', DateTime),
+        Column('started_at', DateTime),
+        Column('finished_at', DateTime),
+    )
+    Index('idx_jobs_status_run_at', jobs.c.status, jobs.c.run_at)
+    
+    ops.create_tables(conn, meta)
@@ -0,0 +1,22 @@
+"""
+Индекс shared_tasks.expires_at для чистки истекших ссылок
+(частичный - без бессрочных ссылок - в SQLite и PostgreSQL)
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, DateTime, Index
+from app.migrations import ops
+
+
+def upgrade(conn):
+    meta = MetaData()
+    shared_tasks = Table(
+        'shared_tasks', meta,
+        Column('id', Integer, primary_key=True),
+        Column('expires_at', DateTime),
+    )
+    
+    ops.create_index(conn, Index(
+        'idx_shared_tasks_expires_at',
+        shared_tasks.c.expires_at,
+        sqlite_where=shared_tasks.c.expires_at.isnot(None),
+        postgresql_where=shared_tasks.c.expires_at.isnot(None)
+    ))
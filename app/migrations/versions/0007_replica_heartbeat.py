@@ -0,0 +1,17 @@
+"""
+Отметка времени для замера отставания реплик (app/replicas.py)
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, DateTime
+from app.migrations import ops
+
+
+def upgrade(conn):
+    meta = MetaData()
+    
+    Table(
+        'replica_heartbeat', meta,
+        Column('id', Integer, primary_key=True),
+        Column('beat_at', DateTime, nullable=False),
+    )
+    
+    ops.create_tables(conn, meta)
@@ -0,0 +1,27 @@
+"""
+Гистограмма времени выполнения задач по дням (user_latency_stats)
+Счетчики пользователей сбрасываются: при первом обращении они пересобираются
+вместе с гистограммой (counters.get_counters / rebuild_user)
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, Date, ForeignKey
+from app.migrations import ops
+
+
+def upgrade(conn):
+    meta = MetaData()
+    
+    # Для внешних ключей
+    Table('users', meta, Column('id', Integer, primary_key=True))
+    
+    Table(
+        'user_latency_stats', meta,
+        Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+        Column('day', Date, primary_key=True),
+        Column('bucket', Integer, primary_key=True),
+        Column('completed', Integer, nullable=False, default=0),
+    )
+    
+    ops.create_tables(conn, meta)
+    
+    counters = Table('user_task_counters', MetaData(), Column('user_id', Integer, primary_key=True))
+    conn.execute(counters.delete())
@@ -0,0 +1,41 @@
+"""
+Архив задач tasks_archive (та же схема, что у tasks, те же id)
+Общая ссылка может указывать на задачу в архиве: внешний ключ shared_tasks.task_id
+снимается в PostgreSQL (SQLite внешние ключи не проверяет - PRAGMA foreign_keys
+не включается, см. SQLITE_PRAGMAS)
+Id архивных задач не выдаются новым задачам: tasks с AUTOINCREMENT (0010)
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index, text
+from app.migrations import ops
+
+
+def upgrade(conn):
+    meta = MetaData()
+    
+    # Для внешних ключей
+    Table('users', meta, Column('id', Integer, primary_key=True))
+    
+    archive = Table(
+        'tasks_archive', meta,
+        Column('id', Integer, primary_key=True, autoincrement=False),
+        Column('title', String(255), nullable=False),
+        Column('description', Text, nullable=True),
+        Column('completed', Boolean, default=False),
+        Column('priority', String(20), default='medium'),
+        Column('priority_rank', Integer, nullable=False, default=2),
+        Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+        Column('created_at', DateTime),
+        Column('updated_at', DateTime),
+        Column('completed_at', DateTime, nullable=True),
+    )
+    Index(
+        'idx_tasks_archive_user_completed',
+        archive.c.user_id,
+        archive.c.completed_at.desc(),
+        archive.c.id.desc()
+    )
+    
+    ops.create_tables(conn, meta)
+    
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('ALTER TABLE shared_tasks DROP CONSTRAINT IF EXISTS shared_tasks_task_id_fkey'))
@@ -0,0 +1,73 @@
+"""
+tasks с AUTOINCREMENT (SQLite): id задач больше не переиспользуются
+Без AUTOINCREMENT SQLite выдает новой строке max(id) + 1: после переноса самых
+новых задач в архив (или их удаления) новая задача получила бы id архивной.
+С AUTOINCREMENT верхняя отметка хранится в sqlite_sequence и не опускается
+Заменяет триггер tasks_archive_keep_ids из 0009: он возвращал архивную задачу
+в tasks в обход индекса поиска, а следующий перенос снова ее архивировал
+PostgreSQL: serial-последовательность id и так не переиспользует
+"""
+from sqlalchemy import MetaData, Table, text
+from app.migrations import ops
+
+
+SCHEMA_SQL = text(
+    "SELECT type, name, sql FROM sqlite_master "
+    "WHERE tbl_name = 'tasks' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+)
+VIEW_SQL = text("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'tasks_fts_source'")
+
+
+def _has_autoincrement(conn):
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'")).scalar()
+    return 'AUTOINCREMENT' in sql.upper()
+
+
+def _rebuild(conn):
+    """
+    Пересоздает tasks с AUTOINCREMENT (ALTER TABLE в SQLite этого не умеет):
+    новая таблица, копия строк, замена; индексы, триггеры и представление
+    поиска создаются заново из их SQL
+    """
+    objects = conn.execute(SCHEMA_SQL).fetchall()
+    view = conn.execute(VIEW_SQL).scalar()
+    if view:
+        # Представление над tasks мешает переименованию
+        conn.execute(text('DROP VIEW tasks_fts_source'))
+
+    meta = MetaData()
+    tasks = Table('tasks', meta, autoload_with=conn)
+    tasks_new = tasks.to_metadata(meta, name='tasks_new')
+    tasks_new.indexes.clear()
+    tasks_new.dialect_options['sqlite']['autoincrement'] = True
+    tasks_new.create(conn)
+
+    columns = ', '.join(column.name for column in tasks.columns)
+    conn.execute(text(f'INSERT INTO tasks_new ({columns}) SELECT {columns} FROM tasks'))
+    conn.execute(text('DROP TABLE tasks'))
+    conn.execute(text('ALTER TABLE tasks_new RENAME TO tasks'))
+
+    if view:
+        conn.execute(text(view))
+    for _, _, sql in objects:
+        conn.execute(text(sql))
+
+
+def upgrade(conn):
+    if conn.dialect.name != 'sqlite':
+        return
+
+    conn.execute(text('DROP TRIGGER IF EXISTS tasks_archive_keep_ids'))
+    if not _has_autoincrement(conn):
+        _rebuild(conn)
+
+    # Верхняя отметка - с учетом архива: задачи с большими id могли уже уйти туда
+    top = conn.execute(text(
+        'SELECT max(coalesce((SELECT max(id) FROM tasks), 0), coalesce((SELECT max(id) FROM tasks_archive), 0))'
+    )).scalar()
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'tasks'"))
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks', :top)"), {'top': top})
+
+    # Задачи, которые триггер вернул в tasks, не попали в индекс поиска
+    if ops.has_table(conn, 'tasks_fts'):
+        conn.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
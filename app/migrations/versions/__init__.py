@@ -0,0 +1,3 @@
+"""
+Файлы миграций (NNNN_имя.py)
+"""
@@ -1,10 +1,12 @@
 """
 Модели базы данных
 """
+import enum
+import json
 from datetime import datetime, timedelta
 # import pytz
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import validates
 from app.extensions import db
 
 
@@ -28,12 +30,19 @@ class User(UserMixin, db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)  # ✅ ИСПРАВЛЕНО
     
     def set_password(self, password):
-        """Хеширует и сохраняет пароль"""
-        self.password_hash = generate_password_hash(password)
+        """Хеширует и сохраняет пароль (параметры окружения, пул процессов - app/auth/passwords.py)"""
+        from app.auth.passwords import hasher
+        self.password_hash = hasher().hash(password)
     
     def check_password(self, password):
         """Проверяет правильность пароля"""
-        return check_password_hash(self.password_hash, password)
+        from app.auth.passwords import hasher
+        return hasher().verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Хеш сделан со старыми параметрами (пересчитать при входе, пока пароль известен)"""
+        from app.auth.passwords import hasher
+        return hasher().needs_rehash(self.password_hash)
     
     def get_tasks_today(self):
         """Возвращает задачи созданные сегодня"""
@@ -65,36 +74,84 @@ class User(UserMixin, db.Model):
 
 
 
+class TaskPriority(enum.IntEnum):
+    """
+    Приоритет задачи как число: по нему сортирует БД (high > medium > low)
+    """
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+    
+    @classmethod
+    def rank(cls, name):
+        """Числовой ранг по строковому значению ('low', 'medium', 'high')"""
+        try:
+            return cls[(name or 'medium').upper()].value
+        except KeyError:
+            return cls.MEDIUM.value
+
+
+
 class Task(db.Model):
     """
     Модель задачи пользователя
     """
     __tablename__ = 'tasks'
+    __table_args__ = {'sqlite_autoincrement': True}  # id архивных задач не выдаются снова (миграция 0010)
+    
+    archived = False  # для шаблонов (у TaskArchive - True)
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=True)
     completed = db.Column(db.Boolean, default=False, index=True)
     priority = db.Column(db.String(20), default='medium')  # low, medium, high
+    priority_rank = db.Column(db.Integer, nullable=False, default=TaskPriority.MEDIUM.value)  # для сортировки в БД
     
     # Связь с пользователем
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
-    # Связь с общей задачей
-    shared_task = db.relationship('SharedTask', backref='task', uselist=False, cascade='all, delete-orphan')
+    # Связь с общей задачей (ссылка на задачу из архива - TaskArchive.shared_task)
+    shared_task = db.relationship(
+        'SharedTask',
+        primaryjoin='Task.id == foreign(SharedTask.task_id)',
+        backref='task',
+        uselist=False,
+        cascade='all, delete-orphan'
+    )
     
     created_at = db.Column(db.DateTime, default=datetime.now, index=True)  # ✅ ИСПРАВЛЕНО: datetime.now вместо datetime.utcnow
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)  # ✅ ИСПРАВЛЕНО
     completed_at = db.Column(db.DateTime, nullable=True)
     
+    @validates('priority')
+    def _sync_priority_rank(self, key, value):
+        """Держит priority_rank в синхроне со строковым priority"""
+        self.priority_rank = TaskPriority.rank(value)
+        return value
+    
     def toggle_complete(self):
-        """Переключает статус завершения задачи"""
+        """Переключает статус завершения задачи (commit делает вызывающий код)"""
+        from app import counters
+        previous_completed_at = self.completed_at
         self.completed = not self.completed
         if self.completed:
             self.completed_at = datetime.now()  # ✅ ИСПРАВЛЕНО: datetime.now() вместо datetime.utcnow()
         else:
             self.completed_at = None
-        db.session.commit()
+        counters.task_completion_changed(self, previous_completed_at)
+    
+    def to_dict(self):
+        """Данные задачи для JSON API"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'completed': self.completed,
+            'priority': self.priority,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+        }
     
     def get_shared_token(self):
         """Возвращает токен для общей ссылки если существует"""
@@ -107,6 +164,42 @@ class Task(db.Model):
 
 
 
+class TaskArchive(db.Model):
+    """
+    Архив задач: давно завершенные задачи, перенесенные из tasks (app/tasks/archive.py)
+    Та же схема и те же id - адреса /tasks/<id> и общие ссылки продолжают работать
+    """
+    __tablename__ = 'tasks_archive'
+    
+    archived = True
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # id из tasks
+    title = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    completed = db.Column(db.Boolean, default=False)
+    priority = db.Column(db.String(20), default='medium')
+    priority_rank = db.Column(db.Integer, nullable=False, default=TaskPriority.MEDIUM.value)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    # Общая ссылка на задачу, перенесенную в архив (только чтение)
+    shared_task = db.relationship(
+        'SharedTask',
+        primaryjoin='TaskArchive.id == foreign(SharedTask.task_id)',
+        uselist=False,
+        viewonly=True
+    )
+    
+    to_dict = Task.to_dict
+    get_shared_token = Task.get_shared_token
+    
+    def __repr__(self):
+        return f'<TaskArchive {self.title}>'
+
+
+
 class SharedTask(db.Model):
     """
     Модель для общих задач (доступны по уникальной ссылке без авторизации)
@@ -116,8 +209,8 @@ class SharedTask(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     token = db.Column(db.String(32), unique=True, nullable=False, index=True)  # Уникальный токен
     
-    # Связь с задачей
-    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False, index=True)
+    # Связь с задачей: id в tasks или в tasks_archive (поэтому без внешнего ключа)
+    task_id = db.Column(db.Integer, nullable=False, index=True)
     
     # Связь с пользователем которому принадлежит задача
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -139,6 +232,153 @@ class SharedTask(db.Model):
 
 
 
+class UserTaskCounters(db.Model):
+    """
+    Счетчики задач пользователя (обновляются при записи, читаются за O(1))
+    """
+    __tablename__ = 'user_task_counters'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    @property
+    def active(self):
+        """Количество активных задач"""
+        return self.total - self.completed
+    
+    def __repr__(self):
+        return f'<UserTaskCounters {self.user_id}: {self.completed}/{self.total}>'
+
+
+
+class UserDailyStats(db.Model):
+    """
+    Дневная сводка пользователя: сколько задач создано и завершено за день
+    """
+    __tablename__ = 'user_daily_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserDailyStats {self.user_id} {self.day}>'
+
+
+
+class UserLatencyStats(db.Model):
+    """
+    Гистограмма времени выполнения задач: сколько задач, завершенных за день,
+    выполнялись столько-то (bucket - логарифмическая корзина, см. counters.latency_bucket)
+    """
+    __tablename__ = 'user_latency_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # день завершения
+    bucket = db.Column(db.Integer, primary_key=True)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserLatencyStats {self.user_id} {self.day} #{self.bucket}>'
+
+
+
+class Job(db.Model):
+    """
+    Фоновая задача в очереди (app/jobs): хранится в БД и переживает перезапуск процесса
+    """
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)  # обработчик, например 'tasks.import'
+    payload = db.Column(db.Text, nullable=False, default='{}')  # аргументы обработчика (JSON)
+    
+    # Владелец (статус в /jobs/<id> виден только ему), пусто - служебная задача
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
+    
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)  # не раньше (пауза перед повтором)
+    
+    # Кто выполняет и с какого момента (зависшая задача возвращается в очередь)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    
+    result = db.Column(db.Text, nullable=True)  # результат или прогресс (JSON)
+    error = db.Column(db.Text, nullable=True)  # последняя ошибка
+    
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+    
+    def to_dict(self):
+        """Статус задачи для JSON API"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} {self.status}>'
+
+
+
+class ReplicaHeartbeat(db.Model):
+    """
+    Отметка времени основной БД (одна строка): доезжает до реплик вместе с данными,
+    по ней видно, на сколько реплика отстает (app/replicas.py)
+    """
+    __tablename__ = 'replica_heartbeat'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<ReplicaHeartbeat {self.beat_at}>'
+
+
+
 # Индексы для оптимизации поиска
 db.Index('idx_tasks_user_completed', Task.user_id, Task.completed)
-db.Index('idx_tasks_user_created', Task.user_id, Task.created_at)
\ No newline at end of file
+db.Index('idx_tasks_user_created', Task.user_id, Task.created_at)
+# Совпадает с порядком списка задач (keyset пагинация идет по индексу, без сортировки)
+db.Index(
+    'idx_tasks_user_rank',
+    Task.user_id,
+    Task.completed,
+    Task.priority_rank.desc(),
+    Task.created_at.desc(),
+    Task.id.desc()
+)
+# Список архива пользователя: недавно завершенные сверху (других индексов у архива нет)
+db.Index(
+    'idx_tasks_archive_user_completed',
+    TaskArchive.user_id,
+    TaskArchive.completed_at.desc(),
+    TaskArchive.id.desc()
+)
+# Выборка очереди: готовые к запуску задачи по времени
+db.Index('idx_jobs_status_run_at', Job.status, Job.run_at)
+# Чистка истекших ссылок (app/shared/sweeper.py); бессрочные ссылки в индекс не попадают
+db.Index(
+    'idx_shared_tasks_expires_at',
+    SharedTask.expires_at,
+    sqlite_where=SharedTask.expires_at.isnot(None),
+    postgresql_where=SharedTask.expires_at.isnot(None)
+)
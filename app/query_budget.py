@@ -0,0 +1,101 @@
+"""
+Бюджет SQL-запросов на маршрут
+Ловит N+1: если view (вместе с рендерингом шаблона) выполнил больше запросов,
+чем разрешено, в режиме QUERY_BUDGET_ENFORCE поднимается QueryBudgetExceeded.
+У потокового ответа (выгрузка) в бюджет входят и запросы генератора тела.
+Все маршруты с бюджетом проходит tests/test_query_budgets.py
+
+    @tasks_bp.route('/')
+    @login_required
+    @query_budget(3)
+    def task_list(): ...
+
+    with assert_max_queries(3):
+        client.get('/tasks/1')
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from flask import current_app, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Список выполненных запросов текущего счетчика (None - никто не считает)
+_statements = ContextVar('query_budget_statements', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Маршрут выполнил больше SQL-запросов, чем ему разрешено"""
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    statements = _statements.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """Считает запросы текущего потока/контекста, отдает список выполненных SQL"""
+    statements = []
+    token = _statements.set(statements)
+    try:
+        yield statements
+    finally:
+        _statements.reset(token)
+
+
+def _report(limit, statements, where):
+    lines = '\n'.join(f'  {i}. {sql.splitlines()[0][:150]}' for i, sql in enumerate(statements, 1))
+    return f'{where}: {len(statements)} SQL-запросов при бюджете {limit}\n{lines}'
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """Для тестов: блок должен выполнить не больше limit запросов"""
+    with count_queries() as statements:
+        yield statements
+    if len(statements) > limit:
+        raise QueryBudgetExceeded(_report(limit, statements, 'Блок'))
+
+
+def _streamed(body, limit, statements, name):
+    """Тело потокового ответа: запросы при чтении каждого куска идут в тот же бюджет"""
+    chunks = iter(body)
+    try:
+        while True:
+            token = _statements.set(statements)
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                _statements.reset(token)
+            yield chunk
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    if len(statements) > limit:
+        raise QueryBudgetExceeded(_report(limit, statements, name))
+
+
+def query_budget(limit):
+    """Декоратор маршрута: не больше limit запросов (проверяется при QUERY_BUDGET_ENFORCE)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if not current_app.config.get('QUERY_BUDGET_ENFORCE'):
+                return view(*args, **kwargs)
+            with count_queries() as statements:
+                result = view(*args, **kwargs)
+            if isinstance(result, Response) and result.is_streamed:
+                result.response = _streamed(result.response, limit, statements, view.__name__)
+                return result
+            if len(statements) > limit:
+                raise QueryBudgetExceeded(_report(limit, statements, view.__name__))
+            return result
+        wrapped.query_budget = limit
+        return wrapped
+    return decorator
@@ -0,0 +1,261 @@
+"""
+Чтение с реплик БД (read/write splitting)
+Маршруты с @read_only выполняют выборки на реплике (SQLALCHEMY_REPLICA_URIS),
+запись и чтение после записи в том же запросе - на основной БД (RoutingSession
+в app/database.py)
+
+    @statistics_bp.route('/dashboard')
+    @login_required
+    @read_only
+    def dashboard(): ...
+
+Отставание: основная БД раз в DB_REPLICA_HEARTBEAT_SECONDS пишет время в
+replica_heartbeat (обработчики очереди, python manage.py db sync-replicas), строка
+доезжает до реплики вместе с данными. Реплика, отставшая больше
+DB_REPLICA_MAX_LAG_SECONDS или недоступная, пропускается. Пользователь, чьи задачи
+менялись за последние DB_REPLICA_MAX_LAG_SECONDS, читает основную БД - свое
+изменение он видит сразу (после redirect, в другой вкладке, после фоновой задачи).
+Отметка записи едет в сессии пользователя (session['db_wrote_until']) - ее видит
+любой процесс serve.py; запись фоновой задачи отмечается в кэше written и в сессии,
+когда пользователь узнает о завершении задачи (GET /jobs/<id>)
+
+SQLite для разработки: реплика - копия файла основной БД
+(python manage.py db sync-replicas --every 2, см. copy_sqlite)
+"""
+import itertools
+import math
+import os
+import sqlite3
+import time
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, session
+from sqlalchemy import select, update
+from app.cache import make_cache
+from app.database import replica_keys
+from app.extensions import db
+
+
+class ReplicaRouter:
+    """Выбор реплики для выборок запроса: по кругу среди живых и не отставших"""
+
+    def __init__(self, app, keys, max_lag, check_seconds, written):
+        self.app = app
+        self.keys = keys
+        self.max_lag = max_lag
+        self.check_seconds = check_seconds
+        self.written = written  # пользователь -> до какого времени (epoch) читать основную БД
+        self._state = {}  # ключ реплики -> (когда проверена, годна ли)
+        self._turn = itertools.count()
+
+    def lag(self, key):
+        """Отставание реплики в секундах (None - отметки на реплике еще нет)"""
+        from app.models import ReplicaHeartbeat
+
+        with db.engines[key].connect() as conn:
+            beat_at = conn.execute(select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1)).scalar()
+        if beat_at is None:
+            return None
+        return (datetime.now() - beat_at).total_seconds()
+
+    def usable(self, key):
+        """Реплика доступна и отстает не больше max_lag (проверка - раз в check_seconds)"""
+        now = time.monotonic()
+        state = self._state.get(key)
+        if state is not None and now - state[0] < self.check_seconds:
+            return state[1]
+
+        try:
+            lag = self.lag(key)
+            ok = lag is not None and lag <= self.max_lag
+        except Exception as e:
+            lag, ok = None, False
+            if state is None or state[1]:
+                self.app.logger.warning('Реплика %s недоступна: %s', key, e)
+        else:
+            if state is None or state[1] != ok:
+                if ok:
+                    self.app.logger.info('Реплика %s в работе, отставание %.1f с', key, lag)
+                else:
+                    self.app.logger.warning('Реплика %s отстает (%s с) - чтение с основной БД', key,
+                                            'нет отметки' if lag is None else f'{lag:.1f}')
+        self._state[key] = (now, ok)
+        return ok
+
+    def recently_wrote(self, user_id):
+        """Пользователь писал за последние max_lag секунд (сессия или кэш written)"""
+        now = time.time()
+        if has_request_context() and session.get('db_wrote_until', 0) > now:
+            return True
+        return (self.written.get(user_id) or 0) > now
+
+    def choose(self, user_id=None):
+        """Движок реплики или None (читать основную БД)"""
+        if user_id is not None and self.recently_wrote(user_id):
+            return None
+        start = next(self._turn)
+        for i in range(len(self.keys)):
+            key = self.keys[(start + i) % len(self.keys)]
+            if self.usable(key):
+                return db.engines[key]
+        return None
+
+    def engine_for_read(self):
+        """Движок для выборки текущего запроса (решение - одно на запрос)"""
+        if not g.get('db_read_only') or g.get('db_wrote'):
+            return None
+        if 'db_replica' not in g:
+            g.db_replica = self.choose(g.get('db_read_user'))
+        return g.db_replica
+
+    def wrote(self):
+        """Запрос пишет: дальше он читает только основную БД"""
+        g.db_wrote = True
+
+    def user_wrote(self, user_id, at=None):
+        """
+        Отметка записи: в кэше written (записи вне запросов пользователя - фоновые задачи)
+        и в сессии, если пишет сам пользователь - следующий его запрос может попасть
+        в другой процесс с другим локальным кэшем
+        """
+        until = (at or time.time()) + self.max_lag
+        left = until - time.time()
+        if left <= 0:
+            return
+        self.written.set(user_id, until, ttl=math.ceil(left))
+        if has_request_context():
+            from flask_login import current_user
+
+            if current_user.is_authenticated and current_user.get_id() == str(user_id):
+                session['db_wrote_until'] = max(until, session.get('db_wrote_until', 0))
+
+
+def read_only(view):
+    """
+    Декоратор маршрута: выборки - с реплики (если она есть и не отстает)
+    Ставится после @login_required: пользователь загружается с основной БД
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        from flask_login import current_user
+
+        g.db_read_user = int(current_user.get_id()) if current_user.is_authenticated else None
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapped
+
+
+def use_primary():
+    """Остаток запроса читает основную БД (реплика могла не получить нужную строку)"""
+    if has_app_context():
+        g.db_wrote = True
+
+
+def reading_replica():
+    """Выборки текущего запроса идут на реплику"""
+    return has_app_context() and g.get('db_replica') is not None and not g.get('db_wrote')
+
+
+def user_wrote(user_id, at=None):
+    """
+    Задачи пользователя изменились (at - когда, epoch; по умолчанию сейчас):
+    max_lag секунд после этого он читает основную БД
+    """
+    router = current_app.extensions.get('replicas')
+    if router is not None:
+        router.user_wrote(user_id, at)
+
+
+def cache_ttl(ttl):
+    """
+    Срок записи кэша, построенной в текущем запросе: данные с реплики могут отставать
+    на max_lag секунд, и такая запись живет не дольше
+    """
+    if not reading_replica():
+        return ttl
+    max_lag = current_app.extensions['replicas'].max_lag
+    return min(ttl, max_lag) if ttl else max_lag
+
+
+def write_heartbeat():
+    """Отметка времени на основной БД (периодически: обработчики очереди, sync-replicas)"""
+    from app.models import ReplicaHeartbeat
+
+    now = datetime.now()
+    updated = db.session.execute(
+        update(ReplicaHeartbeat).where(ReplicaHeartbeat.id == 1).values(beat_at=now)
+    ).rowcount
+    if not updated:
+        db.session.add(ReplicaHeartbeat(id=1, beat_at=now))
+    db.session.commit()
+
+
+def sqlite_path(engine):
+    """Путь к файлу SQLite движка (None - не SQLite или БД в памяти)"""
+    url = engine.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    database = url.database
+    if database.startswith('file:'):
+        database = database[len('file:'):]
+    return database
+
+
+def copy_sqlite(source, target):
+    """
+    Копирует SQLite-файл через backup API - согласованный снимок, запись в основную
+    БД (WAL) при этом не блокируется. Копия пишется рядом и подменяет реплику
+    атомарно (os.replace): начатые чтения дочитывают старый файл, новые
+    соединения открывают новый. Журнал копии - DELETE: реплике, открытой только
+    на чтение, не нужны файлы -wal и -shm
+    """
+    partial = f'{target}.partial'
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(partial)
+    try:
+        src.backup(dst)
+        dst.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        dst.close()
+        src.close()
+    os.replace(partial, target)
+
+
+def sync_sqlite_replicas():
+    """
+    Отметка времени + копия основной БД в каждую SQLite-реплику
+    Возвращает список (путь реплики, секунд на копию)
+    """
+    source = sqlite_path(db.engine)
+    if source is None:
+        raise RuntimeError('sync-replicas копирует только SQLite: основная БД не SQLite-файл')
+    targets = [sqlite_path(db.engines[key]) for key in replica_keys(current_app.config)]
+    targets = [path for path in targets if path]
+    if not targets:
+        raise RuntimeError('Нет SQLite-реплик: задайте DATABASE_REPLICA_URLS')
+
+    write_heartbeat()
+    report = []
+    for target in targets:
+        started = time.perf_counter()
+        copy_sqlite(source, target)
+        report.append((target, time.perf_counter() - started))
+    return report
+
+
+def init_replicas(app):
+    """Маршрутизация чтения на реплики, если они заданы в SQLALCHEMY_REPLICA_URIS"""
+    keys = replica_keys(app.config)
+    if not keys:
+        return None
+
+    max_lag = app.config['DB_REPLICA_MAX_LAG_SECONDS']
+    router = ReplicaRouter(
+        app,
+        keys,
+        max_lag=max_lag,
+        check_seconds=app.config['DB_REPLICA_CHECK_SECONDS'],
+        written=make_cache(app, 'replica_written', max_size=app.config['USER_CACHE_SIZE'], ttl=max_lag),
+    )
+    app.extensions['replicas'] = router
+    return router
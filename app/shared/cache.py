@@ -0,0 +1,79 @@
+"""
+Кэш общих задач по токену
+Хранит все, что нужно для ответа: отрендеренный HTML задачи, заголовок,
+ETag/Last-Modified и срок действия ссылки - повторный просмотр не трогает БД
+"""
+import hashlib
+from datetime import datetime, timezone
+from flask import current_app, render_template
+from app.cache import make_cache
+from app.extensions import db
+from app.models import SharedTask
+from app.replicas import cache_ttl
+
+
+def init_shared_cache(app):
+    app.extensions['shared_cache'] = make_cache(
+        app,
+        'shared',
+        max_size=app.config['SHARED_CACHE_SIZE'],
+        ttl=app.config['SHARED_CACHE_TTL']
+    )
+
+
+def shared_cache():
+    return current_app.extensions['shared_cache']
+
+
+def _http_date(value):
+    """Наивное локальное время из БД -> UTC для заголовка Last-Modified"""
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def build_entry(shared_task, task=None):
+    """Запись кэша для общей задачи (HTML + метаданные для условных GET)"""
+    task = task or shared_task.task
+    updated_at = task.updated_at or task.created_at or datetime.now()
+    version = f'{shared_task.token}:{updated_at.isoformat()}:{shared_task.created_at}'
+    
+    return {
+        'title': task.title,
+        'html': render_template('shared/_shared_task_body.html', task=task, shared_task=shared_task),
+        'etag': hashlib.sha1(version.encode()).hexdigest()[:20],
+        'last_modified': _http_date(updated_at).isoformat(),
+        'expires_at': shared_task.expires_at.isoformat() if shared_task.expires_at else None,
+    }
+
+
+def store(token, entry):
+    """Кладет запись в кэш, не дольше чем живет сама ссылка"""
+    ttl = current_app.config['SHARED_CACHE_TTL']
+    if entry['expires_at']:
+        left = (datetime.fromisoformat(entry['expires_at']) - datetime.now()).total_seconds()
+        if left <= 0:
+            return
+        ttl = min(ttl, int(left) + 1)
+    # Запись, построенная по реплике, может отставать - живет не дольше допустимого отставания
+    shared_cache().set(token, entry, ttl=cache_ttl(ttl))
+
+
+def is_expired(entry):
+    return bool(entry['expires_at']) and datetime.now() > datetime.fromisoformat(entry['expires_at'])
+
+
+def invalidate(*tokens):
+    cache = shared_cache()
+    for token in tokens:
+        if token:
+            cache.delete(token)
+
+
+def tokens_for(user_id, task_ids):
+    """Токены общих ссылок задач пользователя (собрать до изменений, сбросить кэш после commit)"""
+    if not task_ids:
+        return []
+    rows = db.session.query(SharedTask.token).filter(
+        SharedTask.user_id == user_id,
+        SharedTask.task_id.in_(task_ids)
+    )
+    return [row.token for row in rows]
@@ -1,26 +1,78 @@
 """
 Маршруты для просмотра общих задач
 """
-from flask import Blueprint, render_template, flash, redirect, url_for
+from datetime import datetime
+from flask import Blueprint, render_template, flash, redirect, url_for, request, Response, make_response, abort
+from sqlalchemy.orm import joinedload
 from app.models import SharedTask, Task
+from app.shared import cache
+from app.query_budget import query_budget
+from app.replicas import read_only, reading_replica, use_primary
+from app.tasks.archive import get_archived
 
 # Создай blueprint
 shared_bp = Blueprint('shared', __name__, url_prefix='/shared')
 
 
+def _not_modified(entry):
+    """У браузера актуальная версия (If-None-Match / If-Modified-Since)"""
+    if request.if_none_match:
+        return entry['etag'] in request.if_none_match
+    if request.if_modified_since:
+        return request.if_modified_since >= datetime.fromisoformat(entry['last_modified'])
+    return False
+
+
+def _expired_response(token):
+    cache.invalidate(token)
+    flash('❌ Ссылка истекла', 'danger')
+    return redirect(url_for('auth.login'))
+
+
 @shared_bp.route('/task/<token>')
+@query_budget(2)
+@read_only
 def view_shared_task(token):
     """Просмотр общей задачи по токену (без авторизации)"""
     
-    # Найди общую задачу по токену
-    shared_task = SharedTask.query.filter_by(token=token).first_or_404()
+    # Повторные просмотры обслуживаются из кэша без БД
+    entry = cache.shared_cache().get(token)
     
-    # Проверь что ссылка не истекла
-    if shared_task.is_expired():
-        flash('❌ Ссылка истекла', 'danger')
-        return redirect(url_for('auth.login'))
+    if entry is None:
+        # Найди общую задачу по токену
+        query = SharedTask.query.options(joinedload(SharedTask.task)).filter_by(token=token)
+        shared_task = query.first()
+        if shared_task is None and reading_replica():
+            # Ссылку могли создать только что - на реплику она еще не доехала
+            use_primary()
+            shared_task = query.first()
+        if shared_task is None:
+            abort(404)
+        
+        # Проверь что ссылка не истекла
+        if shared_task.is_expired():
+            return _expired_response(token)
+        
+        # Задачи нет в tasks - она в архиве
+        task = shared_task.task or get_archived(shared_task.task_id)
+        if task is None:
+            abort(404)
+        
+        entry = cache.build_entry(shared_task, task)
+        cache.store(token, entry)
+    elif cache.is_expired(entry):
+        return _expired_response(token)
     
-    # Получи основную задачу
-    task = shared_task.task
+    if _not_modified(entry):
+        response = Response(status=304)
+    else:
+        response = make_response(render_template(
+            'shared/view_shared_task.html',
+            title=entry['title'],
+            task_html=entry['html']
+        ))
     
-    return render_template('shared/view_shared_task.html', task=task, shared_task=shared_task)
+    response.set_etag(entry['etag'])
+    response.last_modified = datetime.fromisoformat(entry['last_modified'])
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,64 @@
+"""
+Удаление истекших общих ссылок
+Срок ссылки проверяется только при просмотре (SharedTask.is_expired), поэтому
+истекшие строки копятся в shared_tasks вместе с индексом токенов. Чистка идет
+пачками по индексу expires_at: каждая пачка - короткая транзакция, блокировка
+записи не держится на все удаление
+
+    report = sweep_expired(batch_size=1000)
+
+Периодически чистку запускают обработчики очереди (SHARED_SWEEP_SECONDS),
+по требованию - python manage.py shared sweep
+"""
+import time
+from datetime import datetime
+from sqlalchemy import func
+from app.extensions import db
+from app.models import SharedTask
+
+
+def _expired(now):
+    # Сравнение по expires_at подразумевает IS NOT NULL - подходит частичный индекс
+    return SharedTask.expires_at < now
+
+
+def count_expired(now=None):
+    """Сколько истекших ссылок ждут удаления"""
+    return db.session.query(func.count(SharedTask.id)).filter(_expired(now or datetime.now())).scalar()
+
+
+def sweep_expired(batch_size=1000, now=None, on_batch=None):
+    """
+    Удаляет ссылки с истекшим сроком пачками по batch_size
+    on_batch(номер пачки, удалено, секунд) вызывается после каждой пачки
+    Возвращает отчет: deleted, batches ([{rows, seconds}]), seconds
+
+    Кэш просмотров не сбрасывается: запись в нем живет не дольше самой ссылки
+    (app/shared/cache.py, store)
+    """
+    now = now or datetime.now()
+    report = {'deleted': 0, 'batches': [], 'seconds': 0.0}
+    started = time.perf_counter()
+    
+    while True:
+        batch_started = time.perf_counter()
+        ids = [row.id for row in db.session.query(SharedTask.id).filter(
+            _expired(now)
+        ).order_by(SharedTask.expires_at).limit(batch_size)]
+        if not ids:
+            db.session.commit()
+            break
+        
+        db.session.query(SharedTask).filter(SharedTask.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        
+        seconds = time.perf_counter() - batch_started
+        report['deleted'] += len(ids)
+        report['batches'].append({'rows': len(ids), 'seconds': round(seconds, 4)})
+        if on_batch:
+            on_batch(len(report['batches']), len(ids), seconds)
+        if len(ids) < batch_size:
+            break
+    
+    report['seconds'] = time.perf_counter() - started
+    return report
@@ -0,0 +1,66 @@
+"""
+Запуск приложения: профиль фаз create_app, кэш байткода Jinja и прогрев
+
+    STARTUP_PROFILE=true python run.py     # время импорта и каждой фазы - в stderr
+
+Подробно по модулям: python -X importtime -c "import app" (benchmarks/bench_startup.py
+сводит это по пакетам и меряет время до первого ответа)
+"""
+import sys
+import time
+from jinja2 import FileSystemBytecodeCache
+
+
+class StartupProfile:
+    """
+    Отметки времени фаз запуска: mark('фаза') - сколько прошло с предыдущей отметки
+    Отметки ставятся всегда (это пара perf_counter), печатаются при STARTUP_PROFILE
+    """
+    
+    def __init__(self, import_seconds=0.0):
+        self.phases = [('импорт app (flask, sqlalchemy)', import_seconds)]
+        self._last = time.perf_counter()
+    
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+    
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+    
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        width = max(len(name) for name, _ in self.phases)
+        print(f'⏱️ Запуск приложения: {self.total * 1000:.1f} мс', file=stream)
+        for name, seconds in self.phases:
+            print(f'   {name:<{width}} {seconds * 1000:>8.1f} мс', file=stream)
+        stream.flush()
+
+
+def init_templates(app):
+    """
+    Кэш байткода Jinja: шаблон компилируется один раз, следующие процессы читают
+    готовый байткод (ключ - имя и контрольная сумма исходника, правка шаблона
+    дает новую запись). JINJA_BYTECODE_CACHE_DIR = None - временная папка Jinja
+    """
+    if not app.config['JINJA_BYTECODE_CACHE']:
+        return
+    directory = app.config['JINJA_BYTECODE_CACHE_DIR']
+    if directory:
+        import os
+        os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def warm_up(app):
+    """
+    Прогрев (STARTUP_WARMUP): все шаблоны и мапперы SQLAlchemy готовятся при старте,
+    а не на первом запросе. С serve.py --preload - один раз в мастере до fork
+    """
+    from sqlalchemy.orm import configure_mappers
+    
+    configure_mappers()
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
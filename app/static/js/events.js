@@ -0,0 +1,98 @@
+/**
+ * Events Module - Живые обновления из потока /events (Server-Sent Events)
+ * Вкладка не перезагружает страницы и не опрашивает сервер: изменения задач
+ * (в этой и других вкладках) приходят событиями и правят DOM на месте
+ */
+
+const MyTasksEvents = {
+    connected: false,
+    handlers: {},
+
+    /**
+     * Подписка страницы на событие: task (изменение задачи), resync (данные
+     * могли устареть - поток переподключился или вкладка отстала)
+     */
+    on(event, handler) {
+        (this.handlers[event] = this.handlers[event] || []).push(handler);
+    },
+
+    emit(event, data) {
+        (this.handlers[event] || []).forEach(handler => handler(data));
+    }
+};
+
+window.MyTasksEvents = MyTasksEvents;
+
+/**
+ * Подключение к /events (EventSource сам переподключается после обрыва)
+ */
+function initializeEventStream() {
+    if (!('EventSource' in window)) return;
+
+    const source = new EventSource('/events');
+    let opened = false;
+
+    source.addEventListener('open', function() {
+        MyTasksEvents.connected = true;
+        // Пока соединения не было, события могли пройти мимо
+        if (opened) {
+            MyTasksEvents.emit('resync', {});
+        }
+        opened = true;
+    });
+
+    source.addEventListener('error', function() {
+        MyTasksEvents.connected = false;
+    });
+
+    source.addEventListener('task', function(e) {
+        MyTasksEvents.emit('task', JSON.parse(e.data));
+    });
+
+    source.addEventListener('resync', function() {
+        MyTasksEvents.emit('resync', {});
+    });
+
+    // Уход со страницы: закрыть поток сразу, не дожидаясь пинга сервера
+    window.addEventListener('pagehide', () => source.close());
+}
+
+/**
+ * Дашборд: после изменения задач перечитать сводку (JSON с ETag из кэша статистики)
+ * Несколько событий подряд - один запрос
+ */
+function initializeLiveDashboard() {
+    const dashboard = document.querySelector('[data-live-dashboard]');
+    if (!dashboard) return;
+
+    let timer = null;
+
+    const refresh = () => {
+        Promise.all([
+            fetch('/statistics/api/daily-stats').then(response => response.json()),
+            fetch('/statistics/api/weekly-stats').then(response => response.json())
+        ]).then(([daily, weekly]) => {
+            ['today_created', 'today_completed', 'active', 'calculated_at'].forEach(key => {
+                const element = dashboard.querySelector(`[data-stat="${key}"]`);
+                if (element) element.textContent = daily[key];
+            });
+            weekly.forEach(day => {
+                const element = dashboard.querySelector(`[data-week-day="${day.date}"] .count`);
+                if (element) element.textContent = day.created;
+            });
+        });
+    };
+
+    const schedule = () => {
+        clearTimeout(timer);
+        timer = setTimeout(refresh, 300);
+    };
+
+    MyTasksEvents.on('task', schedule);
+    MyTasksEvents.on('resync', schedule);
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    initializeLiveDashboard();
+    initializeEventStream();
+});
@@ -17,7 +17,7 @@ function initializeTaskSearch() {
         let visibleCount = 0;
         
         rows.forEach(row => {
-            const taskTitle = row.querySelector('td:nth-child(2)').textContent.toLowerCase();
+            const taskTitle = row.querySelector('td:nth-child(3)').textContent.toLowerCase();
             const taskDescription = row.getAttribute('data-description')?.toLowerCase() || '';
             
             if (taskTitle.includes(query) || taskDescription.includes(query)) {
@@ -36,7 +36,7 @@ function initializeTaskSearch() {
                 const row = document.createElement('tr');
                 row.className = 'no-results';
                 row.innerHTML = `
-                    <td colspan="5" class="text-center text-muted py-4">
+                    <td colspan="6" class="text-center text-muted py-4">
                         <i class="fas fa-search fa-2x mb-2"></i>
                         <p>Задач не найдено по запросу "${query}"</p>
                     </td>
@@ -222,18 +222,335 @@ function initializeQuickAddTask() {
     });
 }
 
+/**
+ * Отправка пакета операций одной транзакцией (POST /tasks/api/batch)
+ */
+function sendBatch(operations) {
+    return fetch('/tasks/api/batch', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ operations: operations })
+    }).then(response => response.json());
+}
+
 /**
  * Пакетные операции с задачами
  */
 function initializeBatchOperations() {
     const selectAllCheckbox = document.querySelector('[data-select-all]');
-    if (!selectAllCheckbox) return;
+    const toolbar = document.querySelector('#batch-toolbar');
+    if (!selectAllCheckbox || !toolbar) return;
+    
+    const selectedIds = () => Array.from(
+        document.querySelectorAll('input[data-task-checkbox]:checked')
+    ).map(checkbox => parseInt(checkbox.value, 10));
+    
+    // Кнопки активны только когда что-то отмечено
+    const updateToolbar = () => {
+        const count = selectedIds().length;
+        toolbar.querySelector('[data-batch-count]').textContent = count;
+        toolbar.querySelectorAll('button, select').forEach(control => {
+            control.disabled = count === 0;
+        });
+    };
     
     selectAllCheckbox.addEventListener('change', function() {
         document.querySelectorAll('input[data-task-checkbox]').forEach(checkbox => {
             checkbox.checked = this.checked;
         });
+        updateToolbar();
     });
+    
+    // Делегирование: строки могут подгружаться прокруткой
+    document.querySelector('#task-table tbody').addEventListener('change', function(e) {
+        if (e.target.matches('input[data-task-checkbox]')) {
+            updateToolbar();
+        }
+    });
+    
+    const run = operations => {
+        sendBatch(operations).then(data => {
+            if (data.success) {
+                location.reload();
+            } else {
+                alert(data.error || 'Ошибка пакетной операции');
+            }
+        });
+    };
+    
+    toolbar.querySelectorAll('[data-batch-op]').forEach(button => {
+        button.addEventListener('click', function() {
+            const op = this.dataset.batchOp;
+            const ids = selectedIds();
+            if (op === 'delete' && !confirm(`Удалить задач: ${ids.length}?`)) return;
+            run(ids.map(id => ({ op: op, id: id })));
+        });
+    });
+    
+    toolbar.querySelector('[data-batch-priority]').addEventListener('change', function() {
+        if (!this.value) return;
+        run(selectedIds().map(id => ({ op: 'priority', id: id, priority: this.value })));
+    });
+}
+
+// ========== БЕСКОНЕЧНАЯ ПРОКРУТКА ==========
+
+const PRIORITY_BADGES = {
+    high: '<span class="badge bg-danger">🔴 Высокий</span>',
+    medium: '<span class="badge bg-warning">🟡 Средний</span>',
+    low: '<span class="badge bg-success">🟢 Низкий</span>'
+};
+
+/**
+ * Экранирование HTML для данных из API
+ */
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text ?? '';
+    return div.innerHTML;
+}
+
+/**
+ * Строка таблицы для задачи из /tasks/api/list (как в task_list.html)
+ */
+function renderTaskRow(task) {
+    const row = document.createElement('tr');
+    if (task.completed) {
+        row.className = 'table-success completed-task';
+    }
+    row.dataset.taskId = task.id;
+    row.dataset.priority = task.priority;
+    row.dataset.created = task.created_at;
+    row.setAttribute('data-description', task.description || '');
+    
+    const created = new Date(task.created_at).toLocaleDateString('ru-RU');
+    const icon = task.completed
+        ? '<i class="fas fa-check-circle text-success fa-lg"></i>'
+        : '<i class="far fa-circle text-muted fa-lg"></i>';
+    
+    row.innerHTML = `
+        <td>
+            <input type="checkbox" class="form-check-input" data-task-checkbox value="${task.id}">
+        </td>
+        <td>
+            <button class="btn btn-sm toggle-task-btn" data-task-id="${task.id}" data-completed="${task.completed}">
+                ${icon}
+            </button>
+        </td>
+        <td>
+            <a href="/tasks/${task.id}" class="text-decoration-none">
+                <strong>${escapeHtml(task.title)}</strong>
+            </a>
+        </td>
+        <td>${PRIORITY_BADGES[task.priority] || PRIORITY_BADGES.low}</td>
+        <td><small class="text-muted">${created}</small></td>
+        <td>
+            <a href="/tasks/${task.id}" class="btn btn-sm btn-outline-primary"><i class="fas fa-eye"></i></a>
+            <a href="/tasks/${task.id}/edit" class="btn btn-sm btn-outline-warning"><i class="fas fa-edit"></i></a>
+            <form method="POST" action="/tasks/${task.id}/delete" style="display:inline;"
+                  onsubmit="return confirm('Удалить задачу?');">
+                <button type="submit" class="btn btn-sm btn-outline-danger"><i class="fas fa-trash"></i></button>
+            </form>
+        </td>
+    `;
+    return row;
+}
+
+/**
+ * Подгрузка следующих задач по курсору при прокрутке до конца списка
+ */
+function initializeInfiniteScroll() {
+    const pagination = document.querySelector('#task-pagination');
+    const tbody = document.querySelector('#task-table tbody');
+    if (!pagination || !tbody || !('IntersectionObserver' in window)) return;
+    
+    let cursor = pagination.dataset.nextCursor;
+    let loading = false;
+    
+    // С JS ссылка "Вперед" не нужна: страницы подгружаются сами
+    pagination.querySelector('ul').style.display = 'none';
+    
+    const observer = new IntersectionObserver(entries => {
+        if (!entries[0].isIntersecting || loading || !cursor) return;
+        loading = true;
+        
+        const params = new URLSearchParams({
+            cursor: cursor,
+            limit: 10,
+            filter: pagination.dataset.listFilter || 'all'
+        });
+        // Страница поиска подгружает результаты из /tasks/api/search
+        if (pagination.dataset.query) {
+            params.set('q', pagination.dataset.query);
+        }
+        
+        fetch(`${pagination.dataset.api || '/tasks/api/list'}?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                data.tasks.forEach(task => {
+                    // Задача могла уже прийти событием /events
+                    tbody.querySelector(`tr[data-task-id="${task.id}"]`)?.remove();
+                    tbody.appendChild(renderTaskRow(task));
+                });
+                cursor = data.next_cursor;
+                pagination.dataset.nextCursor = cursor || '';
+                if (!cursor) observer.disconnect();
+            })
+            .finally(() => {
+                loading = false;
+            });
+    }, { rootMargin: '200px' });
+    
+    if (cursor) {
+        observer.observe(pagination);
+    }
+}
+
+/**
+ * AJAX переключение статуса задачи (делегирование: работает и для подгруженных строк)
+ */
+function initializeToggleButtons() {
+    const tbody = document.querySelector('#task-table tbody');
+    if (!tbody) return;
+    
+    tbody.addEventListener('click', function(e) {
+        const button = e.target.closest('.toggle-task-btn');
+        if (!button) return;
+        
+        const taskId = button.dataset.taskId;
+        
+        fetch(`/tasks/${taskId}/toggle`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            // Строку и счетчики обновит событие из /events; без потока - перезагрузка
+            if (data.success && !window.MyTasksEvents?.connected) {
+                location.reload();
+            }
+        });
+    });
+}
+
+// ========== ЖИВЫЕ ОБНОВЛЕНИЯ ==========
+
+const PRIORITY_RANKS = {high: 3, medium: 2, low: 1};
+
+/**
+ * true если задача стоит в списке выше строки (порядок TASK_LIST_ORDER:
+ * активные, приоритет, новые, id - все по убыванию кроме статуса)
+ */
+function taskBeforeRow(task, row) {
+    const completed = row.classList.contains('completed-task');
+    if (task.completed !== completed) return !task.completed;
+    
+    const rank = PRIORITY_RANKS[task.priority] || 0;
+    const rowRank = PRIORITY_RANKS[row.dataset.priority] || 0;
+    if (rank !== rowRank) return rank > rowRank;
+    
+    if (task.created_at !== row.dataset.created) return task.created_at > row.dataset.created;
+    return task.id > parseInt(row.dataset.taskId, 10);
+}
+
+/**
+ * Список задач меняется событиями /events: строка добавляется, перерисовывается
+ * на своем месте или удаляется, счетчики - из события
+ */
+function initializeLiveTaskList() {
+    const counters = document.querySelector('[data-task-counters]');
+    if (!counters || !window.MyTasksEvents) return;
+    
+    const tbody = document.querySelector('#task-table tbody');
+    const pagination = document.querySelector('#task-pagination');
+    const filter = pagination ? pagination.dataset.listFilter : 'all';
+    
+    // Скрытая вкладка перечитывает страницу, только когда ее откроют
+    const reload = () => {
+        if (document.hidden) {
+            document.addEventListener('visibilitychange', () => location.reload(), {once: true});
+        } else {
+            location.reload();
+        }
+    };
+    
+    const setCounter = (name, value) => {
+        counters.querySelector(`[data-counter="${name}"]`).textContent = value;
+    };
+    
+    MyTasksEvents.on('task', event => {
+        if (event.counters) {
+            const {total, completed, active} = event.counters;
+            setCounter('total', total);
+            setCounter('completed', completed);
+            setCounter('active', active);
+            setCounter('percent', `${total > 0 ? Math.floor(completed / total * 100) : 0}%`);
+        }
+        
+        // Пустой список (таблицы нет) или много изменений сразу - проще перечитать страницу
+        if (event.op === 'bulk' || (!tbody && event.op === 'created')) {
+            reload();
+            return;
+        }
+        if (!tbody) return;
+        
+        const task = event.task;
+        tbody.querySelector(`tr[data-task-id="${task.id}"]`)?.remove();
+        if (event.op === 'deleted') return;
+        if (filter === 'archived') return;  // измененная задача уже вернулась из архива
+        if (filter === 'active' && task.completed) return;
+        if (filter === 'completed' && !task.completed) return;
+        
+        const next = Array.from(tbody.querySelectorAll('tr[data-task-id]')).find(row => taskBeforeRow(task, row));
+        if (next) {
+            tbody.insertBefore(renderTaskRow(task), next);
+        } else if (!pagination || !pagination.dataset.nextCursor) {
+            // Ниже всех загруженных строк: вставлять, только если дальше страниц нет
+            // (иначе задача придет своей страницей при прокрутке)
+            tbody.appendChild(renderTaskRow(task));
+        }
+    });
+    
+    // Поток переподключился или вкладка отстала - события могли потеряться
+    MyTasksEvents.on('resync', reload);
+}
+
+/**
+ * Опрос статуса фоновой задачи (/jobs/<id>) до завершения
+ */
+function initializeJobStatus() {
+    const block = document.querySelector('#job-status');
+    if (!block) return;
+    
+    const labels = {queued: 'В очереди', running: 'Выполняется', done: 'Готово', failed: 'Ошибка'};
+    const field = name => block.querySelector(`[data-job-field="${name}"]`);
+    
+    function poll() {
+        fetch(block.dataset.jobUrl, {headers: {'Accept': 'application/json'}})
+            .then(response => response.json())
+            .then(job => {
+                field('status').textContent = labels[job.status] || job.status;
+                if (job.result) {
+                    field('imported').textContent = job.result.imported;
+                    field('failed').textContent = job.result.failed;
+                }
+                if (job.status === 'done' || job.status === 'failed') {
+                    block.querySelector('.spinner-border').remove();
+                    if (job.error) {
+                        field('error').textContent = job.error;
+                        field('error').classList.remove('d-none');
+                    }
+                    return;
+                }
+                setTimeout(poll, 1000);
+            });
+    }
+    
+    poll();
 }
 
 // ========== ИНИЦИАЛИЗАЦИЯ ==========
@@ -247,6 +564,10 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeModals();
     initializeQuickAddTask();
     initializeBatchOperations();
+    initializeInfiniteScroll();
+    initializeToggleButtons();
+    initializeJobStatus();
+    initializeLiveTaskList();
     
     console.log('✅ Tasks module initialized');
 });
@@ -0,0 +1,91 @@
+"""
+Агрегаты для статистики
+Счетчики по дням и за последние дни считаются одним SELECT
+через условные SUM(CASE ...) по полуоткрытым окнам [начало; конец)
+"""
+from datetime import datetime, time, timedelta
+from sqlalchemy import func, case, and_
+from app.extensions import db
+from app.models import Task
+
+
+DAY_NAMES = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+PRIORITIES = ['high', 'medium', 'low']
+
+
+def day_start(day):
+    """Возвращает начало дня (00:00) как datetime"""
+    return datetime.combine(day, time.min)
+
+
+def in_window(column, start, end):
+    """Полуоткрытое окно start <= column < end (индекс по колонке используется)"""
+    return and_(column >= start, column < end)
+
+
+def count_if(*conditions):
+    """SUM(CASE WHEN ... THEN 1 ELSE 0 END) с нулем вместо NULL"""
+    return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
+
+
+def collect_stats(user_id, first_day=None, days=0, since=None):
+    """
+    Считает статистику пользователя одним запросом по задачам, созданным
+    начиная с min(first_day, since): индекс (user_id, created_at) читает только
+    окно, время не растет с числом задач пользователя (итоги - в app/counters.py)
+
+    Возвращает словарь со списком days из `days` дней начиная с first_day:
+    created - создано за день, created_completed - из созданных за день уже завершено
+
+    Если передан since, добавляется ключ recent - счетчики по задачам,
+    созданным начиная с since (total, completed, active, priorities).
+    Строки задач в Python не загружаются, только числа
+    """
+    dates = [first_day + timedelta(days=i) for i in range(days)]
+    starts = [day_start(dates[0])] if dates else []
+    if since is not None:
+        starts.append(since)
+    if not starts:
+        return {'days': []}
+
+    columns = []
+    for date in dates:
+        start = day_start(date)
+        end = start + timedelta(days=1)
+        columns.append(count_if(in_window(Task.created_at, start, end)))
+        columns.append(count_if(Task.completed == True, in_window(Task.created_at, start, end)))
+
+    if since is not None:
+        recent = Task.created_at >= since
+        columns.append(count_if(recent))
+        columns.append(count_if(recent, Task.completed == True))
+        for priority in PRIORITIES:
+            columns.append(count_if(recent, Task.priority == priority))
+
+    row = db.session.query(*columns).filter(
+        Task.user_id == user_id,
+        Task.created_at >= min(starts)
+    ).one()
+    row = [int(value or 0) for value in row]
+
+    buckets = []
+    for i, date in enumerate(dates):
+        created, created_done = row[i * 2:i * 2 + 2]
+        buckets.append({
+            'date': date,
+            'created': created,
+            'created_completed': created_done,
+        })
+
+    stats = {'days': buckets}
+
+    if since is not None:
+        recent_row = row[days * 2:]
+        stats['recent'] = {
+            'total': recent_row[0],
+            'completed': recent_row[1],
+            'active': recent_row[0] - recent_row[1],
+            'priorities': dict(zip(PRIORITIES, recent_row[2:])),
+        }
+
+    return stats
@@ -0,0 +1,178 @@
+"""
+Аналитика за длинный период (30/90/365 дней): тренды, процентили времени
+выполнения, серии дней с завершенными задачами, тепловая карта по дням недели
+
+Данные - готовые сводки счетчиков (app/counters.py), а не строки задач: дневные
+created/completed и гистограмма времени выполнения по дням завершения. Из БД
+приходят только их колонки (на год - сотни дней и тысячи корзин при любом числе
+задач), все метрики считает NumPy векторно (bincount, cumsum, searchsorted)
+"""
+from datetime import date, datetime, timedelta
+import numpy as np
+from app.counters import BUCKETS_PER_DOUBLING, get_counters
+from app.extensions import db
+from app.models import UserDailyStats, UserLatencyStats
+from app.statistics.aggregates import DAY_NAMES
+
+
+MAX_DAYS = 731  # самый длинный период (два года)
+PERCENTILES = (50, 75, 90, 99)
+
+
+class RangeError(ValueError):
+    """Неверный период (?from=&to=)"""
+
+
+def parse_range(start, end, today=None):
+    """
+    Период из параметров запроса (YYYY-MM-DD), обе даты включительно
+    По умолчанию - последние 30 дней по сегодня
+    """
+    today = today or datetime.now().date()
+    try:
+        end = date.fromisoformat(end) if end else today
+        start = date.fromisoformat(start) if start else end - timedelta(days=29)
+    except ValueError:
+        raise RangeError('Даты в формате ГГГГ-ММ-ДД')
+    if start > end:
+        raise RangeError('Начало периода позже конца')
+    if (end - start).days + 1 > MAX_DAYS:
+        raise RangeError(f'Период не длиннее {MAX_DAYS} дней')
+    return start, end
+
+
+def _day_columns(user_id, start, end):
+    """Дневные сводки периода: номер дня от start, создано, завершено (массивы)"""
+    rows = db.session.query(
+        UserDailyStats.day, UserDailyStats.created, UserDailyStats.completed
+    ).filter(
+        UserDailyStats.user_id == user_id,
+        UserDailyStats.day >= start,
+        UserDailyStats.day <= end
+    ).all()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    days, created, completed = zip(*rows)
+    offsets = np.array([day.toordinal() for day in days], dtype=np.int64) - start.toordinal()
+    return offsets, np.array(created, dtype=np.int64), np.array(completed, dtype=np.int64)
+
+
+def _latency_columns(user_id, start, end):
+    """Гистограмма времени выполнения задач, завершенных в периоде: корзина, число задач"""
+    rows = db.session.query(UserLatencyStats.bucket, UserLatencyStats.completed).filter(
+        UserLatencyStats.user_id == user_id,
+        UserLatencyStats.day >= start,
+        UserLatencyStats.day <= end
+    ).all()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    buckets, counts = zip(*rows)
+    return np.array(buckets, dtype=np.int64), np.array(counts, dtype=np.int64)
+
+
+def latency_percentiles(buckets, counts, percentiles=PERCENTILES):
+    """
+    Процентили (в секундах) по гистограмме: корзина процентиля - searchsorted по
+    накопленной сумме, внутри корзины - интерполяция по логарифмической шкале
+    """
+    hist = np.bincount(buckets, weights=np.maximum(counts, 0)) if len(buckets) else np.zeros(0)
+    total = hist.sum()
+    if not total:
+        return {f'p{p}': None for p in percentiles}
+
+    cumulative = np.cumsum(hist)
+    targets = np.array(percentiles, dtype=np.float64) / 100 * total
+    index = np.searchsorted(cumulative, targets)
+    before = np.where(index > 0, cumulative[index - 1], 0)
+    fraction = (targets - before) / hist[index]
+    seconds = 2 ** ((index + fraction) / BUCKETS_PER_DOUBLING)
+    return {f'p{p}': int(round(value)) for p, value in zip(percentiles, seconds)}
+
+
+def streaks(active):
+    """
+    Серии подряд идущих дней с завершенными задачами (active - bool по дням периода):
+    самая длинная (longest_end - номер ее последнего дня) и текущая - заканчивается
+    последним днем или днем раньше (сегодня еще не поздно)
+    """
+    padded = np.concatenate(([False], active, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)  # первый день после серии
+    if not len(starts):
+        return {'longest': 0, 'longest_end': None, 'current': 0}
+
+    lengths = ends - starts
+    best = int(np.argmax(lengths))
+    current = 0
+    if ends[-1] >= len(active) - 1:
+        current = int(lengths[-1])
+    return {'longest': int(lengths[best]), 'longest_end': int(ends[best] - 1), 'current': current}
+
+
+def range_stats(user_id, start, end):
+    """Аналитика пользователя за период [start; end] (даты включительно) для JSON"""
+    # Сводки пользователя построены (первое обращение после миграции строит их)
+    get_counters(user_id)
+
+    days = (end - start).days + 1
+    offsets, created_rows, completed_rows = _day_columns(user_id, start, end)
+    created = np.bincount(offsets, weights=created_rows, minlength=days).astype(np.int64)
+    completed = np.bincount(offsets, weights=completed_rows, minlength=days).astype(np.int64)
+
+    # Скользящее среднее завершений за 7 дней (первые дни - по тому, что есть)
+    window = np.convolve(completed, np.ones(7), mode='full')[:days]
+    average = window / np.minimum(np.arange(1, days + 1), 7)
+
+    # По дням недели: суммы и тепловая карта неделя x день недели (как календарь)
+    first_weekday = start.weekday()
+    positions = np.arange(days) + first_weekday
+    weekdays = positions % 7
+    weeks = positions // 7
+    heatmap = np.zeros((weeks[-1] + 1, 7), dtype=np.int64)
+    heatmap[weeks, weekdays] = completed
+    weekday_days = np.bincount(weekdays, minlength=7)
+
+    series = streaks(completed > 0)
+
+    buckets, counts = _latency_columns(user_id, start, end)
+    total_created = int(created.sum())
+    total_completed = int(completed.sum())
+    dates = [start + timedelta(days=i) for i in range(days)]
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'days': days,
+        'totals': {
+            'created': total_created,
+            'completed': total_completed,
+            'per_day': round(total_completed / days, 2),
+            'best_day': dates[int(np.argmax(completed))].isoformat() if total_completed else None,
+        },
+        'trend': {
+            'dates': [day.isoformat() for day in dates],
+            'created': created.tolist(),
+            'completed': completed.tolist(),
+            'completed_avg7': np.round(average, 2).tolist(),
+        },
+        'latency': {
+            'completed': int(np.maximum(counts, 0).sum()),
+            **latency_percentiles(buckets, counts),
+        },
+        'streaks': {
+            **series,
+            'longest_end': dates[series['longest_end']].isoformat() if series['longest'] else None,
+        },
+        'weekdays': {
+            'names': DAY_NAMES,
+            'created': np.bincount(weekdays, weights=created, minlength=7).astype(np.int64).tolist(),
+            'completed': np.bincount(weekdays, weights=completed, minlength=7).astype(np.int64).tolist(),
+            'days': weekday_days.tolist(),
+        },
+        'heatmap': {
+            'week_starts': [(start - timedelta(days=first_weekday) + timedelta(weeks=i)).isoformat()
+                            for i in range(len(heatmap))],
+            'completed': heatmap.tolist(),
+        },
+    }
@@ -0,0 +1,90 @@
+"""
+Кэш ответов статистики по пользователю
+Ключ: пользователь + эндпоинт + версия данных пользователя + сегодняшняя дата
+Версия сбрасывается (bump) при любом изменении задач пользователя,
+старые записи просто перестают находиться и вытесняются LRU
+"""
+import hashlib
+import uuid
+from datetime import datetime
+from flask import current_app, request, Response
+from app.cache import make_cache
+from app.replicas import user_wrote
+
+
+class StatsCache:
+    """Кэш JSON-ответов и отрендеренных фрагментов статистики"""
+    
+    def __init__(self, backend):
+        self.backend = backend
+    
+    def version(self, user_id):
+        """Текущая версия данных пользователя (создается при первом обращении)"""
+        key = f'ver:{user_id}'
+        version = self.backend.get(key)
+        if version is None:
+            version = uuid.uuid4().hex[:12]
+            self.backend.set(key, version, ttl=0)
+        return version
+    
+    def bump(self, user_id):
+        """
+        Задачи пользователя изменились: все его записи становятся неактуальны
+        (delete, а не новая версия: сброс локального кэша доходит до других процессов)
+        """
+        self.backend.delete(f'ver:{user_id}')
+    
+    def _key(self, user_id, name):
+        today = datetime.now().date().isoformat()
+        return f'{user_id}:{name}:{today}:{self.version(user_id)}'
+    
+    def etag(self, user_id, name):
+        return hashlib.sha1(self._key(user_id, name).encode()).hexdigest()[:20]
+    
+    def get_or_build(self, user_id, name, build):
+        """Значение из кэша или build() с сохранением"""
+        key = self._key(user_id, name)
+        value = self.backend.get(key)
+        if value is None:
+            value = build()
+            self.backend.set(key, value)
+        return value
+
+
+def init_stats_cache(app):
+    app.extensions['stats_cache'] = StatsCache(make_cache(
+        app,
+        'stats',
+        max_size=app.config['STATS_CACHE_SIZE'],
+        ttl=app.config['STATS_CACHE_TTL']
+    ))
+
+
+def stats_cache():
+    return current_app.extensions['stats_cache']
+
+
+def tasks_changed(user_id):
+    """Вызывается после изменения задач пользователя (создание, правка, удаление, статус)"""
+    stats_cache().bump(user_id)
+    # Пока реплики могут не знать об изменении, его чтения идут на основную БД
+    user_wrote(user_id)
+
+
+def cached_json(user_id, name, build):
+    """
+    JSON ответ из кэша с ETag и Cache-Control: private
+    Если у браузера актуальная версия (If-None-Match) - 304 без БД и сериализации
+    """
+    cache = stats_cache()
+    etag = cache.etag(user_id, name)
+    
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        body = cache.get_or_build(user_id, name, lambda: current_app.json.dumps(build()))
+        response = Response(body, mimetype='application/json')
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
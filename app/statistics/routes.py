@@ -2,12 +2,14 @@
 Маршруты для статистики и аналитики
 Окончательная версия с правильной структурой файлов
 """
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from app.models import Task
-from app.extensions import db
+from app.statistics.aggregates import collect_stats, DAY_NAMES
+from app.statistics.cache import stats_cache, cached_json
+from app.counters import read_stats, get_counters
+from app.query_budget import query_budget
+from app.replicas import read_only
 
 
 # Создай blueprint
@@ -15,168 +17,174 @@ statistics_bp = Blueprint('statistics', __name__, url_prefix='/statistics')
 
 
 
-@statistics_bp.route('/dashboard')
-@login_required
-def dashboard():
-    """Краткий дашборд со статистикой сегодня и неделей"""
+def _render_dashboard_stats(user_id):
+    """Фрагмент дашборда с данными (кэшируется целиком)"""
     
     # Сегодняшняя статистика (используй datetime.now() вместо datetime.utcnow())
     today = datetime.now().date()  # ✅ Локальное время
     
-    today_tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        func.date(Task.created_at) == today
-    ).count()
-    
-    today_completed = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.completed == True,
-        func.date(Task.completed_at) == today
-    ).count()
-    
-    # Общая статистика
-    total_tasks = Task.query.filter_by(user_id=current_user.id).count()
-    total_completed = Task.query.filter_by(user_id=current_user.id, completed=True).count()
-    total_active = total_tasks - total_completed
-    
     # Последние 7 дней
     week_ago = today - timedelta(days=7)
-    week_stats = {}
     
-    for i in range(7):
-        date = week_ago + timedelta(days=i)
-        count = Task.query.filter(
-            Task.user_id == current_user.id,
-            func.date(Task.created_at) == date
-        ).count()
-        week_stats[date.strftime('%d.%m')] = count
+    # Готовые счетчики и дневные сводки (без сканирования задач)
+    stats = read_stats(user_id, first_day=week_ago, days=7, today=today)
+    
+    week_stats = {}
+    for day in stats['days']:
+        week_stats[day['date'].strftime('%d.%m')] = day['created']
     
     return render_template(
-        'statistics/dashboard.html',
-        today_tasks=today_tasks,
-        today_completed=today_completed,
-        total_tasks=total_tasks,
-        total_active=total_active,
+        'statistics/_dashboard_stats.html',
+        today_tasks=stats['today_created'],
+        today_completed=stats['today_completed'],
+        total_tasks=stats['total'],
+        total_active=stats['active'],
         week_stats=week_stats,
         calculated_at=datetime.now().strftime('%d.%m.%Y %H:%M:%S')
     )
 
 
 
-@statistics_bp.route('/api/daily-stats')
+@statistics_bp.route('/dashboard')
 @login_required
-def api_daily_stats():
-    """API для получения статистики за день (JSON для графиков)"""
+@query_budget(3)
+@read_only
+def dashboard():
+    """Краткий дашборд со статистикой сегодня и неделей"""
     
-    today = datetime.now().date()
+    user_id = current_user.id
+    stats_html = stats_cache().get_or_build(user_id, 'dashboard', lambda: _render_dashboard_stats(user_id))
     
-    stats = {
-        'total': Task.query.filter_by(user_id=current_user.id).count(),
-        'completed': Task.query.filter_by(user_id=current_user.id, completed=True).count(),
-        'active': Task.query.filter(
-            Task.user_id == current_user.id,
-            Task.completed == False
-        ).count(),
-        'today_created': Task.query.filter(
-            Task.user_id == current_user.id,
-            func.date(Task.created_at) == today
-        ).count(),
-        'today_completed': Task.query.filter(
-            Task.user_id == current_user.id,
-            Task.completed == True,
-            func.date(Task.completed_at) == today
-        ).count(),
+    return render_template('statistics/dashboard.html', stats_html=stats_html)
+
+
+
+def _daily_stats(user_id):
+    """Данные для /api/daily-stats"""
+    
+    stats = read_stats(user_id)
+    
+    return {
+        'total': stats['total'],
+        'completed': stats['completed'],
+        'active': stats['active'],
+        'today_created': stats['today_created'],
+        'today_completed': stats['today_completed'],
         'calculated_at': datetime.now().strftime('%d.%m.%Y %H:%M:%S')
     }
-    
-    return jsonify(stats)
 
 
 
-@statistics_bp.route('/api/weekly-stats')
+@statistics_bp.route('/api/daily-stats')
 @login_required
-def api_weekly_stats():
-    """API для недельной статистики"""
+@query_budget(3)
+@read_only
+def api_daily_stats():
+    """API для получения статистики за день (JSON для графиков)"""
+    
+    user_id = current_user.id
+    return cached_json(user_id, 'daily', lambda: _daily_stats(user_id))
+
+
+
+def _weekly_stats(user_id):
+    """Данные для /api/weekly-stats"""
     
     today = datetime.now().date()
     week_ago = today - timedelta(days=7)
     
+    week = read_stats(user_id, first_day=week_ago, days=7, today=today)
+    
     stats = []
     
-    for i in range(7):
-        date = week_ago + timedelta(days=i)
-        created = Task.query.filter(
-            Task.user_id == current_user.id,
-            func.date(Task.created_at) == date
-        ).count()
-        completed = Task.query.filter(
-            Task.user_id == current_user.id,
-            Task.completed == True,
-            func.date(Task.completed_at) == date
-        ).count()
-        
+    for day in week['days']:
         stats.append({
-            'date': date.strftime('%d.%m'),
-            'day': ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс'][date.weekday()],
-            'created': created,
-            'completed': completed
+            'date': day['date'].strftime('%d.%m'),
+            'day': DAY_NAMES[day['date'].weekday()],
+            'created': day['created'],
+            'completed': day['completed']
         })
     
-    return jsonify(stats)
+    return stats
 
 
 
-@statistics_bp.route('/')
+@statistics_bp.route('/api/weekly-stats')
 @login_required
-def statistics():
-    """Полная страница статистики с детальной информацией"""
+@query_budget(3)
+@read_only
+def api_weekly_stats():
+    """API для недельной статистики"""
+    
+    user_id = current_user.id
+    return cached_json(user_id, 'weekly', lambda: _weekly_stats(user_id))
+
+
+
+@statistics_bp.route('/api/range')
+@login_required
+@query_budget(4)
+@read_only
+def api_range():
+    """API аналитики за период: ?from=ГГГГ-ММ-ДД&to=ГГГГ-ММ-ДД (по умолчанию последние 30 дней)"""
+    
+    # NumPy загружается с первым запросом аналитики, а не при старте приложения
+    from app.statistics.analytics import parse_range, range_stats, RangeError
+    
+    try:
+        start, end = parse_range(request.args.get('from'), request.args.get('to'))
+    except RangeError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    user_id = current_user.id
+    return cached_json(user_id, f'range:{start}:{end}', lambda: range_stats(user_id, start, end))
+
+
+
+def _render_statistics_stats(user_id):
+    """Фрагмент полной страницы статистики с данными (кэшируется целиком)"""
     
     # Получи дату 7 дней назад
     today = datetime.now().date()
     last_week = datetime.now() - timedelta(days=7)
     
-    # Все задачи за всё время
-    all_tasks = Task.query.filter_by(user_id=current_user.id).all()
-    total_tasks = len(all_tasks)
-    completed_tasks = sum(1 for t in all_tasks if t.completed)
-    active_tasks = total_tasks - completed_tasks
+    # Последние 7 дней и статистика по дням одним запросом (только счетчики)
+    stats = collect_stats(
+        user_id,
+        first_day=today - timedelta(days=6),
+        days=7,
+        since=last_week
+    )
     
-    # СТАТИСТИКА ЗА ПОСЛЕДНИЕ 7 ДНЕЙ
-    last_7_days_tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.created_at >= last_week
-    ).all()
+    # Итоги - из счетчиков (в tasks нет задач, перенесенных в архив)
+    user_counters = get_counters(user_id)
+    total_tasks = user_counters.total
+    completed_tasks = user_counters.completed
+    active_tasks = user_counters.active
     
-    last_7_days_total = len(last_7_days_tasks)
-    last_7_days_completed = sum(1 for t in last_7_days_tasks if t.completed)
-    last_7_days_active = last_7_days_total - last_7_days_completed
+    # СТАТИСТИКА ЗА ПОСЛЕДНИЕ 7 ДНЕЙ
+    recent = stats['recent']
+    last_7_days_total = recent['total']
+    last_7_days_completed = recent['completed']
+    last_7_days_active = recent['active']
     
     # Статистика по приоритетам (последние 7 дней)
-    last_7_high = sum(1 for t in last_7_days_tasks if t.priority == 'high')
-    last_7_medium = sum(1 for t in last_7_days_tasks if t.priority == 'medium')
-    last_7_low = sum(1 for t in last_7_days_tasks if t.priority == 'low')
+    last_7_high = recent['priorities']['high']
+    last_7_medium = recent['priorities']['medium']
+    last_7_low = recent['priorities']['low']
     
     # Статистика по дням (последние 7 дней)
     daily_stats = []
-    for i in range(6, -1, -1):  # От 6 дней назад до сегодня
-        day = datetime.now() - timedelta(days=i)
-        day_date = day.date()
-        
-        day_tasks = Task.query.filter(
-            Task.user_id == current_user.id,
-            func.date(Task.created_at) == day_date
-        ).all()
-        
+    for day in stats['days']:
         daily_stats.append({
-            'date': day_date.strftime('%d.%m'),
-            'day_name': ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс'][day.weekday()],
-            'total': len(day_tasks),
-            'completed': sum(1 for t in day_tasks if t.completed),
-            'active': len(day_tasks) - sum(1 for t in day_tasks if t.completed),
+            'date': day['date'].strftime('%d.%m'),
+            'day_name': DAY_NAMES[day['date'].weekday()],
+            'total': day['created'],
+            'completed': day['created_completed'],
+            'active': day['created'] - day['created_completed'],
         })
     
-    # ✅ ПРАВИЛЬНЫЙ ШАБЛОН: statistics.html
-    return render_template('statistics/statistics.html',
+    return render_template('statistics/_statistics_stats.html',
         # Всего задач
         total_tasks=total_tasks,
         completed_tasks=completed_tasks,
@@ -197,4 +205,19 @@ def statistics():
         
         # Дата последнего расчёта
         calculated_at=datetime.now().strftime('%d.%m.%Y %H:%M:%S')
-    )
\ No newline at end of file
+    )
+
+
+
+@statistics_bp.route('/')
+@login_required
+@query_budget(3)
+@read_only
+def statistics():
+    """Полная страница статистики с детальной информацией"""
+    
+    user_id = current_user.id
+    stats_html = stats_cache().get_or_build(user_id, 'statistics', lambda: _render_statistics_stats(user_id))
+    
+    # ✅ ПРАВИЛЬНЫЙ ШАБЛОН: statistics.html
+    return render_template('statistics/statistics.html', stats_html=stats_html)
@@ -0,0 +1,122 @@
+"""
+Архив задач (горячее и холодное хранение)
+Таблица tasks только растет: каждый ее индекс и каждая выборка списка платят за
+годы завершенных задач. Задачи, завершенные раньше TASKS_ARCHIVE_AFTER_DAYS дней
+назад, переносятся в tasks_archive (та же схема, те же id) пачками: каждая пачка -
+короткая транзакция INSERT ... SELECT + DELETE
+
+    report = archive_completed(older_than_days=90, batch_size=1000)
+
+Задача в архиве остается задачей пользователя:
+- счетчики и аналитика считают обе таблицы (app/counters.py), выгрузка - тоже
+- /tasks/<id> и общая ссылка читают архив, если в tasks строки нет
+- изменение (завершение, правка, удаление, ссылка) сначала возвращает задачу в tasks
+- в списке - фильтр "Архив"; поиск и пакетные операции - только по tasks
+
+Периодически перенос запускают обработчики очереди (TASKS_ARCHIVE_SECONDS),
+по требованию - python manage.py tasks archive
+"""
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models import Task, TaskArchive
+
+
+# Колонки, которые переносятся (в PostgreSQL у tasks есть еще search_vector)
+COLUMNS = [column.name for column in TaskArchive.__table__.columns]
+
+
+def _copy(source, target, condition):
+    """INSERT INTO target SELECT ... FROM source WHERE condition"""
+    source_table = source.__table__
+    return db.session.execute(
+        target.__table__.insert().from_select(
+            COLUMNS,
+            select(*[source_table.c[name] for name in COLUMNS]).where(condition)
+        )
+    ).rowcount
+
+
+def _archivable(cutoff):
+    return (Task.completed == True) & (Task.completed_at < cutoff)
+
+
+def cutoff_for(older_than_days, now=None):
+    return (now or datetime.now()) - timedelta(days=older_than_days)
+
+
+def count_archivable(older_than_days, now=None):
+    """Сколько задач ждут переноса в архив"""
+    cutoff = cutoff_for(older_than_days, now)
+    return db.session.query(func.count(Task.id)).filter(_archivable(cutoff)).scalar()
+
+
+def archive_completed(older_than_days, batch_size=1000, now=None, on_batch=None):
+    """
+    Переносит в архив задачи, завершенные раньше older_than_days дней назад,
+    пачками по batch_size (по возрастанию id - за весь перенос таблица читается один раз)
+    on_batch(номер пачки, перенесено, секунд) вызывается после каждой пачки
+    Возвращает отчет: archived, users (id пользователей), batches ([{rows, seconds}]), seconds
+    """
+    from app.statistics.cache import tasks_changed
+    from app.events.hub import publish_task
+    
+    cutoff = cutoff_for(older_than_days, now)
+    report = {'archived': 0, 'users': set(), 'batches': [], 'seconds': 0.0}
+    started = time.perf_counter()
+    last_id = 0
+    
+    while True:
+        batch_started = time.perf_counter()
+        # Задачу, открытую заново между выборкой и переносом, не перенести как активную:
+        # строки пачки блокируются до commit (PostgreSQL), перенос повторяет условие
+        rows = db.session.query(Task.id, Task.user_id).filter(
+            Task.id > last_id, _archivable(cutoff)
+        ).order_by(Task.id).limit(batch_size).with_for_update().all()
+        if not rows:
+            db.session.commit()
+            break
+        
+        ids = [row.id for row in rows]
+        batch = and_(Task.id.in_(ids), _archivable(cutoff))
+        moved = _copy(Task, TaskArchive, batch)
+        db.session.query(Task).filter(batch).delete(synchronize_session=False)
+        db.session.commit()
+        
+        # Списки задач изменились (итоги - нет: архивные задачи в них остаются)
+        users = {row.user_id for row in rows}
+        for user_id in users:
+            tasks_changed(user_id)
+            publish_task(user_id, 'bulk')
+        
+        seconds = time.perf_counter() - batch_started
+        last_id = ids[-1]
+        report['archived'] += moved
+        report['users'] |= users
+        report['batches'].append({'rows': moved, 'seconds': round(seconds, 4)})
+        if on_batch:
+            on_batch(len(report['batches']), moved, seconds)
+        if len(ids) < batch_size:
+            break
+    
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def get_archived(task_id):
+    """Задача из архива вместе с общей ссылкой (None - в архиве нет)"""
+    return db.session.get(TaskArchive, task_id, options=[joinedload(TaskArchive.shared_task)])
+
+
+def restore(task_id, user_id):
+    """
+    Возвращает задачу пользователя из архива в tasks (без commit)
+    False - в архиве нет задачи с таким id у этого пользователя
+    """
+    owned = (TaskArchive.id == task_id) & (TaskArchive.user_id == user_id)
+    if not _copy(TaskArchive, Task, owned):
+        return False
+    db.session.query(TaskArchive).filter(owned).delete(synchronize_session=False)
+    return True
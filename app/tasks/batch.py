@@ -0,0 +1,183 @@
+"""
+Пакетные операции с задачами (POST /tasks/api/batch)
+Весь пакет - одна транзакция: задачи читаются одним SELECT,
+изменения применяются общими UPDATE/DELETE по группам id
+"""
+from datetime import datetime
+from app.extensions import db
+from app.models import Task, SharedTask, TaskPriority
+from app.tasks.forms import TaskForm
+from app import counters
+
+
+MAX_OPERATIONS = 500
+ID_OPERATIONS = ('complete', 'uncomplete', 'delete', 'priority')
+PRIORITY_CHOICES = [value for value, _ in TaskForm.priority.kwargs['choices']]
+TEXT_FIELDS = ('title', 'description', 'priority')
+MAX_TASK_ID = 2 ** 63 - 1  # больше SQLite не примет (OverflowError)
+
+
+class BatchError(ValueError):
+    """Пакет целиком некорректен (не список, слишком большой)"""
+
+
+def _is_int(value):
+    """Целое число JSON (true/false в Python тоже int)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_task_id(value):
+    """id задачи в JSON - целое число в диапазоне id БД"""
+    return _is_int(value) and 0 < value <= MAX_TASK_ID
+
+
+def validate_task_data(data):
+    """
+    Проверяет данные задачи по правилам TaskForm
+    Возвращает (очищенные данные, None) или (None, словарь ошибок)
+    """
+    # Валидаторы TaskForm ждут строки: число или список в JSON - ошибка поля, а не TypeError
+    errors = {
+        name: ['Ожидается строка'] for name in TEXT_FIELDS
+        if data.get(name) is not None and not isinstance(data.get(name), str)
+    }
+    if errors:
+        return None, errors
+
+    form = TaskForm(formdata=None, data={
+        'title': data.get('title'),
+        'description': data.get('description'),
+        'priority': data.get('priority') or 'medium',
+    }, meta={'csrf': False})
+    if not form.validate():
+        errors = {name: messages for name, messages in form.errors.items() if name != 'submit'}
+        return None, errors
+    return {
+        'title': form.title.data,
+        'description': form.description.data or None,
+        'priority': form.priority.data,
+    }, None
+
+
+def _parse(operations):
+    """Проверяет структуру пакета, возвращает [(index, op, item)] и результаты с ошибками"""
+    if not isinstance(operations, list):
+        raise BatchError('operations должен быть списком')
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f'Не больше {MAX_OPERATIONS} операций за раз')
+
+    parsed = []
+    results = {}
+    seen_ids = set()
+    for index, item in enumerate(operations):
+        op = item.get('op') if isinstance(item, dict) else None
+        if op == 'create':
+            parsed.append((index, op, item))
+        elif op in ID_OPERATIONS:
+            task_id = item.get('id')
+            if not _is_int(task_id):
+                results[index] = {'index': index, 'ok': False, 'error': 'Нужен числовой id'}
+            elif not is_task_id(task_id):
+                results[index] = {'index': index, 'ok': False, 'id': task_id, 'error': 'id вне допустимого диапазона'}
+            elif task_id in seen_ids:
+                results[index] = {'index': index, 'ok': False, 'id': task_id, 'error': 'Задача уже есть в пакете'}
+            elif op == 'priority' and item.get('priority') not in PRIORITY_CHOICES:
+                results[index] = {'index': index, 'ok': False, 'id': task_id, 'error': 'Неверный приоритет'}
+            else:
+                seen_ids.add(task_id)
+                parsed.append((index, op, item))
+        else:
+            results[index] = {'index': index, 'ok': False, 'error': 'Неизвестная операция'}
+    return parsed, results
+
+
+def apply_batch(user_id, operations):
+    """
+    Применяет пакет операций пользователя (commit делает вызывающий код)
+    Операции: create (title, description, priority), complete, uncomplete,
+    delete, priority (id, priority). Возвращает результаты по каждой операции
+    """
+    parsed, results = _parse(operations)
+    now = datetime.now()
+    deltas = counters.Deltas()
+
+    # Все затронутые задачи пользователя - одним запросом (только нужные колонки)
+    ids = [item['id'] for _, op, item in parsed if op != 'create']
+    tasks = {}
+    if ids:
+        rows = db.session.query(
+            Task.id, Task.completed, Task.created_at, Task.completed_at
+        ).filter(Task.user_id == user_id, Task.id.in_(ids))
+        tasks = {row.id: row for row in rows}
+
+    groups = {'complete': [], 'uncomplete': [], 'delete': []}
+    priorities = {}
+    created = []
+
+    for index, op, item in parsed:
+        if op == 'create':
+            data, errors = validate_task_data(item)
+            if errors:
+                results[index] = {'index': index, 'ok': False, 'errors': errors}
+                continue
+            task = Task(user_id=user_id, created_at=now, **data)
+            created.append((index, task))
+            continue
+
+        task = tasks.get(item['id'])
+        if task is None:
+            results[index] = {'index': index, 'ok': False, 'id': item['id'], 'error': 'Задача не найдена'}
+            continue
+
+        if op == 'complete':
+            if not task.completed:
+                groups['complete'].append(task.id)
+                deltas.marked_completed(now, task.created_at)
+        elif op == 'uncomplete':
+            if task.completed:
+                groups['uncomplete'].append(task.id)
+                deltas.marked_active(task.completed_at, task.created_at)
+        elif op == 'delete':
+            groups['delete'].append(task.id)
+            deltas.removed(task.created_at, task.completed_at if task.completed else None)
+        elif op == 'priority':
+            priorities.setdefault(item['priority'], []).append(task.id)
+        results[index] = {'index': index, 'ok': True, 'id': task.id}
+
+    if created:
+        db.session.add_all([task for _, task in created])
+        db.session.flush()
+        for index, task in created:
+            deltas.added(task.created_at)
+            results[index] = {'index': index, 'ok': True, 'id': task.id}
+
+    owned = (Task.user_id == user_id)
+    if groups['complete']:
+        db.session.query(Task).filter(owned, Task.id.in_(groups['complete'])).update(
+            {Task.completed: True, Task.completed_at: now, Task.updated_at: now},
+            synchronize_session=False
+        )
+    if groups['uncomplete']:
+        db.session.query(Task).filter(owned, Task.id.in_(groups['uncomplete'])).update(
+            {Task.completed: False, Task.completed_at: None, Task.updated_at: now},
+            synchronize_session=False
+        )
+    for priority, priority_ids in priorities.items():
+        db.session.query(Task).filter(owned, Task.id.in_(priority_ids)).update(
+            {Task.priority: priority, Task.priority_rank: TaskPriority.rank(priority), Task.updated_at: now},
+            synchronize_session=False
+        )
+    if groups['delete']:
+        # Массовый DELETE не выполняет ORM cascade - общие ссылки удаляем сами
+        db.session.query(SharedTask).filter(SharedTask.task_id.in_(groups['delete'])).delete(
+            synchronize_session=False
+        )
+        db.session.query(Task).filter(owned, Task.id.in_(groups['delete'])).delete(
+            synchronize_session=False
+        )
+
+    # Задачи разного возраста - разные дни и корзины времени выполнения:
+    # executemany держит число запросов пакета постоянным
+    counters.apply(user_id, deltas, bulk=True)
+
+    return [results[index] for index in sorted(results)]
@@ -2,6 +2,7 @@
 Формы для управления задачами
 """
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, TextAreaField, BooleanField, SubmitField, SelectField
 from wtforms.validators import DataRequired, Length, Optional
 
@@ -23,3 +24,12 @@ class TaskForm(FlaskForm):
     ], default='medium')
     completed = BooleanField('Завершено')
     submit = SubmitField('Сохранить')
+
+
+class ImportForm(FlaskForm):
+    """Форма загрузки файла с задачами (CSV или JSON Lines)"""
+    file = FileField('Файл с задачами', validators=[
+        FileRequired('Выберите файл'),
+        FileAllowed(['csv', 'jsonl', 'ndjson'], 'Поддерживаются только .csv и .jsonl')
+    ])
+    submit = SubmitField('Импортировать')
@@ -0,0 +1,165 @@
+"""
+Keyset (cursor) пагинация списка задач
+Вместо OFFSET + COUNT следующая страница ищется по значениям ключа сортировки
+последней строки, поэтому страница N стоит столько же, сколько первая
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, literal, select, tuple_, union_all
+from app.models import Task, TaskArchive
+
+
+# Порядок списка задач: (колонка, по убыванию?)
+# id в конце делает ключ уникальным, порядок совпадает с idx_tasks_user_rank
+TASK_LIST_ORDER = [
+    (Task.completed, False),  # Активные сверху
+    (Task.priority_rank, True),  # Высокий приоритет выше
+    (Task.created_at, True),  # Новые сверху
+    (Task.id, True),
+]
+
+# Архив: недавно завершенные сверху, совпадает с idx_tasks_archive_user_completed
+ARCHIVE_LIST_ORDER = [
+    (TaskArchive.completed_at, True),
+    (TaskArchive.id, True),
+]
+
+MAX_LIMIT = 100
+
+# Граница BIGINT: большее число из курсора SQLite не примет (OverflowError)
+MAX_INT = 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    """Курсор поврежден или подделан"""
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values):
+    """Кодирует значения ключа сортировки в строку для URL"""
+    raw = json.dumps([_dump(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _check(column, value):
+    """Значение курсора должно иметь тип колонки ключа, иначе курсор подделан"""
+    if value is None:
+        if not column.nullable:
+            raise InvalidCursor(f'пустое значение для {column.key}')
+        return value
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = float  # вычисляемая колонка (ранг поиска) - число
+    if python_type is bool:
+        valid = isinstance(value, bool)
+    elif python_type is int:
+        valid = isinstance(value, int) and not isinstance(value, bool) and -MAX_INT <= value <= MAX_INT
+    elif python_type is float:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, python_type)
+    if not valid:
+        raise InvalidCursor(f'неверное значение для {column.key}')
+    return value
+
+
+def decode_cursor(cursor, order):
+    """Декодирует курсор из URL, проверяя количество и типы значений"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list) or len(values) != len(order):
+        raise InvalidCursor('неверная длина курсора')
+    try:
+        values = [_load(value) for value in values]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    return [_check(column, value) for (column, _), value in zip(order, values)]
+
+
+def _beyond(order, values):
+    """
+    (a, b, ...) после (x, y, ...) для колонок с одним направлением сортировки -
+    сравнение кортежей, по которому индекс ищет начало страницы
+    """
+    # literal() с типом колонки: SQLAlchemy не дает сравнивать < и > с голыми True/False
+    columns = [column for column, _ in order]
+    bound = [literal(value, column.type) for column, value in zip(columns, values)]
+    if len(order) == 1:
+        left, right = columns[0], bound[0]
+    else:
+        left, right = tuple_(*columns), tuple_(*bound)
+    return left < right if order[0][1] else left > right
+
+
+def _after(order, values):
+    """
+    Условия "строка идет после курсора" для составного ключа - по одному на
+    диапазон индекса. Одно направление у всех колонок - одно сравнение кортежей.
+    Иначе первая колонка делит ключ: a = x AND (b, c, ...) после (y, z, ...)
+    и a после x. Вложенное a > x OR (a = x AND ...) индекс ищет только по a -
+    страница в глубине списка читала бы все строки до курсора
+    """
+    if len({descending for _, descending in order}) == 1:
+        return [_beyond(order, values)]
+    (column, _), value = order[0], values[0]
+    same = column == literal(value, column.type)
+    return [and_(same, rest) for rest in _after(order[1:], values[1:])] + [_beyond(order[:1], values[:1])]
+
+
+def _order_by(query, order):
+    return query.order_by(*[
+        column.desc() if descending else column.asc()
+        for column, descending in order
+    ])
+
+
+def keyset_page(query, cursor=None, limit=10, order=TASK_LIST_ORDER):
+    """
+    Возвращает (items, next_cursor) для query
+    next_cursor = None если это последняя страница
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    if cursor:
+        conditions = _after(order, decode_cursor(cursor, order))
+        if len(conditions) == 1:
+            query = query.filter(conditions[0])
+        else:
+            # Каждый диапазон - отдельный поиск по индексу с LIMIT, страница
+            # собирается из их ключей (последняя колонка порядка уникальна)
+            key = order[-1][0]
+            ranges = [
+                _order_by(query.filter(condition), order).with_entities(key).limit(limit + 1).subquery()
+                for condition in conditions
+            ]
+            page = union_all(*[select(part.c[0].label('key')) for part in ranges]).subquery()
+            query = query.join(page, page.c.key == key)
+
+    query = _order_by(query, order)
+
+    # Берем на одну строку больше, чтобы узнать есть ли следующая страница
+    rows = query.limit(limit + 1).all()
+    items = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column, _ in order])
+
+    return items, next_cursor
@@ -1,11 +1,27 @@
 """
 Маршруты для работы с задачами (CRUD операции)
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, Response, stream_with_context, current_app, abort
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload, raiseload
 from app.extensions import db
-from app.models import Task, SharedTask
-from app.tasks.forms import TaskForm
+from app.models import Task, TaskArchive, SharedTask
+from app.tasks.forms import TaskForm, ImportForm
+from app.tasks.pagination import keyset_page, InvalidCursor, TASK_LIST_ORDER, ARCHIVE_LIST_ORDER
+from app.tasks.batch import apply_batch, is_task_id, BatchError
+from app.tasks.search import search_page
+from app.tasks.export import FORMATS as EXPORT_FORMATS, iter_export
+from app.tasks.importer import import_tasks, detect_format, ImportFileError
+from app.tasks import archive
+from app.statistics.cache import tasks_changed
+from app.shared import cache as shared_cache
+from app.query_budget import query_budget
+from app.replicas import read_only
+from app.jobs.queue import enqueue, accepted
+from app.events.hub import publish_task
+from app import counters
+from datetime import datetime
+import os
 import secrets
 
 
@@ -14,17 +30,17 @@ tasks_bp = Blueprint('tasks', __name__, url_prefix='/tasks')
 
 
 
-@tasks_bp.route('/')
-@login_required
-def task_list():
-    """Список всех задач пользователя"""
+def _filtered_tasks(filter_type):
+    """Запрос задач текущего пользователя с фильтром по статусу и порядок списка"""
     
-    # Получи параметры фильтрации
-    page = request.args.get('page', 1, type=int)
-    filter_type = request.args.get('filter', 'all')  # all, completed, active
+    # Архив - отдельная таблица со своим порядком
+    if filter_type == 'archived':
+        query = TaskArchive.query.options(raiseload(TaskArchive.shared_task, sql_only=True))
+        return query.filter_by(user_id=current_user.id), ARCHIVE_LIST_ORDER
     
-    # Базовый запрос
-    query = Task.query.filter_by(user_id=current_user.id)
+    # Базовый запрос (список не показывает общие ссылки - ленивая загрузка
+    # shared_task по строке запрещена, чтобы N+1 не появился незаметно)
+    query = Task.query.options(raiseload(Task.shared_task, sql_only=True)).filter_by(user_id=current_user.id)
     
     # Применяй фильтр
     if filter_type == 'completed':
@@ -32,24 +48,67 @@ def task_list():
     elif filter_type == 'active':
         query = query.filter_by(completed=False)
     
-    # Сортировка по приоритету и дате
-    query = query.order_by(
-        Task.completed.asc(),  # Активные сверху
-        Task.priority.desc(),  # Высокий приоритет выше
-        Task.created_at.desc()  # Новые сверху
-    )
+    return query, TASK_LIST_ORDER
+
+
+
+def _get_task(task_id, restore=False):
+    """
+    Задача по id вместе с общей ссылкой (один запрос с JOIN вместо двух)
+    Нет в tasks - ищется в архиве: для просмотра отдается архивная строка,
+    для изменения (restore) задача пользователя сначала возвращается в tasks
+    """
+    options = [joinedload(Task.shared_task)]
+    task = db.session.get(Task, task_id, options=options)
+    if task is None:
+        if restore and archive.restore(task_id, current_user.id):
+            task = db.session.get(Task, task_id, options=options)
+        else:
+            task = archive.get_archived(task_id)
+    if task is None:
+        abort(404)
+    return task
+
+
+
+def _restored(task):
+    """Задача из архива, прочитанная для просмотра, возвращается в tasks перед изменением (без commit)"""
+    if not task.archived:
+        return task
+    archive.restore(task.id, current_user.id)
+    return db.session.get(Task, task.id, options=[joinedload(Task.shared_task)])
+
+
+
+@tasks_bp.route('/')
+@login_required
+@query_budget(3)
+@read_only
+def task_list():
+    """Список всех задач пользователя"""
+    
+    # Получи параметры фильтрации
+    cursor = request.args.get('cursor')
+    filter_type = request.args.get('filter', 'all')  # all, completed, active
     
-    # Пагинация (10 задач на странице)
-    tasks = query.paginate(page=page, per_page=10)
+    # Пагинация по курсору (10 задач на странице)
+    query, order = _filtered_tasks(filter_type)
+    try:
+        tasks, next_cursor = keyset_page(query, cursor=cursor, limit=10, order=order)
+    except InvalidCursor:
+        return redirect(url_for('tasks.task_list', filter=filter_type))
     
-    # Статистика
-    total_tasks = Task.query.filter_by(user_id=current_user.id).count()
-    completed_tasks = Task.query.filter_by(user_id=current_user.id, completed=True).count()
-    active_tasks = total_tasks - completed_tasks
+    # Статистика (готовые счетчики вместо COUNT по задачам)
+    user_counters = counters.get_counters(current_user.id)
+    total_tasks = user_counters.total
+    completed_tasks = user_counters.completed
+    active_tasks = user_counters.active
     
     return render_template(
         'tasks/task_list.html',
         tasks=tasks,
+        next_cursor=next_cursor,
+        cursor=cursor,
         filter_type=filter_type,
         total_tasks=total_tasks,
         completed_tasks=completed_tasks,
@@ -58,8 +117,203 @@ def task_list():
 
 
 
+@tasks_bp.route('/api/list')
+@login_required
+@query_budget(2)
+def api_list():
+    """JSON список задач с пагинацией по курсору (для бесконечной прокрутки)"""
+    
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', 10, type=int)
+    filter_type = request.args.get('filter', 'all')
+    
+    query, order = _filtered_tasks(filter_type)
+    try:
+        tasks, next_cursor = keyset_page(query, cursor=cursor, limit=limit, order=order)
+    except InvalidCursor:
+        return jsonify({'error': 'Неверный курсор'}), 400
+    
+    return jsonify({
+        'tasks': [task.to_dict() for task in tasks],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
+
+
+@tasks_bp.route('/search')
+@login_required
+@query_budget(2)
+def search():
+    """Полнотекстовый поиск по названию и описанию задач"""
+    
+    query = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor')
+    
+    try:
+        tasks, next_cursor = search_page(current_user.id, query, cursor=cursor, limit=10)
+    except InvalidCursor:
+        return redirect(url_for('tasks.search', q=query))
+    
+    return render_template(
+        'tasks/search.html',
+        query=query,
+        tasks=tasks,
+        next_cursor=next_cursor,
+        cursor=cursor
+    )
+
+
+
+@tasks_bp.route('/api/search')
+@login_required
+@query_budget(1)
+def api_search():
+    """JSON поиск задач с пагинацией по курсору"""
+    
+    query = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', 10, type=int)
+    
+    try:
+        tasks, next_cursor = search_page(current_user.id, query, cursor=cursor, limit=limit)
+    except InvalidCursor:
+        return jsonify({'error': 'Неверный курсор'}), 400
+    
+    return jsonify({
+        'query': query,
+        'tasks': [task.to_dict() for task in tasks],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
+
+
+@tasks_bp.route('/export')
+@login_required
+@query_budget(2)  # по курсору на tasks и tasks_archive, сколько бы ни было задач
+def export_tasks():
+    """Выгрузка всех задач пользователя (CSV или JSON Lines) потоком"""
+    
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        flash('❌ Неизвестный формат выгрузки', 'danger')
+        return redirect(url_for('tasks.task_list'))
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    compress = request.accept_encodings['gzip'] > 0
+    
+    # Генератор читает БД после выхода из view - контекст запроса держим открытым
+    response = Response(
+        stream_with_context(iter_export(current_user.id, export_format, compress=compress)),
+        mimetype=mimetype
+    )
+    filename = f'tasks-{datetime.now():%Y%m%d}.{extension}'
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'private, no-store'
+    response.vary.add('Accept-Encoding')
+    if compress:
+        response.content_encoding = 'gzip'
+    
+    return response
+
+
+
+@tasks_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+@query_budget(15)  # файл в одну пачку (IMPORT_CHUNK_SIZE строк)
+def import_tasks_view():
+    """
+    Импорт задач из CSV или JSON Lines (формат - по расширению файла)
+    Большой файл импортирует фоновая задача: 202 со статусом для JSON-клиента,
+    для браузера - эта же страница с опросом /jobs/<id>
+    """
+    
+    form = ImportForm()
+    report = None
+    
+    if form.validate_on_submit():
+        upload = form.file.data
+        fmt = detect_format(upload.filename)
+        user_id = current_user.id
+        
+        if (request.content_length or 0) > current_app.config['IMPORT_SYNC_MAX_BYTES']:
+            job = _enqueue_import(upload, fmt, user_id)
+            if request.accept_mimetypes.best == 'application/json':
+                return accepted(job)
+            flash('⏳ Файл большой - импорт идет в фоне', 'info')
+            return redirect(url_for('tasks.import_tasks_view', job=job.id), code=303)
+        
+        try:
+            report = import_tasks(
+                user_id,
+                upload.stream,
+                fmt,
+                chunk_size=current_app.config['IMPORT_CHUNK_SIZE'],
+                max_errors=current_app.config['IMPORT_MAX_ERRORS']
+            )
+        except ImportFileError as e:
+            db.session.rollback()
+            flash(f'❌ {e}', 'danger')
+        else:
+            if report['failed']:
+                flash(f'⚠️ Импортировано задач: {report["imported"]}, строк с ошибками: {report["failed"]}', 'warning')
+            else:
+                flash(f'✅ Импортировано задач: {report["imported"]}', 'success')
+    
+    job_id = request.args.get('job', type=int)
+    return render_template('tasks/import_tasks.html', form=form, report=report, job_id=job_id)
+
+
+
+def _enqueue_import(upload, fmt, user_id):
+    """Сохраняет загрузку в instance/imports и ставит задачу импорта"""
+    directory = os.path.join(current_app.instance_path, 'imports')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{secrets.token_hex(16)}.{fmt}')
+    upload.save(path)
+    return enqueue('tasks.import', {'path': path, 'fmt': fmt}, user_id=user_id)
+
+
+
+@tasks_bp.route('/api/batch', methods=['POST'])
+@login_required
+@query_budget(16)
+def api_batch():
+    """Пакетные операции (создание, завершение, удаление, приоритет) одной транзакцией"""
+    
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Тело запроса должно быть объектом с полем operations'}), 400
+    operations = payload.get('operations')
+    
+    # Токены общих ссылок затронутых задач (до изменений: удаленные ссылки еще видны)
+    if isinstance(operations, list):
+        ids = [item.get('id') for item in operations if isinstance(item, dict)]
+        tokens = shared_cache.tokens_for(current_user.id, [i for i in ids if is_task_id(i)])
+    
+    try:
+        results = apply_batch(current_user.id, operations)
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    db.session.commit()
+    
+    tasks_changed(current_user.id)
+    shared_cache.invalidate(*tokens)
+    publish_task(current_user.id, 'bulk')
+    
+    return jsonify({
+        'success': True,
+        'applied': sum(1 for result in results if result['ok']),
+        'results': results
+    })
+
+
+
 @tasks_bp.route('/create', methods=['GET', 'POST'])
 @login_required
+@query_budget(7)
 def create_task():
     """Создание новой задачи"""
     
@@ -74,9 +328,13 @@ def create_task():
             user_id=current_user.id
         )
         
-        # Добавь в БД
+        # Добавь в БД (счетчики обновляются в той же транзакции)
         db.session.add(task)
+        counters.task_added(task)
+        data = task.to_dict()  # после flush в счетчиках: id и даты уже есть
         db.session.commit()
+        tasks_changed(current_user.id)
+        publish_task(current_user.id, 'created', data, counters.get_counters(current_user.id))
         
         flash('✅ Задача создана!', 'success')
         return redirect(url_for('tasks.task_list'))
@@ -87,10 +345,11 @@ def create_task():
 
 @tasks_bp.route('/<int:task_id>')
 @login_required
+@query_budget(2)
 def view_task(task_id):
-    """Просмотр одной задачи"""
+    """Просмотр одной задачи (в том числе из архива)"""
     
-    task = Task.query.get_or_404(task_id)
+    task = _get_task(task_id)
     
     # Проверь что задача принадлежит пользователю
     if task.user_id != current_user.id:
@@ -103,10 +362,11 @@ def view_task(task_id):
 
 @tasks_bp.route('/<int:task_id>/edit', methods=['GET', 'POST'])
 @login_required
+@query_budget(7)
 def edit_task(task_id):
     """Редактирование задачи"""
     
-    task = Task.query.get_or_404(task_id)
+    task = _get_task(task_id)
     
     # Проверь что задача принадлежит пользователю
     if task.user_id != current_user.id:
@@ -116,13 +376,23 @@ def edit_task(task_id):
     form = TaskForm()
     
     if form.validate_on_submit():
+        # Из архива - только когда изменение точно будет (неверная форма задачу не возвращает)
+        task = _restored(task)
+        
         # Обнови данные
         task.title = form.title.data
         task.description = form.description.data
         task.priority = form.priority.data
+        token = task.get_shared_token()
+        
+        data = task.to_dict()
         
         db.session.commit()
         
+        tasks_changed(current_user.id)
+        shared_cache.invalidate(token)
+        publish_task(current_user.id, 'updated', data)
+        
         flash('✏️ Задача обновлена!', 'success')
         return redirect(url_for('tasks.view_task', task_id=task.id))
     
@@ -138,10 +408,11 @@ def edit_task(task_id):
 
 @tasks_bp.route('/<int:task_id>/delete', methods=['POST'])
 @login_required
+@query_budget(14)
 def delete_task(task_id):
     """Удаление задачи"""
     
-    task = Task.query.get_or_404(task_id)
+    task = _get_task(task_id, restore=True)
     
     # Проверь что задача принадлежит пользователю
     if task.user_id != current_user.id:
@@ -149,8 +420,13 @@ def delete_task(task_id):
         return redirect(url_for('tasks.task_list'))
     
     # Удали из БД
+    token = task.get_shared_token()
     db.session.delete(task)
+    counters.task_removed(task)
     db.session.commit()
+    tasks_changed(current_user.id)
+    shared_cache.invalidate(token)
+    publish_task(current_user.id, 'deleted', {'id': task_id}, counters.get_counters(current_user.id))
     
     flash('🗑️ Задача удалена!', 'success')
     return redirect(url_for('tasks.task_list'))
@@ -159,33 +435,42 @@ def delete_task(task_id):
 
 @tasks_bp.route('/<int:task_id>/toggle', methods=['POST'])
 @login_required
+@query_budget(12)
 def toggle_task(task_id):
     """Переключение статуса задачи (завершена/активна) - AJAX запрос"""
     
-    task = Task.query.get_or_404(task_id)
+    task = _get_task(task_id, restore=True)
     
     # Проверь что задача принадлежит пользователю
     if task.user_id != current_user.id:
         return jsonify({'error': 'Доступ запрещен'}), 403
     
-    # Переключи статус
+    # Переключи статус (значение запоминаем до commit, чтобы не перечитывать задачу)
     task.toggle_complete()
+    completed = task.completed
+    token = task.get_shared_token()
+    data = task.to_dict()
+    db.session.commit()
+    tasks_changed(current_user.id)
+    shared_cache.invalidate(token)
+    publish_task(current_user.id, 'toggled', data, counters.get_counters(current_user.id))
     
     # Верни JSON ответ для AJAX
     return jsonify({
         'success': True,
-        'completed': task.completed,
-        'message': '✅ Задача завершена!' if task.completed else '⏳ Задача активирована!'
+        'completed': completed,
+        'message': '✅ Задача завершена!' if completed else '⏳ Задача активирована!'
     })
 
 
 
 @tasks_bp.route('/<int:task_id>/share', methods=['GET', 'POST'])
 @login_required
+@query_budget(7)
 def share_task(task_id):
     """Создание общей ссылки для задачи"""
     
-    task = Task.query.get_or_404(task_id)
+    task = _get_task(task_id, restore=request.method == 'POST')
     
     # Проверь что задача принадлежит пользователю
     if task.user_id != current_user.id:
@@ -194,9 +479,11 @@ def share_task(task_id):
     
     if request.method == 'POST':
         # Проверь есть ли уже общая ссылка
+        old_token = task.get_shared_token()
         if task.shared_task:
             # Удали старую ссылку
             db.session.delete(task.shared_task)
+            db.session.flush()
         
         # Создай новую общую ссылку
         token = secrets.token_urlsafe(24)  # Генерируй уникальный токен
@@ -208,6 +495,7 @@ def share_task(task_id):
         
         db.session.add(shared_task)
         db.session.commit()
+        shared_cache.invalidate(old_token, token)
         
         # Создай полную ссылку для копирования
         share_link = url_for('shared.view_shared_task', token=token, _external=True)
@@ -221,10 +509,11 @@ def share_task(task_id):
 
 @tasks_bp.route('/<int:task_id>/unshare', methods=['POST'])
 @login_required
+@query_budget(4)
 def unshare_task(task_id):
     """Удаление общей ссылки для задачи"""
     
-    task = Task.query.get_or_404(task_id)
+    task = _get_task(task_id, restore=True)
     
     # Проверь что задача принадлежит пользователю
     if task.user_id != current_user.id:
@@ -233,8 +522,10 @@ def unshare_task(task_id):
     
     # Удали общую ссылку
     if task.shared_task:
+        token = task.shared_task.token
         db.session.delete(task.shared_task)
         db.session.commit()
+        shared_cache.invalidate(token)
         flash('🔒 Общая ссылка удалена!', 'success')
     
     return redirect(url_for('tasks.view_task', task_id=task.id))
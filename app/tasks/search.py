@@ -0,0 +1,124 @@
+"""
+Полнотекстовый поиск задач по названию и описанию
+SQLite: виртуальная таблица FTS5 tasks_fts (синхронизируется триггерами, миграция 0004)
+PostgreSQL: колонка tasks.search_vector (tsvector) с GIN индексом
+Все слова запроса обязательны (последнее - как префикс), совпадения в названии выше
+совпадений только в описании, keyset пагинация по (rank, id)
+"""
+import re
+from sqlalchemy import case, column, func, literal_column, select, table, text
+from app.extensions import db
+from app.models import Task
+from app.tasks.pagination import keyset_page
+
+
+# Не больше стольких слов из запроса (длинный запрос - дорогой MATCH)
+MAX_TERMS = 8
+
+# Минимальная длина последнего слова для поиска по префиксу
+MIN_PREFIX = 3
+
+tasks_fts = table('tasks_fts', column('rowid'))
+
+# SQLite: удаление из FTS5 пишет отметки удаления - индекс растет, пока сегменты не сольются
+FTS_OPTIMIZE = text("INSERT INTO tasks_fts(tasks_fts) VALUES ('optimize')")
+
+
+def parse_terms(query):
+    """Слова запроса (буквы и цифры), без операторов FTS"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def _is_prefix(terms, index):
+    """
+    Префиксом считается только последнее слово (его еще допечатывают)
+    и не короче MIN_PREFIX: короткий префикс раскрывается в тысячи слов
+    """
+    return index == len(terms) - 1 and len(terms[index]) >= MIN_PREFIX
+
+
+def fts5_query(user_id, terms, columns='{title description}'):
+    """
+    Все слова обязательны, только задачи пользователя:
+    owner:"u1" AND {title description}:("слово" "другое"*)
+    """
+    words = ' '.join(
+        f'"{term}"*' if _is_prefix(terms, i) else f'"{term}"'
+        for i, term in enumerate(terms)
+    )
+    return f'owner:"u{int(user_id)}" AND {columns}:({words})'
+
+
+def tsquery(terms):
+    """То же для PostgreSQL: слово & другое:*"""
+    return ' & '.join(
+        f'{term}:*' if _is_prefix(terms, i) else term
+        for i, term in enumerate(terms)
+    )
+
+
+def _ranked_ids(user_id, terms):
+    """
+    Подзапрос (id, rank) найденных задач пользователя
+    Меньший rank - более релевантная задача
+    """
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        # bm25() считает IDF по задачам всех пользователей - цена растет с таблицей,
+        # поэтому ранг проще: 0 - все слова есть в названии, 1 - только в описании
+        in_title = select(tasks_fts.c.rowid).where(
+            text('tasks_fts MATCH :title_match').bindparams(title_match=fts5_query(user_id, terms, 'title'))
+        ).correlate(None)
+        rank = case((Task.id.in_(in_title), 0), else_=1)
+        query = db.session.query(Task.id.label('id'), rank.label('rank')).join(
+            tasks_fts, tasks_fts.c.rowid == Task.id
+        ).filter(text('tasks_fts MATCH :match').bindparams(match=fts5_query(user_id, terms)))
+    elif dialect == 'postgresql':
+        # Вес A (название) выше веса B (описание), ранг считается только по найденным строкам
+        ts_query = func.to_tsquery('simple', tsquery(terms))
+        vector = literal_column('tasks.search_vector')
+        rank = -func.ts_rank_cd(vector, ts_query)
+        query = db.session.query(Task.id.label('id'), rank.label('rank')).filter(
+            vector.op('@@')(ts_query)
+        )
+    else:
+        # Без полнотекстового индекса: LIKE по каждому слову, без ранжирования
+        query = db.session.query(Task.id.label('id'), literal_column('0').label('rank'))
+        for term in terms:
+            pattern = f'%{term}%'
+            query = query.filter(Task.title.ilike(pattern) | Task.description.ilike(pattern))
+
+    return query.filter(Task.user_id == user_id).subquery()
+
+
+def search_page(user_id, query, cursor=None, limit=10):
+    """
+    Возвращает (задачи, next_cursor) по запросу query:
+    самые релевантные первыми, при равной релевантности - новые выше
+    Пустой запрос - пустой результат
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return [], None
+
+    ranked = _ranked_ids(user_id, terms)
+    rows = db.session.query(Task, ranked.c.rank, ranked.c.id).join(ranked, ranked.c.id == Task.id)
+    order = [(ranked.c.rank, False), (ranked.c.id, True)]
+
+    rows, next_cursor = keyset_page(rows, cursor=cursor, limit=limit, order=order)
+    return [row.Task for row in rows], next_cursor
+
+
+def optimize_index():
+    """
+    Сливает сегменты индекса поиска SQLite (после больших переносов в архив и удалений)
+    Переписывает весь индекс и держит блокировку записи - обслуживание, а не часть
+    переноса: python manage.py tasks optimize-search
+    False - оптимизировать нечего (GIN индекс PostgreSQL обслуживает VACUUM)
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    db.session.execute(FTS_OPTIMIZE)
+    db.session.commit()
+    return True
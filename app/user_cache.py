@@ -0,0 +1,107 @@
+"""
+Кэш пользователей для Flask-Login user_loader
+current_user собирается из снимка в кэше без SELECT к таблице users;
+снимок сбрасывается при любом изменении или удалении пользователя
+commit не заставляет перечитывать current_user: после истечения атрибутов
+(expire_on_commit) колонки снимка возвращаются в объект
+"""
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from app.cache import make_cache
+from app.extensions import db
+from app.models import User
+
+
+# Колонки снимка (password_hash в кэш не кладем)
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'created_at', 'updated_at')
+
+# Атрибут объекта User со значениями снимка (не колонка, expire его не трогает)
+KEPT_ATTR = '_user_cache_values'
+
+
+def _snapshot(user):
+    data = {}
+    for field in SNAPSHOT_FIELDS:
+        value = getattr(user, field)
+        data[field] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def _keep(user):
+    """Запоминает значения колонок снимка в объекте - их вернет _reapply"""
+    setattr(user, KEPT_ATTR, {field: getattr(user, field) for field in SNAPSHOT_FIELDS})
+    return user
+
+
+def _restore(data):
+    """
+    Пользователь из снимка, присоединенный к текущей сессии без запроса к БД
+    (merge с load=False), ленивые связи вроде user.tasks продолжают работать
+    """
+    values = dict(data)
+    for field in ('created_at', 'updated_at'):
+        if values.get(field):
+            values[field] = datetime.fromisoformat(values[field])
+    user = User(**values)
+    make_transient_to_detached(user)
+    return _keep(db.session.merge(user, load=False))
+
+
+class UserCache:
+    """Кэш снимков пользователей по id"""
+    
+    def __init__(self, backend):
+        self.backend = backend
+    
+    def load(self, user_id):
+        """Пользователь по id: из кэша, иначе из БД с сохранением в кэш"""
+        data = self.backend.get(user_id)
+        if data is not None:
+            return _restore(data)
+        
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self.backend.set(user_id, _snapshot(user))
+            _keep(user)
+        return user
+    
+    def invalidate(self, user_id):
+        self.backend.delete(user_id)
+
+
+def init_user_cache(app):
+    """Создает кэш пользователей приложения"""
+    cache = UserCache(make_cache(
+        app,
+        'users',
+        max_size=app.config['USER_CACHE_SIZE'],
+        ttl=app.config['USER_CACHE_TTL']
+    ))
+    app.extensions['user_cache'] = cache
+    return cache
+
+
+@event.listens_for(User, 'expire')
+def _reapply(target, attrs):
+    """
+    После commit (истекают все атрибуты) возвращает колонки снимка -
+    current_user не перечитывается из БД. password_hash остается истекшим
+    """
+    values = target.__dict__.get(KEPT_ATTR)
+    if attrs is None and values is not None:
+        for field, value in values.items():
+            set_committed_value(target, field, value)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user(mapper, connection, target):
+    """Сбрасывает снимок пользователя при изменении записи"""
+    target.__dict__.pop(KEPT_ATTR, None)
+    if has_app_context():
+        cache = current_app.extensions.get('user_cache')
+        if cache is not None:
+            cache.invalidate(target.id)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк аналитики за период (/statistics/api/range) для пользователя с 1M задач
+(SQLite во временном файле)
+
+Сравнивает:
+- столбцы задач: created_at/completed_at всех задач периода из tasks,
+  метрики - NumPy (время растет с числом задач, упирается в чтение строк и
+  разбор дат, а не в NumPy)
+- сводки: дневные счетчики и гистограмма времени выполнения (app/counters.py),
+  метрики - NumPy по ним (app/statistics/analytics.py, не зависит от числа задач)
+
+Запуск: python benchmarks/bench_analytics.py [задач]   (по умолчанию 1 000 000)
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, migrations
+from app.config import TestingConfig, config
+from app.counters import rebuild_user
+from app.extensions import db
+from app.models import User, Task, TaskPriority
+from app.statistics.analytics import range_stats, streaks
+
+
+TOTAL = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+RANGES = (30, 90, 365)
+REPEATS = 5
+PRIORITIES = ['low', 'medium', 'high']
+
+
+def make_app(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -20000,
+                          'mmap_size': 268435456, 'temp_store': 'MEMORY'}
+        QUERY_BUDGET_ENFORCE = False
+    config['bench_analytics'] = BenchConfig
+    return create_app('bench_analytics', check_schema=False)
+
+
+def fill(user_id):
+    """TOTAL задач за ~400 дней, 70% завершены (время выполнения - экспонента, ~2 дня)"""
+    rnd = random.Random(1)
+    now = datetime.now()
+    rows = []
+    for i in range(TOTAL):
+        created = now - timedelta(seconds=rnd.randint(0, 400 * 86400))
+        completed = created + timedelta(seconds=rnd.expovariate(1 / (2 * 86400)))
+        done = rnd.random() < 0.7 and completed <= now
+        rows.append({
+            'title': f'Задача {i}',
+            'description': '',
+            'priority': PRIORITIES[i % 3],
+            'priority_rank': TaskPriority.rank(PRIORITIES[i % 3]),
+            'completed': done,
+            'completed_at': completed if done else None,
+            'created_at': created,
+            'updated_at': created,
+            'user_id': user_id,
+        })
+        if len(rows) == 20_000:
+            db.session.execute(db.insert(Task), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(Task), rows)
+    db.session.commit()
+
+
+def column_stats(user_id, start, end):
+    """Те же основные метрики по столбцам задач (точные процентили)"""
+    since = datetime.combine(start, datetime.min.time())
+    until = datetime.combine(end, datetime.min.time()) + timedelta(days=1)
+    rows = db.session.query(Task.created_at, Task.completed_at).filter(
+        Task.user_id == user_id,
+        ((Task.created_at >= since) & (Task.created_at < until))
+        | ((Task.completed_at >= since) & (Task.completed_at < until))
+    ).all()
+    created, completed = (np.array(column, dtype='datetime64[s]') for column in zip(*rows))
+    days = (end - start).days + 1
+    origin = np.datetime64(start, 'D')
+
+    created_day = (created.astype('datetime64[D]') - origin).astype(np.int64)
+    created_day = created_day[(created_day >= 0) & (created_day < days)]
+    done = ~np.isnat(completed)
+    completed_day = (completed[done].astype('datetime64[D]') - origin).astype(np.int64)
+    in_range = (completed_day >= 0) & (completed_day < days)
+    latency = (completed[done] - created[done]).astype(np.int64)[in_range]
+
+    per_day = np.bincount(completed_day[in_range], minlength=days)
+    return {
+        'created': np.bincount(created_day, minlength=days),
+        'completed': per_day,
+        'percentiles': np.percentile(latency, [50, 75, 90, 99]) if len(latency) else None,
+        'streaks': streaks(per_day > 0),
+    }
+
+
+def timed(func):
+    """Медиана REPEATS запусков, мс (сессия очищается - без кэша объектов)"""
+    samples = []
+    result = None
+    for _ in range(REPEATS):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    app = make_app(os.path.join(workdir, 'bench_analytics.db'))
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        user = User(username='bench', email='bench@example.com', password_hash='-')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        started = time.perf_counter()
+        fill(user_id)
+        print(f'Задач: {TOTAL:,}, вставка {time.perf_counter() - started:.0f} с')
+
+        started = time.perf_counter()
+        rebuild_user(user_id)
+        db.session.commit()
+        print(f'Сборка сводок (один раз, дальше - инкрементально): {time.perf_counter() - started:.1f} с\n')
+
+        today = datetime.now().date()
+        print(f"{'период':>8} | {'столбцы задач, мс':>17} | {'сводки, мс':>10} | "
+              f"{'p50 точно / по гистограмме, ч':>30}")
+        print('-' * 76)
+        for days in RANGES:
+            start = today - timedelta(days=days - 1)
+            columns_ms, exact = timed(lambda: column_stats(user_id, start, today))
+            summary_ms, result = timed(lambda: range_stats(user_id, start, today))
+            assert result['trend']['completed'] == exact['completed'].tolist()
+            assert result['streaks']['longest'] == exact['streaks']['longest']
+            p50 = result['latency']['p50']
+            print(f"{days:>6} д | {columns_ms:>17.0f} | {summary_ms:>10.1f} | "
+                  f"{exact['percentiles'][0] / 3600:>14.1f} / {p50 / 3600:<13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Архив задач: список задач и размер tasks с индексами до и после переноса давно
+завершенных задач в tasks_archive (python manage.py tasks archive)
+
+Задачи за 3 года, 85% завершены - как у пользователя, который давно ведет список.
+Размеры - по dbstat SQLite (страницы каждой таблицы и индекса), после переноса
+(и python manage.py tasks optimize-search) и после VACUUM (без VACUUM освобожденные страницы остаются в файле и идут под новые строки)
+
+Запуск: python benchmarks/bench_archive.py [задач]   (по умолчанию 300 000)
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+from app import create_app, migrations
+from app.config import TestingConfig, config
+from app.counters import rebuild_user
+from app.extensions import db
+from app.models import User, Task, TaskPriority
+from app.tasks.archive import archive_completed
+from app.tasks.search import optimize_index
+
+
+TOTAL = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+USERS = 10
+DAYS = 3 * 365
+ARCHIVE_AFTER_DAYS = 180
+REPEATS = 50
+PRIORITIES = ['low', 'medium', 'high']
+LIST_PATHS = ('/tasks/', '/tasks/?filter=active', '/tasks/?filter=completed', '/tasks/api/list?limit=50')
+
+
+def make_app(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -20000,
+                          'mmap_size': 268435456, 'temp_store': 'MEMORY'}
+        QUERY_BUDGET_ENFORCE = False
+        WTF_CSRF_ENABLED = False
+    config['bench_archive'] = BenchConfig
+    return create_app('bench_archive', check_schema=False)
+
+
+def fill(user_ids):
+    """TOTAL задач поровну между пользователями за DAYS дней (время выполнения ~2 дня)"""
+    rnd = random.Random(1)
+    now = datetime.now()
+    rows = []
+    for i in range(TOTAL):
+        created = now - timedelta(seconds=rnd.randint(0, DAYS * 86400))
+        completed = created + timedelta(seconds=rnd.expovariate(1 / (2 * 86400)))
+        done = rnd.random() < 0.85 and completed <= now
+        rows.append({
+            'title': f'Задача {i}',
+            'description': 'Описание задачи',
+            'priority': PRIORITIES[i % 3],
+            'priority_rank': TaskPriority.rank(PRIORITIES[i % 3]),
+            'completed': done,
+            'completed_at': completed if done else None,
+            'created_at': created,
+            'updated_at': created,
+            'user_id': user_ids[i % len(user_ids)],
+        })
+        if len(rows) == 20_000:
+            db.session.execute(db.insert(Task), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(Task), rows)
+    db.session.commit()
+    for user_id in user_ids:
+        rebuild_user(user_id)
+        db.session.commit()
+
+
+def sizes():
+    """Размер таблиц задач и их индексов, байт: {имя: размер}"""
+    names = [row[0] for row in db.session.execute(text(
+        "SELECT name FROM sqlite_master WHERE tbl_name IN ('tasks', 'tasks_archive') AND type IN ('table', 'index') "
+        "UNION ALL SELECT 'tasks_fts_data' UNION ALL SELECT 'tasks_fts_idx' UNION ALL SELECT 'tasks_fts_docsize'"
+    ))]
+    rows = db.session.execute(text('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name'))
+    return {name: size for name, size in rows if name in names}
+
+
+def client_for(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def timed(client, path):
+    """Медиана REPEATS запросов, мс"""
+    client.get(path)
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, path
+    return statistics.median(samples) * 1000
+
+
+def create_latency(client):
+    """Медиана создания задачи (вставка в tasks, индексы, FTS), мс"""
+    samples = []
+    for i in range(REPEATS):
+        started = time.perf_counter()
+        client.post('/tasks/create', data={'title': f'Новая {i}', 'description': '', 'priority': 'medium'})
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def measure(app, user_id):
+    client = client_for(app, user_id)
+    paths = LIST_PATHS + ('/tasks/?filter=archived',)
+    result = {path: timed(client, path) for path in paths}
+    result['create'] = create_latency(client)
+    return result
+
+
+def mb(value):
+    return f'{value / 1024 / 1024:.1f}' if value is not None else '-'
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    app = make_app(os.path.join(workdir, 'bench_archive.db'))
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='-') for i in range(USERS)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+
+        started = time.perf_counter()
+        fill(user_ids)
+        print(f'Задач: {TOTAL:,} у {USERS} пользователей, вставка {time.perf_counter() - started:.0f} с')
+
+        size_before = sizes()
+        before = measure(app, user_ids[0])
+
+        report = archive_completed(ARCHIVE_AFTER_DAYS, batch_size=1000)
+        batch_ms = [batch['seconds'] * 1000 for batch in report['batches']]
+        print(f"Перенесено в архив (завершены раньше {ARCHIVE_AFTER_DAYS} дней назад): {report['archived']:,} "
+              f"({report['archived'] / TOTAL * 100:.0f}%) за {report['seconds']:.1f} с, "
+              f"{report['archived'] / report['seconds']:.0f} задач/с, пачка 1000: "
+              f"p50 {statistics.median(batch_ms):.0f} мс, макс {max(batch_ms):.0f} мс")
+
+        # Слияние сегментов FTS - отдельное обслуживание, не часть переноса
+        started = time.perf_counter()
+        optimize_index()
+        print(f'Оптимизация индекса поиска (tasks optimize-search): {time.perf_counter() - started:.1f} с\n')
+
+        size_after = sizes()
+        after = measure(app, user_ids[0])
+        db.session.commit()
+        db.session.execute(text('VACUUM'))
+        size_vacuum = sizes()
+
+        print(f"{'размер, МБ':>34} | {'до':>7} | {'после':>7} | {'после VACUUM':>12}")
+        print('-' * 70)
+        for name in sorted(set(size_before) | set(size_vacuum), key=lambda n: (n.startswith('tasks_archive') or 'archive' in n, n)):
+            print(f'{name:>34} | {mb(size_before.get(name)):>7} | {mb(size_after.get(name)):>7} | '
+                  f'{mb(size_vacuum.get(name)):>12}')
+        hot = [name for name in size_before if 'archive' not in name]
+        print(f"{'tasks + индексы + FTS':>34} | {mb(sum(size_before[n] for n in hot)):>7} | "
+              f"{mb(sum(size_after.get(n, 0) for n in hot)):>7} | {mb(sum(size_vacuum.get(n, 0) for n in hot)):>12}")
+
+        print(f"\n{'запрос, мс (медиана ' + str(REPEATS) + ')':>34} | {'до':>7} | {'после':>7}")
+        print('-' * 54)
+        for path in LIST_PATHS + ('/tasks/?filter=archived', 'create'):
+            label = 'POST /tasks/create' if path == 'create' else f'GET {path}'
+            print(f'{label:>34} | {before[path]:>7.2f} | {after[path]:>7.2f}')
+
+
+if __name__ == '__main__':
+    main()
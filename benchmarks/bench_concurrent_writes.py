@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конкурентной записи в SQLite: настройки по умолчанию против
+SQLITE_PRAGMAS из конфигурации (WAL, synchronous=NORMAL, busy_timeout, ...)
+
+Несколько потоков пишут по одной строке на транзакцию (как create_task/toggle_task),
+параллельно другие потоки читают. Считаются записи в секунду и ошибки "database is locked"
+
+Запуск: python benchmarks/bench_concurrent_writes.py [потоков] [записей на поток]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.config import Config
+from app.database import apply_sqlite_pragmas
+
+
+def run(pragmas, writers, per_writer, readers=2):
+    """Возвращает (записей/сек, ошибок блокировки)"""
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_writes_'), 'bench.db')
+    # timeout=1: без busy_timeout блокировки быстрее превращаются в ошибки
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 1}, pool_size=writers + readers)
+    apply_sqlite_pragmas(engine, pragmas)
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE tasks (id INTEGER PRIMARY KEY, user_id INTEGER, title TEXT, created_at TEXT)'
+        ))
+        conn.execute(text('CREATE INDEX idx_user ON tasks (user_id)'))
+
+    errors = []
+    stop = threading.Event()
+
+    def writer(n):
+        for i in range(per_writer):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO tasks (user_id, title, created_at) VALUES (:u, :t, datetime('now'))"),
+                        {'u': n, 't': f'Задача {i}'}
+                    )
+            except OperationalError:
+                errors.append(1)
+
+    def reader(n):
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT count(*) FROM tasks WHERE user_id = :u'), {'u': n}).scalar()
+            except OperationalError:
+                errors.append(1)
+
+    reader_threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in reader_threads:
+        thread.start()
+
+    started = time.perf_counter()
+    for thread in writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for thread in reader_threads:
+        thread.join()
+    engine.dispose()
+
+    written = writers * per_writer - len(errors)
+    return written / elapsed, len(errors)
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_writer = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    print(f'Потоков записи: {writers}, записей на поток: {per_writer}')
+    for title, pragmas in [('по умолчанию', {}), ('SQLITE_PRAGMAS', Config.SQLITE_PRAGMAS)]:
+        rate, errors = run(pragmas, writers, per_writer)
+        print(f'{title:>15}: {rate:8.0f} записей/сек, ошибок блокировки: {errors}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Нагрузка от открытых, но простаивающих вкладок: опрос страниц раз в POLL_SECONDS
+против потока /events (Server-Sent Events), и задержка доставки события во все вкладки
+
+Сервер - serve.py, процессорное время его процессов берется из /proc (Linux).
+Вкладки - потоки этого процесса с сырыми сокетами
+
+Запуск: python benchmarks/bench_events.py [вкладок]   (по умолчанию 200)
+"""
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+WORKDIR = tempfile.mkdtemp()
+ENV = {
+    'FLASK_ENV': 'production',
+    'DATABASE_URL': f'sqlite:///{os.path.join(WORKDIR, "bench_events.db")}',
+    'SECRET_KEY': 'bench-events-secret',
+    'JOBS_WORKERS': '0',
+    'SHARED_SWEEP_SECONDS': '0',
+    'EVENTS_SOCKET_DIR': os.path.join(WORKDIR, 'events'),
+}
+os.environ.update(ENV)
+
+from app import create_app, migrations
+from app.extensions import db
+from app.models import User, Task
+
+
+TABS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+POLL_SECONDS = 5.0  # вкладка с автообновлением: список задач и сводка
+POLL_PATHS = ('/tasks/', '/statistics/api/daily-stats')
+IDLE_SECONDS = 20.0
+WORKERS = 2
+EVENTS = 20  # переключений задачи для замера задержки
+
+
+def prepare():
+    app = create_app('production', check_schema=False)
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        user = User(username='bench', email='bench@example.com', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        for i in range(50):
+            db.session.add(Task(title=f'Задача {i}', description='Описание', priority='medium', user_id=user.id))
+        db.session.commit()
+        task_id = Task.query.first().id
+        cookie = app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(user.id), '_fresh': True})
+        db.engine.dispose()
+    return cookie, task_id
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'serve.py'), '--workers', str(WORKERS), '--port', str(port)],
+        cwd=ROOT, env={**os.environ, **ENV}, stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                time.sleep(1)  # все процессы готовы
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('serve.py не запустился')
+
+
+def cpu_seconds(pid):
+    """Процессорное время процесса и его потомков (мастер + обработчики)"""
+    ticks = os.sysconf('SC_CLK_TCK')
+    total = 0
+    pids = [pid]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+            if int(fields[1]) == pid:
+                pids.append(int(entry))
+    for item in pids:
+        try:
+            with open(f'/proc/{item}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / ticks
+        except OSError:
+            pass
+    return total
+
+
+def request(port, cookie, method, path):
+    with socket.create_connection(('127.0.0.1', port), timeout=30) as sock:
+        sock.sendall((
+            f'{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: session={cookie}\r\n'
+            f'Content-Length: 0\r\nConnection: close\r\n\r\n'
+        ).encode())
+        while sock.recv(65536):
+            pass
+
+
+def measure_polling(port, cookie, server):
+    """TABS вкладок опрашивают страницы; сколько запросов и процессора за IDLE_SECONDS"""
+    stop = threading.Event()
+    counts = []
+
+    def tab(offset):
+        done = 0
+        stop.wait(offset)  # вкладки открыты в разное время
+        while not stop.is_set():
+            for path in POLL_PATHS:
+                request(port, cookie, 'GET', path)
+                done += 1
+            stop.wait(POLL_SECONDS)
+        counts.append(done)
+
+    threads = [threading.Thread(target=tab, args=(POLL_SECONDS * i / TABS,)) for i in range(TABS)]
+    started_cpu = cpu_seconds(server.pid)
+    for thread in threads:
+        thread.start()
+    time.sleep(IDLE_SECONDS)
+    cpu = cpu_seconds(server.pid) - started_cpu
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts), cpu
+
+
+def open_stream(port, cookie):
+    sock = socket.create_connection(('127.0.0.1', port), timeout=30)
+    sock.sendall(f'GET /events HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: session={cookie}\r\n\r\n'.encode())
+    head = sock.recv(65536)
+    assert b'200 OK' in head, head[:200]
+    return sock
+
+
+def measure_streams(port, cookie, server):
+    """TABS открытых потоков /events: процессор сервера за IDLE_SECONDS простоя"""
+    streams = [open_stream(port, cookie) for _ in range(TABS)]
+    started_cpu = cpu_seconds(server.pid)
+    time.sleep(IDLE_SECONDS)
+    cpu = cpu_seconds(server.pid) - started_cpu
+    return streams, cpu
+
+
+def measure_delivery(port, cookie, streams, task_id):
+    """Задержка от запроса переключения задачи до события в каждой вкладке"""
+    latencies = []
+    for _ in range(EVENTS):
+        started = time.perf_counter()
+        request(port, cookie, 'POST', f'/tasks/{task_id}/toggle')
+        for sock in streams:
+            buffer = b''
+            while b'event: task' not in buffer:
+                buffer += sock.recv(65536)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+def main():
+    cookie, task_id = prepare()
+    port = free_port()
+    server = start_server(port)
+    try:
+        requests, poll_cpu = measure_polling(port, cookie, server)
+        streams, stream_cpu = measure_streams(port, cookie, server)
+        p50, p99 = measure_delivery(port, cookie, streams, task_id)
+        for sock in streams:
+            sock.close()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(60)
+
+    print(f'Вкладок: {TABS}, процессов сервера: {WORKERS}, простой {IDLE_SECONDS:.0f} с\n')
+    print(f"{'режим':>26} | {'запросов/с':>10} | {'процессор сервера, %':>20}")
+    print('-' * 64)
+    print(f"{f'опрос раз в {POLL_SECONDS:.0f} с':>26} | {requests / IDLE_SECONDS:>10.1f} | "
+          f"{poll_cpu / IDLE_SECONDS * 100:>20.1f}")
+    print(f"{'поток /events':>26} | {0:>10.1f} | {stream_cpu / IDLE_SECONDS * 100:>20.1f}")
+    print(f'\nДоставка события во все {TABS} вкладок ({EVENTS} изменений): p50 {p50:.1f} мс, p99 {p99:.1f} мс')
+
+
+if __name__ == '__main__':
+    main()
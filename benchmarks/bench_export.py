@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк выгрузки задач: 500k строк через /tasks/export при фиксированном
+потолке прироста RSS (потоковая выгрузка должна укладываться, как бы много ни было задач)
+
+Для сравнения - старый путь: Task.query.filter_by(...).all() и сборка CSV целиком.
+Каждый замер - в отдельном процессе (ru_maxrss - пик процесса)
+
+Запуск: python benchmarks/bench_export.py [количество задач]
+Код выхода 1, если потоковая выгрузка превысила RSS_CEILING_MB
+"""
+import csv
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.config import TestingConfig, config
+from app.extensions import db
+from app.models import User, Task, TaskPriority
+
+
+TOTAL = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 500_000
+RSS_CEILING_MB = 40
+PRIORITIES = ['low', 'medium', 'high']
+
+
+def make_app(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'OFF'}
+        QUERY_BUDGET_ENFORCE = False
+    config['bench_export'] = BenchConfig
+    return create_app('bench_export')
+
+
+def fill(path, total):
+    """Один пользователь с total задачами"""
+    app = make_app(path)
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.password_hash = '-'
+        db.session.add(user)
+        db.session.commit()
+
+        now = datetime.now()
+        rows = []
+        for i in range(total):
+            created = now - timedelta(minutes=i)
+            rows.append({
+                'title': f'Задача номер {i}',
+                'description': 'Описание задачи, довольно длинное ' * 3,
+                'priority': PRIORITIES[i % 3],
+                'priority_rank': TaskPriority.rank(PRIORITIES[i % 3]),
+                'completed': i % 2 == 0,
+                'completed_at': created if i % 2 == 0 else None,
+                'created_at': created,
+                'updated_at': created,
+                'user_id': user.id,
+            })
+            if len(rows) == 20_000:
+                db.session.execute(db.insert(Task), rows)
+                rows = []
+        if rows:
+            db.session.execute(db.insert(Task), rows)
+        db.session.commit()
+        return user.id
+
+
+def rss_mb():
+    """Пиковый RSS процесса в МБ (Linux: ru_maxrss в КБ)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(path, user_id, mode):
+    """Выполняется в дочернем процессе: печатает 'байт секунд прирост_RSS пик_RSS'"""
+    app = make_app(path)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    if mode == 'legacy':
+        with app.app_context():
+            baseline = rss_mb()
+            started = time.perf_counter()
+            tasks = Task.query.filter_by(user_id=user_id).all()
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for task in tasks:
+                writer.writerow([task.id, task.title, task.description, task.priority, task.completed,
+                                 task.created_at, task.updated_at, task.completed_at])
+            size = len(buffer.getvalue().encode('utf-8'))
+    else:
+        fmt, _, encoding = mode.partition('+')
+        headers = {'Accept-Encoding': 'gzip'} if encoding == 'gzip' else {}
+        baseline = rss_mb()
+        started = time.perf_counter()
+        response = client.get(f'/tasks/export?format={fmt}', headers=headers, buffered=False)
+        size = 0
+        for chunk in response.response:
+            size += len(chunk)
+        response.close()
+
+    print(size, time.perf_counter() - started, rss_mb() - baseline, rss_mb())
+
+
+def main():
+    if sys.argv[1:2] == ['--measure']:
+        measure(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+        return
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_export.db')
+    user_id = fill(path, TOTAL)
+    print(f'{TOTAL} задач, потолок прироста RSS для потоковой выгрузки: {RSS_CEILING_MB} МБ\n')
+    print(f"{'режим':>12} | {'размер МБ':>10} | {'сек':>6} | {'строк/с':>9} | {'прирост RSS МБ':>15} | {'пик RSS МБ':>11}")
+    print('-' * 79)
+
+    failed = False
+    for mode in ['csv', 'jsonl', 'csv+gzip', 'jsonl+gzip', 'legacy']:
+        output = subprocess.run(
+            [sys.executable, __file__, '--measure', path, str(user_id), mode],
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        size, seconds, growth, peak = int(output[-4]), float(output[-3]), float(output[-2]), float(output[-1])
+        print(f'{mode:>12} | {size / 1024 / 1024:>10.1f} | {seconds:>6.2f} | {TOTAL / seconds:>9.0f} | {growth:>15.1f} | {peak:>11.1f}')
+        if mode != 'legacy' and growth > RSS_CEILING_MB:
+            failed = True
+
+    os.remove(path)
+    if failed:
+        print(f'\n❌ Потоковая выгрузка превысила {RSS_CEILING_MB} МБ')
+        sys.exit(1)
+    print('\n✅ Потоковая выгрузка уложилась в потолок RSS')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк импорта задач: строк в секунду для CSV и JSON Lines
+при разных размерах пачки (одна транзакция на пачку), SQLite в файле
+
+Для сравнения - потолок машины (sqlite3 executemany готовых строк) и построчный
+путь: validate_task_data (FlaskForm на строку) и commit на каждую задачу (на меньшем объеме)
+
+Запуск: python benchmarks/bench_import.py [количество строк]
+Код выхода 1, если импорт пачками медленнее TARGET_ROWS_PER_SEC
+"""
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.config import TestingConfig, config
+from app.extensions import db
+from app.models import User, Task
+
+
+TOTAL = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 200_000
+TARGET_ROWS_PER_SEC = 50_000
+LEGACY_ROWS = 2_000
+CHUNK_SIZES = [500, 5_000, 20_000]
+PRIORITIES = ['low', 'medium', 'high']
+
+
+def make_app(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}
+        QUERY_BUDGET_ENFORCE = False
+    config['bench_import'] = BenchConfig
+    return create_app('bench_import')
+
+
+def records(total):
+    for i in range(total):
+        yield {
+            'title': f'Задача номер {i}',
+            'description': 'Описание задачи для импорта' if i % 4 else '',
+            'priority': PRIORITIES[i % 3],
+            'completed': 'true' if i % 2 == 0 else 'false',
+            'created_at': f'2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}T10:00:00',
+        }
+
+
+def make_csv(total):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=['title', 'description', 'priority', 'completed', 'created_at'])
+    writer.writeheader()
+    writer.writerows(records(total))
+    return buffer.getvalue().encode('utf-8')
+
+
+def make_jsonl(total):
+    return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in records(total)).encode('utf-8')
+
+
+def new_user(name):
+    user = User(username=name, email=f'{name}@example.com')
+    user.password_hash = '-'
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def legacy(user_id, total):
+    """Как создание задачи через форму: валидация формой и commit на каждую строку"""
+    from app.tasks.batch import validate_task_data
+    from app import counters
+
+    started = time.perf_counter()
+    for row in records(total):
+        data, errors = validate_task_data(row)
+        task = Task(title=data['title'], description=data['description'] or None,
+                    priority=data['priority'], user_id=user_id)
+        db.session.add(task)
+        counters.task_added(task)
+        db.session.commit()
+    return time.perf_counter() - started
+
+
+def driver_floor(user_id, data, chunk_size):
+    """
+    Потолок этой машины: sqlite3 executemany уже разобранных строк в ту же схему
+    (индексы + FTS пачкой), без разбора файла, проверки и SQLAlchemy
+    """
+    from datetime import datetime
+    from app.tasks.importer import iter_records, RowValidator, FTS_INDEX_NEW
+
+    validator = RowValidator()
+    now = datetime.now()
+    rows = [validator.validate(record, now)[0] for _, record, _ in iter_records(io.BytesIO(data), 'csv')]
+    columns = list(rows[0]) + ['user_id']
+    sql = f"INSERT INTO tasks ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    values = [
+        tuple(str(value) if isinstance(value, datetime) else value for value in row.values()) + (user_id,)
+        for row in rows
+    ]
+
+    raw = db.engine.raw_connection()
+    trigger = raw.execute("SELECT sql FROM sqlite_master WHERE name = 'tasks_fts_insert'").fetchone()[0]
+    raw.execute('DROP TRIGGER tasks_fts_insert')
+    started = time.perf_counter()
+    for i in range(0, len(values), chunk_size):
+        last_id = raw.execute('SELECT max(id) FROM tasks').fetchone()[0]
+        raw.executemany(sql, values[i:i + chunk_size])
+        raw.execute(FTS_INDEX_NEW.text.replace(':last_id', str(last_id)))
+        raw.commit()
+    seconds = time.perf_counter() - started
+    raw.execute(trigger)
+    raw.commit()
+    raw.close()
+    return seconds
+
+
+def main():
+    from app.tasks.importer import import_tasks
+    from app.counters import verify_user
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_import.db')
+    app = make_app(path)
+    files = {'csv': make_csv(TOTAL), 'jsonl': make_jsonl(TOTAL)}
+
+    print(f'{TOTAL} строк на замер, цель: {TARGET_ROWS_PER_SEC} строк/с\n')
+    print(f"{'формат':>7} | {'пачка':>7} | {'сек':>6} | {'строк/с':>9}")
+    print('-' * 38)
+
+    best = 0
+    with app.test_request_context():
+        for fmt, data in files.items():
+            for chunk_size in CHUNK_SIZES:
+                user_id = new_user(f'{fmt}{chunk_size}')
+                started = time.perf_counter()
+                report = import_tasks(user_id, io.BytesIO(data), fmt, chunk_size=chunk_size)
+                seconds = time.perf_counter() - started
+                assert report['imported'] == TOTAL and not report['failed'], report
+                assert not verify_user(user_id), verify_user(user_id)
+                rate = TOTAL / seconds
+                best = max(best, rate) if chunk_size == 5_000 else best
+                print(f'{fmt:>7} | {chunk_size:>7} | {seconds:>6.2f} | {rate:>9.0f}')
+
+        seconds = driver_floor(new_user('floor'), files['csv'], 5_000)
+        print(f"{'sqlite3':>7} | {5_000:>7} | {seconds:>6.2f} | {TOTAL / seconds:>9.0f}  (без разбора и проверки - потолок машины)")
+        seconds = legacy(new_user('legacy'), LEGACY_ROWS)
+        print(f"{'форма':>7} | {1:>7} | {seconds:>6.2f} | {LEGACY_ROWS / seconds:>9.0f}  (построчно, {LEGACY_ROWS} строк)")
+
+    os.remove(path)
+    if best < TARGET_ROWS_PER_SEC:
+        print(f'\n❌ Импорт медленнее {TARGET_ROWS_PER_SEC} строк/с')
+        sys.exit(1)
+    print(f'\n✅ Импорт (пачка 5000): {best:.0f} строк/с')
+
+
+if __name__ == '__main__':
+    main()
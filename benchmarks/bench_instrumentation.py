@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов инструментирования
+Одни и те же запросы к /tasks/ и /statistics/api/daily-stats
+с выключенным и включенным INSTRUMENTATION_ENABLED
+
+Запуск: python benchmarks/bench_instrumentation.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.config import TestingConfig, config
+
+
+REQUESTS = 2_000
+URLS = ['/tasks/', '/statistics/api/daily-stats']
+
+
+class InstrumentedConfig(TestingConfig):
+    INSTRUMENTATION_ENABLED = True
+    QUERY_BUDGET_ENFORCE = False
+
+
+class PlainConfig(TestingConfig):
+    QUERY_BUDGET_ENFORCE = False
+
+
+def run(config_name):
+    """Возвращает среднее время запроса в мкс"""
+    app = create_app(config_name)
+    app.config['WTF_CSRF_ENABLED'] = False
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'username': 'bench', 'email': 'bench@example.com',
+        'password': 'secret1', 'confirm_password': 'secret1'
+    })
+    client.post('/auth/login', data={'email': 'bench@example.com', 'password': 'secret1'})
+    for i in range(20):
+        client.post('/tasks/create', data={'title': f'Задача {i}', 'description': '', 'priority': 'medium'})
+
+    # Прогрев (шаблоны, кэши)
+    for url in URLS:
+        client.get(url)
+
+    started = time.perf_counter()
+    for i in range(REQUESTS):
+        client.get(URLS[i % len(URLS)])
+    return (time.perf_counter() - started) / REQUESTS * 1_000_000
+
+
+def main():
+    config['bench_plain'] = PlainConfig
+    config['bench_instrumented'] = InstrumentedConfig
+
+    plain = run('bench_plain')
+    instrumented = run('bench_instrumented')
+    print(f'выключено: {plain:8.1f} мкс/запрос')
+    print(f'включено:  {instrumented:8.1f} мкс/запрос ({(instrumented / plain - 1) * 100:+.1f}%)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк фоновых задач: сколько запрос импорта держит поток сервера
+синхронно и через очередь (ответ 202), и пропускная способность очереди
+(пустые задачи через пул потоков, SQLite в файле)
+
+Запуск: python benchmarks/bench_jobs.py [строк в файле импорта]
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.config import TestingConfig, config
+from app.extensions import db
+from app.models import User, Job
+
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 50_000
+EMPTY_JOBS = 500
+WORKERS = 4
+
+
+def make_app(path, sync_max_bytes):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000}
+        QUERY_BUDGET_ENFORCE = False
+        WTF_CSRF_ENABLED = False
+        MAX_CONTENT_LENGTH = None
+        IMPORT_SYNC_MAX_BYTES = sync_max_bytes
+        JOBS_WORKERS = WORKERS
+        JOBS_POLL_SECONDS = 0.1
+    config['bench_jobs'] = BenchConfig
+    return create_app('bench_jobs')
+
+
+def login(app):
+    with app.app_context():
+        user = User.query.filter_by(username='bench').first()
+        if user is None:
+            user = User(username='bench', email='bench@example.com')
+            user.password_hash = '-'
+            db.session.add(user)
+            db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def wait_done(app, job_id, timeout=300):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        with app.app_context():
+            job = db.session.get(Job, job_id)
+            if job.finished:
+                return job.status
+        time.sleep(0.05)
+    return 'timeout'
+
+
+def measure_import(app, data, background):
+    client = login(app)
+    started = time.perf_counter()
+    response = client.post(
+        '/tasks/import',
+        data={'file': (io.BytesIO(data), 'bench.jsonl')},
+        content_type='multipart/form-data',
+        headers={'Accept': 'application/json'}
+    )
+    latency = time.perf_counter() - started
+    if background:
+        assert response.status_code == 202, response.status_code
+        status = wait_done(app, response.json['id'])
+        assert status == 'done', status
+    return latency, time.perf_counter() - started
+
+
+def main():
+    from app.jobs import queue
+
+    @queue.job('bench.noop')
+    def noop(ctx):
+        return None
+
+    data = ''.join(
+        json.dumps({'title': f'Задача номер {i}', 'description': 'Описание', 'priority': 'medium'}, ensure_ascii=False) + '\n'
+        for i in range(ROWS)
+    ).encode('utf-8')
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_jobs.db')
+    print(f'Импорт {ROWS} строк ({len(data) / 1024 / 1024:.1f} МБ): сколько занят поток запроса\n')
+    print(f"{'режим':>10} | {'ответ, мс':>10} | {'до готовности, с':>17}")
+    print('-' * 44)
+    for background in (False, True):
+        app = make_app(path, 0 if background else 10 ** 12)
+        latency, total = measure_import(app, data, background)
+        mode = 'очередь' if background else 'синхронно'
+        print(f'{mode:>10} | {latency * 1000:>10.1f} | {total:>17.2f}')
+        app.extensions['jobs'].stop()
+
+    app = make_app(path, 0)
+    login(app).get('/tasks/')  # первый запрос запускает потоки
+    with app.test_request_context():
+        started = time.perf_counter()
+        ids = [queue.enqueue('bench.noop').id for _ in range(EMPTY_JOBS)]
+        enqueued = time.perf_counter() - started
+    wait_done(app, ids[-1])
+    with app.app_context():
+        while Job.query.filter(Job.name == 'bench.noop', Job.status != 'done').count():
+            time.sleep(0.05)
+    total = time.perf_counter() - started
+    app.extensions['jobs'].stop()
+
+    print(f'\n{EMPTY_JOBS} пустых задач, потоков {WORKERS}: постановка {enqueued / EMPTY_JOBS * 1000:.2f} мс/задача, '
+          f'все выполнены за {total:.2f} с ({EMPTY_JOBS / total:.0f} задач/с)')
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест входа: сколько входов в секунду выдерживает serve.py при p99
+не выше P99_TARGET_MS - проверка пароля в потоке запроса (PASSWORD_HASH_WORKERS=0)
+и в пуле процессов (app/auth/passwords.py)
+
+Открытая нагрузка: входы идут с заданной частотой независимо от ответов (как утром,
+когда все входят сами по себе), частота - доли расчетной емкости ядер
+(ядра / время одного хеша). Параллельно раз в PROBE_SECONDS запрашивается
+легкая страница - видно, как шторм входов задевает остальные запросы
+
+Запуск: python benchmarks/bench_login.py [процессов пула]   (по умолчанию 2)
+"""
+import os
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+WORKDIR = tempfile.mkdtemp()
+ENV = {
+    'FLASK_ENV': 'production',
+    'DATABASE_URL': f'sqlite:///{os.path.join(WORKDIR, "bench_login.db")}',
+    'SECRET_KEY': 'bench-login-secret',
+    'JOBS_WORKERS': '0',
+    'SHARED_SWEEP_SECONDS': '0',
+}
+os.environ.update(ENV)
+
+from werkzeug.security import generate_password_hash
+from app import create_app, migrations
+from app.config import ProductionConfig
+from app.extensions import db
+from app.models import User
+
+
+USERS = 20
+PASSWORD = 'bench-password'
+DURATION = 10.0  # секунд на точку
+P99_TARGET_MS = 1000
+LOADS = (0.25, 0.5, 0.75, 0.9, 1.0, 1.25)  # доли емкости
+PROBE_SECONDS = 0.1
+CPUS = os.cpu_count() or 1
+
+
+def prepare():
+    """Пользователи с хешем продакшена; время одного хеша в секундах"""
+    method = ProductionConfig.PASSWORD_HASH_METHOD
+    started = time.perf_counter()
+    password_hash = generate_password_hash(PASSWORD, method)
+    cost = time.perf_counter() - started
+
+    app = create_app('production', check_schema=False)
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        for i in range(USERS):
+            db.session.add(User(username=f'bench{i}', email=f'bench{i}@example.com', password_hash=password_hash))
+        db.session.commit()
+        db.engine.dispose()
+    return method, cost
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, hash_workers):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'serve.py'), '--workers', '1', '--port', str(port)],
+        cwd=ROOT, env={**os.environ, **ENV, 'PASSWORD_HASH_WORKERS': str(hash_workers)},
+        stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('serve.py не запустился')
+
+
+def http(port, request):
+    """Сырой HTTP/1.1 запрос: (код ответа, ответ целиком)"""
+    with socket.create_connection(('127.0.0.1', port), timeout=60) as sock:
+        sock.sendall(request)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    response = b''.join(chunks)
+    return int(response[9:12]), response
+
+
+def login_form(port):
+    """CSRF токен и cookie анонимной сессии (одни на все входы замера)"""
+    _, response = http(port, f'GET /auth/login HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode())
+    cookie = re.search(rb'Set-Cookie: session=([^;]+)', response).group(1).decode()
+    token = re.search(rb'name="csrf_token" type="hidden" value="([^"]+)"', response).group(1).decode()
+    return cookie, token
+
+
+def login_request(port, cookie, token, i):
+    body = urlencode({'csrf_token': token, 'email': f'bench{i % USERS}@example.com', 'password': PASSWORD})
+    return (
+        f'POST /auth/login HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: session={cookie}\r\n'
+        f'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(body)}\r\n'
+        f'Connection: close\r\n\r\n{body}'
+    ).encode()
+
+
+def measure(port, rate):
+    """Входы с частотой rate в секунду в течение DURATION; легкие запросы параллельно"""
+    cookie, token = login_form(port)
+    logins = []
+    rejected = []
+    probes = []
+    stop = threading.Event()
+
+    def one_login(i, scheduled):
+        try:
+            status, _ = http(port, login_request(port, cookie, token, i))
+        except OSError:
+            status = 0
+        # Задержка от запланированного момента: очередь клиента тоже считается
+        (logins if status == 302 else rejected).append(time.perf_counter() - scheduled)
+
+    def probe():
+        request = b'GET /auth/login HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                http(port, request)
+                probes.append(time.perf_counter() - started)
+            except OSError:
+                pass
+            stop.wait(PROBE_SECONDS)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    total = int(rate * DURATION)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=256) as clients:
+        for i in range(total):
+            scheduled = started + i / rate
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+            clients.submit(one_login, i, scheduled)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+
+    logins.sort()
+    probes.sort()
+    return {
+        'done': len(logins) / elapsed,
+        'p50': statistics.median(logins) * 1000 if logins else float('nan'),
+        'p99': logins[int(len(logins) * 0.99)] * 1000 if logins else float('inf'),
+        'rejected': len(rejected),
+        'probe_p99': probes[int(len(probes) * 0.99)] * 1000 if probes else float('nan'),
+    }
+
+
+def main():
+    pool_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    method, cost = prepare()
+    capacity = CPUS / cost
+    modes = [('в потоке', 0), (f'пул x{pool_workers}', pool_workers)]
+
+    print(f'Ядер: {CPUS}, хеш {method}: {cost * 1000:.0f} мс, емкость ~{capacity:.1f} входов/с, '
+          f'замер {DURATION:.0f} с на точку\n')
+    print(f"{'режим':>10} | {'задано/с':>8} | {'вошло/с':>8} | {'p50, мс':>8} | {'p99, мс':>8} | "
+          f"{'отказов':>7} | {'страница p99, мс':>16}")
+    print('-' * 86)
+    best = {}
+    for name, hash_workers in modes:
+        port = free_port()
+        server = start_server(port, hash_workers)
+        try:
+            http(port, login_request(port, *login_form(port), 0))  # прогрев (пул создается при первом входе)
+            for load in LOADS:
+                rate = capacity * load
+                result = measure(port, rate)
+                print(f"{name:>10} | {rate:>8.1f} | {result['done']:>8.1f} | {result['p50']:>8.0f} | "
+                      f"{result['p99']:>8.0f} | {result['rejected']:>7} | {result['probe_p99']:>16.0f}")
+                if result['p99'] <= P99_TARGET_MS and not result['rejected']:
+                    best[name] = max(best.get(name, 0), result['done'])
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(60)
+
+    print(f'\nМаксимум входов/с при p99 <= {P99_TARGET_MS} мс:')
+    for name, _ in modes:
+        print(f'  {name}: {best.get(name, 0):.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Чтение с реплики: потоки-читатели открывают список задач и статистику, один
+поток создает задачи, 15 секунд. Все на основной БД против чтения с реплики
+(@read_only маршруты), реплика - копия SQLite-файла раз в SYNC_SECONDS
+(как python manage.py db sync-replicas)
+
+На одной машине реплика делит с основной БД процессор и диск - выигрыш по скорости
+появляется, когда реплика на другом сервере. Здесь видно цену маршрутизации (SQL на
+реплике, новое соединение SQLite на запрос) и размер WAL основной БД
+
+Запуск: python benchmarks/bench_replicas.py [потоков-читателей]   (по умолчанию 4)
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+from app import create_app, migrations
+from app.config import ProductionConfig, config
+from app.extensions import db
+from app.models import User, Task
+from app.replicas import sync_sqlite_replicas
+
+
+READERS = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+DURATION = 15.0
+SYNC_SECONDS = 2.0
+TASKS = 2000
+READ_PATHS = ('/tasks/', '/tasks/?filter=active', '/statistics/api/daily-stats')
+
+
+def make_app(path, replica):
+    class BenchConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLALCHEMY_REPLICA_URIS = [f'sqlite:///{replica}'] if replica else []
+        JOBS_WORKERS = 0
+        SHARED_SWEEP_SECONDS = 0
+        EVENTS_BACKEND = 'local'
+        STARTUP_WARMUP = False
+        WTF_CSRF_ENABLED = False
+    config['bench_replicas'] = BenchConfig
+    return create_app('bench_replicas', check_schema=False)
+
+
+def prepare(app):
+    """Читатель с TASKS задачами и отдельный писатель (id пользователей)"""
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        reader = User(username='reader', email='reader@example.com', password_hash='-')
+        writer = User(username='writer', email='writer@example.com', password_hash='-')
+        db.session.add_all([reader, writer])
+        db.session.flush()
+        db.session.add_all([
+            Task(title=f'Задача {i}', description='Описание', priority=('low', 'medium', 'high')[i % 3],
+                 completed=i % 4 == 0, user_id=reader.id)
+            for i in range(TASKS)
+        ])
+        db.session.commit()
+        return reader.id, writer.id
+
+
+def client_for(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def run(replicated):
+    workdir = tempfile.mkdtemp()
+    primary = os.path.join(workdir, 'primary.db')
+    replica = os.path.join(workdir, 'replica.db') if replicated else None
+    app = make_app(primary, replica)
+    reader_id, writer_id = prepare(app)
+
+    # Сколько SQL ушло на каждый движок
+    executed = {}
+    with app.app_context():
+        for key, engine in db.engines.items():
+            executed[key] = 0
+            event.listen(engine, 'before_cursor_execute',
+                         lambda *args, key=key: executed.__setitem__(key, executed[key] + 1))
+
+    stop = threading.Event()
+    reads = []
+    writes = []
+    wal_sizes = []
+
+    def read_loop():
+        client = client_for(app, reader_id)
+        done = 0
+        while not stop.is_set():
+            for path in READ_PATHS:
+                assert client.get(path).status_code == 200
+                done += 1
+        reads.append(done)
+
+    def write_loop():
+        client = client_for(app, writer_id)
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.post('/tasks/create', data={'title': f'Новая {i}', 'description': '', 'priority': 'medium'})
+            writes.append(time.perf_counter() - started)
+            i += 1
+
+    def sync_loop():
+        while not stop.wait(SYNC_SECONDS):
+            with app.app_context():
+                sync_sqlite_replicas()
+
+    def watch_wal():
+        while not stop.wait(0.5):
+            try:
+                wal_sizes.append(os.path.getsize(primary + '-wal'))
+            except OSError:
+                pass
+
+    if replicated:
+        with app.app_context():
+            sync_sqlite_replicas()
+        time.sleep(0.1)
+    threads = [threading.Thread(target=read_loop) for _ in range(READERS)]
+    threads += [threading.Thread(target=write_loop), threading.Thread(target=watch_wal)]
+    if replicated:
+        threads.append(threading.Thread(target=sync_loop))
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    writes.sort()
+    return {
+        'reads': sum(reads) / DURATION,
+        'writes': len(writes) / DURATION,
+        'write_p50': statistics.median(writes) * 1000,
+        'write_p99': writes[int(len(writes) * 0.99)] * 1000,
+        'wal_mb': max(wal_sizes or [0]) / 1024 / 1024,
+        'on_replica': executed.get('replica_0', 0) / max(1, sum(executed.values())) * 100,
+    }
+
+
+def main():
+    print(f'Читателей: {READERS}, задач у читателя: {TASKS}, замер {DURATION:.0f} с, ядер: {os.cpu_count()}\n')
+    print(f"{'режим':>22} | {'чтений/с':>8} | {'записей/с':>9} | {'запись p50, мс':>14} | "
+          f"{'запись p99, мс':>14} | {'WAL макс, МБ':>12} | {'SQL на реплике, %':>17}")
+    print('-' * 116)
+    for name, replicated in (('все на основной БД', False), (f'реплика (копия {SYNC_SECONDS:.0f} с)', True)):
+        result = run(replicated)
+        print(f"{name:>22} | {result['reads']:>8.1f} | {result['writes']:>9.1f} | {result['write_p50']:>14.1f} | "
+              f"{result['write_p99']:>14.1f} | {result['wal_mb']:>12.2f} | {result['on_replica']:>17.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк полнотекстового поиска: задержка запроса при 1M задач
+(1000 пользователей, у одного 10% всех задач; SQLite во временном файле)
+
+Сравнивает search_page (FTS5, keyset) с наивным LIKE '%x%'
+по названию и описанию задач пользователя
+
+Запуск: python benchmarks/bench_search.py [количество задач]
+"""
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.config import TestingConfig, config
+from app.extensions import db
+from app.models import User, Task, TaskPriority
+from app.tasks.search import search_page
+
+
+TOTAL = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+USERS = 1000
+REPEAT = 20
+VOCABULARY = 5000
+PRIORITIES = ['low', 'medium', 'high']
+SYLLABLES = ['ка', 'ро', 'ми', 'ту', 'ле', 'на', 'со', 'пра', 'вет', 'ду', 'зо', 'ки', 'ло', 'ме', 'рус', 'та']
+
+
+def make_words(count):
+    """Псевдослова из слогов; частота слова ~ 1/ранг (закон Ципфа, как в живом тексте)"""
+    rnd = random.Random(7)
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rnd.choices(SYLLABLES, k=rnd.randint(2, 4))))
+    words = sorted(sorted(words), key=lambda word: rnd.random())
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, count + 1)))
+    return words, cum_weights
+
+
+WORDS, CUM_WEIGHTS = make_words(VOCABULARY)
+
+# (название, запрос) по рангу слова: 1 - как предлог "и", 50 - частое, 2000 - редкое
+QUERIES = [
+    ('самое частое', WORDS[0]),
+    ('частое слово', WORDS[49]),
+    ('редкое слово', WORDS[1999]),
+    ('префикс', WORDS[19][:4]),
+    ('два слова', f'{WORDS[9]} {WORDS[99]}'),
+]
+
+
+def make_config(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'OFF', 'cache_size': -200000}
+        QUERY_BUDGET_ENFORCE = False
+    return BenchConfig
+
+
+def fill(total):
+    """Пользователи и задачи пачками (FTS индекс заполняют триггеры)"""
+    rnd = random.Random(42)
+    db.session.execute(db.insert(User), [
+        {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password_hash': '-'}
+        for i in range(USERS)
+    ])
+    user_ids = [row.id for row in db.session.query(User.id)]
+
+    now = datetime.now()
+    rows = []
+    for i in range(total):
+        priority = PRIORITIES[i % 3]
+        rows.append({
+            'title': ' '.join(rnd.choices(WORDS, cum_weights=CUM_WEIGHTS, k=4)),
+            'description': ' '.join(rnd.choices(WORDS, cum_weights=CUM_WEIGHTS, k=12)),
+            'priority': priority,
+            'priority_rank': TaskPriority.rank(priority),
+            'completed': False,
+            'created_at': now - timedelta(minutes=i),
+            'updated_at': now - timedelta(minutes=i),
+            # Каждая десятая задача - у одного "тяжелого" пользователя
+            'user_id': user_ids[0] if i % 10 == 0 else user_ids[i % USERS],
+        })
+        if len(rows) == 20_000:
+            db.session.execute(db.insert(Task), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(Task), rows)
+    db.session.commit()
+    return user_ids
+
+
+def like_search(user_id, query, limit=10):
+    """Наивный поиск: LIKE по каждому слову (просмотр задач пользователя, без ранжирования)"""
+    q = Task.query.filter(Task.user_id == user_id)
+    for term in query.split():
+        pattern = f'%{term}%'
+        q = q.filter(Task.title.like(pattern) | Task.description.like(pattern))
+    return q.order_by(Task.id.desc()).limit(limit + 1).all()
+
+
+def timed(func, *args):
+    """Медиана и p95 в мс по REPEAT повторам"""
+    samples = []
+    for _ in range(REPEAT):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+    config['bench_search'] = make_config(path)
+    app = create_app('bench_search')
+
+    with app.app_context():
+        started = time.perf_counter()
+        user_ids = fill(TOTAL)
+        print(f'{TOTAL} задач вставлено (с FTS индексом) за {time.perf_counter() - started:.1f} с')
+        heavy, typical = user_ids[0], user_ids[1]
+
+        for label, user_id in (('тяжелый пользователь', heavy), ('обычный пользователь', typical)):
+            count = Task.query.filter_by(user_id=user_id).count()
+            print(f'\n{label}: {count} задач')
+            print(f"{'запрос':>14} | {'FTS p50':>8} | {'FTS p95':>8} | {'LIKE p50':>9} | {'LIKE p95':>9}")
+            print('-' * 61)
+            for name, query in QUERIES:
+                fts = timed(search_page, user_id, query)
+                like = timed(like_search, user_id, query)
+                print(f'{name:>14} | {fts[0]:>8.2f} | {fts[1]:>8.2f} | {like[0]:>9.2f} | {like[1]:>9.2f}')
+
+        # Вторая страница по курсору стоит столько же, сколько первая
+        _, cursor = search_page(heavy, WORDS[49])
+        page2 = timed(search_page, heavy, WORDS[49], cursor)
+        print(f'\nвторая страница (частое слово): p50 {page2[0]:.2f} мс')
+
+    print(f'\nБД: {path} ({os.path.getsize(path) / 1024 / 1024:.0f} МБ)')
+
+
+if __name__ == '__main__':
+    main()
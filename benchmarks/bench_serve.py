@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест serve.py: запросов в секунду на /tasks/ (200 задач, страница
+со счетчиками) и /shared/task/<token> в зависимости от числа процессов
+
+Нагрузку дают отдельные процессы-клиенты (сырые сокеты, новое соединение на запрос -
+Werkzeug не держит keep-alive). Клиенты делят ядра с сервером: рост с числом
+процессов виден, пока ядер больше, чем процессов сервера
+
+Запуск: python benchmarks/bench_serve.py [процессов ...]   (по умолчанию 1, 2, ядра/2, ядра)
+"""
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+WORKDIR = tempfile.mkdtemp()
+ENV = {
+    'FLASK_ENV': 'production',
+    'DATABASE_URL': f'sqlite:///{os.path.join(WORKDIR, "bench_serve.db")}',
+    'SECRET_KEY': 'bench-serve-secret',
+    'JOBS_WORKERS': '0',
+    'SHARED_SWEEP_SECONDS': '0',
+}
+# До импорта app: config читает переменные окружения при импорте
+os.environ.update(ENV)
+
+from app import create_app, migrations
+from app.extensions import db
+from app.models import User, Task, SharedTask, TaskPriority
+from app import counters
+
+
+TASKS = 200
+DURATION = 5.0  # секунд на замер
+CPUS = os.cpu_count() or 1
+CLIENTS = max(8, CPUS * 2)
+
+
+def prepare():
+    """БД с пользователем, задачами и общей ссылкой; cookie сессии пользователя"""
+    app = create_app('production', check_schema=False)
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        user = User(username='bench', email='bench@example.com', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        now = datetime.now()
+        deltas = counters.Deltas()
+        for i in range(TASKS):
+            priority = ('low', 'medium', 'high')[i % 3]
+            created_at = now - timedelta(hours=i)
+            completed_at = created_at + timedelta(minutes=30) if i % 4 == 0 else None
+            db.session.add(Task(
+                title=f'Задача {i}', description='Описание задачи ' * 5, priority=priority,
+                priority_rank=TaskPriority.rank(priority), user_id=user.id,
+                completed=completed_at is not None, created_at=created_at, completed_at=completed_at
+            ))
+            deltas.added(created_at, completed_at)
+        db.session.flush()
+        counters.apply(user.id, deltas)
+        token = 'b' * 32
+        db.session.add(SharedTask(token=token, task_id=Task.query.first().id, user_id=user.id))
+        db.session.commit()
+        cookie = app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(user.id), '_fresh': True})
+        db.engine.dispose()
+    return cookie, token
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, port):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'serve.py'), '--workers', str(workers), '--port', str(port)],
+        cwd=ROOT, env={**os.environ, **ENV}, stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('serve.py не запустился')
+
+
+def client(args):
+    """Запросы подряд до конца замера: (задержки в секундах, ошибок)"""
+    port, request, stop_at = args
+    latencies = []
+    errors = 0
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=10) as sock:
+                sock.sendall(request)
+                chunks = []
+                while chunk := sock.recv(65536):
+                    chunks.append(chunk)
+            ok = b''.join(chunks[:1]).startswith(b'HTTP/1.1 200')
+        except OSError:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+def measure(pool, port, path, cookie):
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n'
+        f'Cookie: session={cookie}\r\nConnection: close\r\n\r\n'
+    ).encode()
+    # Прогрев (кэши процессов, соединения с БД)
+    pool.map(client, [(port, request, time.monotonic() + 1.0)] * CLIENTS)
+    stop_at = time.monotonic() + DURATION
+    results = pool.map(client, [(port, request, stop_at)] * CLIENTS)
+    latencies = sorted(latency for result, _ in results for latency in result)
+    errors = sum(errors for _, errors in results)
+    return {
+        'rps': len(latencies) / DURATION,
+        'p50': statistics.median(latencies) * 1000,
+        'p99': latencies[int(len(latencies) * 0.99)] * 1000,
+        'errors': errors,
+    }
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or sorted({1, 2, max(CPUS // 2, 1), CPUS})
+    cookie, token = prepare()
+    paths = [('/tasks/', '/tasks/'), ('/shared/task/<token>', f'/shared/task/{token}')]
+    
+    print(f'Ядер: {CPUS}, клиентов: {CLIENTS}, замер {DURATION:.0f} с на точку\n')
+    print(f"{'маршрут':>22} | {'процессов':>9} | {'запр/с':>8} | {'p50, мс':>8} | {'p99, мс':>8} | {'ошибок':>6}")
+    print('-' * 78)
+    with multiprocessing.get_context('fork').Pool(CLIENTS) as pool:
+        for workers in counts:
+            port = free_port()
+            server = start_server(workers, port)
+            try:
+                for name, path in paths:
+                    result = measure(pool, port, path, cookie)
+                    print(f"{name:>22} | {workers:>9} | {result['rps']:>8.0f} | {result['p50']:>8.1f} | "
+                          f"{result['p99']:>8.1f} | {result['errors']:>6}")
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк запуска: время до первого ответа нового процесса (интерпретатор,
+импорт, create_app, первый запрос /auth/login) в production-конфигурации
+
+Режимы: без кэша байткода и прогрева (шаблоны компилируются первым запросом),
+кэш байткода пуст / заполнен, с прогревом при старте и без.
+Плюс сводка python -X importtime по пакетам
+
+Запуск: python benchmarks/bench_startup.py [повторов]
+"""
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+REPEAT = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+# (название, кэш байткода, прогрев, очищать кэш перед каждым запуском)
+MODES = [
+    ('без кэша, без прогрева', False, False, False),
+    ('кэш пуст, прогрев', True, True, True),
+    ('кэш заполнен, без прогрева', True, False, False),
+    ('кэш заполнен, прогрев', True, True, False),
+]
+
+# Процесс-замер: печатает time.time() после импорта, create_app и первого ответа
+CHILD = '''
+import json, sys, time
+from app import create_app
+from app.config import ProductionConfig, config
+imported = time.time()
+overrides = json.loads(sys.argv[1])
+config['bench_startup'] = type('BenchConfig', (ProductionConfig,), overrides)
+app = create_app('bench_startup')
+created = time.time()
+response = app.test_client().get('/auth/login')
+assert response.status_code == 200, response.status_code
+print(json.dumps([imported, created, time.time()]))
+'''
+
+
+def run_child(env, overrides, importtime=False):
+    started = time.time()
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD, json.dumps(overrides)]
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    imported, created, answered = json.loads(result.stdout.strip().splitlines()[-1])
+    return (imported - started, created - imported, answered - created, answered - started), result.stderr
+
+
+def import_summary(stderr, top=8):
+    """Собственное время импорта модулей по пакетам верхнего уровня"""
+    totals = Counter()
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)', line)
+        if match:
+            totals[match.group(2).split('.')[0]] += int(match.group(1))
+    return totals.most_common(top)
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    cache_dir = os.path.join(workdir, 'jinja_cache')
+    env = {
+        **os.environ,
+        'FLASK_ENV': 'production',
+        'DATABASE_URL': f'sqlite:///{os.path.join(workdir, "bench_startup.db")}',
+        'JOBS_WORKERS': '0',
+        'STARTUP_PROFILE': 'false',
+    }
+    subprocess.run([sys.executable, 'manage.py', 'db', 'upgrade'], cwd=ROOT, env=env, check=True, capture_output=True)
+    
+    print(f'Время до первого ответа нового процесса, медиана из {REPEAT}\n')
+    print(f"{'режим':>28} | {'импорт, мс':>10} | {'create_app, мс':>14} | {'1-й запрос, мс':>14} | {'итого, мс':>9}")
+    print('-' * 88)
+    for name, bytecode_cache, warmup, clear_cache in MODES:
+        overrides = {
+            'JINJA_BYTECODE_CACHE': bytecode_cache,
+            'JINJA_BYTECODE_CACHE_DIR': cache_dir,
+            'STARTUP_WARMUP': warmup,
+        }
+        if not clear_cache:
+            run_child(env, overrides)  # заполнить кэш
+        runs = []
+        for _ in range(REPEAT):
+            if clear_cache:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            runs.append(run_child(env, overrides)[0])
+        imported, created, first, total = (statistics.median(column) * 1000 for column in zip(*runs))
+        print(f'{name:>28} | {imported:>10.0f} | {created:>14.0f} | {first:>14.1f} | {total:>9.0f}')
+    
+    _, stderr = run_child(env, {'JINJA_BYTECODE_CACHE_DIR': cache_dir}, importtime=True)
+    print('\nИмпорт по пакетам (python -X importtime, собственное время модулей):')
+    for package, microseconds in import_summary(stderr):
+        print(f'  {package:<20} {microseconds / 1000:>7.1f} мс')
+    
+    shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк страницы статистики: пиковая память и время расчета
+при росте количества задач пользователя (1k -> 100k)
+
+Сравнивает старый путь (загрузка всех Task в Python)
+с агрегатным (collect_stats: счетчики по окну последних 7 дней, итоги -
+из user_task_counters). Время агрегатного пути не должно расти с числом задач
+
+Запуск: python benchmarks/bench_statistics.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Task, TaskPriority
+from app.statistics.aggregates import collect_stats
+from app.counters import get_counters, rebuild_user
+
+
+SIZES = [1_000, 10_000, 100_000]
+PRIORITIES = ['low', 'medium', 'high']
+
+
+def fill_tasks(user_id, count):
+    """Быстро вставляет count задач пачками"""
+    now = datetime.now()
+    rows = []
+    for i in range(count):
+        created = now - timedelta(minutes=i * 7)
+        done = i % 3 == 0
+        rows.append({
+            'title': f'Задача {i}',
+            'description': 'Описание задачи ' * 10,
+            'priority': PRIORITIES[i % 3],
+            'priority_rank': TaskPriority.rank(PRIORITIES[i % 3]),
+            'completed': done,
+            'completed_at': created + timedelta(hours=2) if done else None,
+            'created_at': created,
+            'updated_at': created,
+            'user_id': user_id,
+        })
+        if len(rows) == 10_000:
+            db.session.execute(db.insert(Task), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(Task), rows)
+    db.session.commit()
+
+
+def legacy_stats(user_id):
+    """Старый путь statistics(): все строки в память и подсчет в Python"""
+    all_tasks = Task.query.filter_by(user_id=user_id).all()
+    last_week = datetime.now() - timedelta(days=7)
+    recent = [t for t in all_tasks if t.created_at >= last_week]
+    return (
+        len(all_tasks),
+        sum(1 for t in all_tasks if t.completed),
+        sum(1 for t in recent if t.priority == 'high'),
+    )
+
+
+def aggregate_stats(user_id):
+    """Новый путь: итоги из счетчиков и один агрегатный SELECT по окну"""
+    today = datetime.now().date()
+    get_counters(user_id)
+    return collect_stats(
+        user_id,
+        first_day=today - timedelta(days=6),
+        days=7,
+        since=datetime.now() - timedelta(days=7)
+    )
+
+
+def measure(func, user_id):
+    """Возвращает (время в мс, пиковая память в КБ)"""
+    db.session.expunge_all()
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(user_id)
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def main():
+    # testing-конфигурация: SQLite в памяти, рабочая БД не трогается
+    app = create_app('testing')
+
+    print(f"{'задач':>8} | {'legacy мс':>10} | {'legacy КБ':>10} | {'aggr мс':>8} | {'aggr КБ':>8}")
+    print('-' * 56)
+
+    with app.app_context():
+        for size in SIZES:
+            user = User(username=f'bench{size}', email=f'bench{size}@example.com')
+            user.password_hash = '-'
+            db.session.add(user)
+            db.session.commit()
+            fill_tasks(user.id, size)
+            rebuild_user(user.id)  # счетчики, как после обычной работы приложения
+            db.session.commit()
+
+            legacy_ms, legacy_kb = measure(legacy_stats, user.id)
+            aggr_ms, aggr_kb = measure(aggregate_stats, user.id)
+            print(f'{size:>8} | {legacy_ms:>10.1f} | {legacy_kb:>10.0f} | {aggr_ms:>8.1f} | {aggr_kb:>8.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк чистки истекших общих ссылок: 500k ссылок, 40% истекли
+(SQLite во временном файле)
+
+Сравнивает размер пачки: одна пачка - один DELETE держит блокировку записи
+все время чистки, маленькие пачки - дольше в сумме, но каждая пауза для
+остальных писателей короткая. Отдельно - та же чистка без индекса expires_at
+
+Запуск: python benchmarks/bench_sweep.py [количество ссылок]
+"""
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.config import TestingConfig, config
+from app.extensions import db
+from app.models import SharedTask
+from app.shared.sweeper import sweep_expired, count_expired
+
+
+TOTAL = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+EXPIRED_SHARE = 0.4
+# (название, размер пачки, оставить индекс)
+MODES = [
+    ('один DELETE', None, True),
+    ('пачки 5000', 5000, True),
+    ('пачки 1000', 1000, True),
+    ('пачки 500', 500, True),
+    ('1000 без индекса', 1000, False),
+]
+
+
+def make_app(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}
+    config['bench_sweep'] = BenchConfig
+    return create_app('bench_sweep')
+
+
+def fill(path):
+    """Ссылки: истекшие (в прошлом), действующие (в будущем) и бессрочные вперемешку"""
+    make_app(path)
+    now = datetime.now()
+    con = sqlite3.connect(path)
+    con.execute("INSERT INTO users (id, username, email, password_hash) VALUES (1, 'bench', 'bench@example.com', '-')")
+    con.execute("INSERT INTO tasks (id, title, user_id, priority, priority_rank, completed) VALUES (1, 'Задача', 1, 'medium', 2, 0)")
+    
+    def rows():
+        for i in range(TOTAL):
+            bucket = i % 10
+            if bucket < EXPIRED_SHARE * 10:
+                expires_at = now - timedelta(minutes=i % 100_000)
+            elif bucket < 8:
+                expires_at = now + timedelta(minutes=1 + i % 100_000)
+            else:
+                expires_at = None
+            yield f'{i:032x}', 1, 1, now - timedelta(days=30), expires_at
+    
+    con.executemany(
+        'INSERT INTO shared_tasks (token, task_id, user_id, created_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+        ((token, task_id, user_id, str(created), str(expires) if expires else None)
+         for token, task_id, user_id, created, expires in rows())
+    )
+    con.commit()
+    # Все из WAL - в основной файл: шаблон копируется одним файлом
+    con.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    con.close()
+
+
+def delete_all(now):
+    """Вся чистка одним DELETE (одна транзакция)"""
+    started = time.perf_counter()
+    deleted = db.session.query(SharedTask).filter(SharedTask.expires_at < now).delete(synchronize_session=False)
+    db.session.commit()
+    seconds = time.perf_counter() - started
+    return {'deleted': deleted, 'batches': [{'rows': deleted, 'seconds': seconds}], 'seconds': seconds}
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    template = os.path.join(workdir, 'template.db')
+    fill(template)
+    
+    print(f'Ссылок: {TOTAL}, истекших: {int(TOTAL * EXPIRED_SHARE)}\n')
+    print(f"{'режим':>18} | {'всего, с':>8} | {'пачек':>6} | {'пачка p50, мс':>13} | {'пачка max, мс':>13}")
+    print('-' * 72)
+    for number, (name, batch_size, keep_index) in enumerate(MODES):
+        path = os.path.join(workdir, f'run{number}.db')
+        shutil.copy(template, path)
+        if not keep_index:
+            con = sqlite3.connect(path)
+            con.execute('DROP INDEX idx_shared_tasks_expires_at')
+            con.close()
+        
+        app = make_app(path)
+        with app.app_context():
+            expired = count_expired()
+            if batch_size is None:
+                report = delete_all(datetime.now())
+            else:
+                report = sweep_expired(batch_size=batch_size)
+            assert report['deleted'] == expired == int(TOTAL * EXPIRED_SHARE), (report['deleted'], expired)
+            assert count_expired() == 0
+            db.engine.dispose()
+        
+        batch_ms = [batch['seconds'] * 1000 for batch in report['batches']]
+        print(f"{name:>18} | {report['seconds']:>8.2f} | {len(batch_ms):>6} | "
+              f"{statistics.median(batch_ms):>13.1f} | {max(batch_ms):>13.1f}")
+    
+    shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Служебные команды MyTasks
+
+    python manage.py db upgrade
+    python manage.py db check
+    python manage.py db generate "add something"
+    python manage.py counters verify
+    python manage.py counters rebuild --user 1
+    python manage.py tasks import tasks.csv --user 1 --chunk-size 5000
+    python manage.py jobs worker --threads 2
+    python manage.py shared sweep
+"""
+from dotenv import load_dotenv
+
+# До импорта app: config читает переменные окружения при импорте
+load_dotenv()
+
+from flask.cli import FlaskGroup
+from app import create_app
+
+
+def create_cli_app():
+    """Приложение для команд: без проверки схемы, иначе db upgrade не запустить"""
+    return create_app(check_schema=False)
+
+
+cli = FlaskGroup(create_app=create_cli_app, load_dotenv=False)
+
+
+if __name__ == '__main__':
+    cli()
@@ -1,27 +1,22 @@
 #!/usr/bin/env python3
 """
-Запуск To-Do List приложения
+Запуск To-Do List приложения (сервер разработки)
+Production: python serve.py --workers 4 (или любой WSGI сервер с wsgi:app)
 """
 import os
 import sys
 from dotenv import load_dotenv
+
+# Загрузи переменные окружения до импорта app (config читает их при импорте)
+load_dotenv()
+
 from app import create_app
-from app.extensions import db
 
 def create_app_instance():
-    """Создает и конфигурирует приложение"""
-    app = create_app()
-    
-    # Зарегистрируй маршруты
-    with app.app_context():
-        db.create_all()
-    
-    return app
+    """Создает и конфигурирует приложение (схема проверяется внутри create_app)"""
+    return create_app()
 
 if __name__ == '__main__':
-    # Загрузи переменные окружения
-    load_dotenv()
-    
     app = create_app_instance()
     
     # Получи параметры запуска
@@ -30,7 +25,7 @@ if __name__ == '__main__':
     debug = os.environ.get('FLASK_ENV', 'development') == 'development'
     
     print(f"🚀 Запуск MyTasks на http://{host}:{port}")
-    print(f"📱 Админка: http://{host}:{port}/admin")
+    print(f"📋 Задачи: http://{host}:{port}/tasks/")
     print(f"📊 Статистика: http://{host}:{port}/statistics/dashboard")
     
     app.run(
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Production запуск MyTasks: мастер-процесс и N процессов-обработчиков (pre-fork)
+Каждый процесс - свой интерпретатор и свой GIL, запросы внутри процесса
+обслуживают потоки. Процессы слушают один порт: с SO_REUSEPORT (Linux, BSD)
+у каждого свой сокет и соединения распределяет ядро, иначе - общий сокет мастера
+
+    python serve.py --workers 4 --port 8000
+    kill -HUP <pid мастера>     # плавная перезагрузка: новые процессы с новым кодом,
+                                # старые дорабатывают текущие запросы
+    kill -TERM <pid мастера>    # плавная остановка (Ctrl+C - то же)
+
+Приложение загружается в каждом процессе после fork (wsgi.py), поэтому HUP подхватывает
+новый код; --preload загружает его один раз в мастере (быстрее старт, меньше памяти),
+но тогда HUP только перезапускает процессы. Без fork (Windows) - один процесс
+"""
+import argparse
+import logging
+import os
+import select
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from dotenv import load_dotenv
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+# До импорта app: config читает переменные окружения при импорте
+load_dotenv()
+
+
+READY_TIMEOUT = 60  # секунд на запуск нового процесса при перезагрузке
+GRACEFUL_TIMEOUT = 30  # секунд процессу на текущие запросы при остановке
+RESPAWN_DELAY = 1.0  # процесс упал сразу после старта - пауза перед повтором
+CLIENT_TIMEOUT = 5  # секунд ожидания данных от клиента
+
+
+class RequestHandler(WSGIRequestHandler):
+    # Werkzeug закрывает соединение после каждого ответа, но клиент, открывший соединение
+    # и не приславший запрос, без таймаута держал бы поток и не давал процессу остановиться
+    timeout = CLIENT_TIMEOUT
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Production запуск MyTasks (pre-fork)')
+    parser.add_argument('--host', default=os.environ.get('FLASK_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('FLASK_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)),
+                        help='Процессов-обработчиков (по умолчанию WEB_WORKERS или число ядер)')
+    parser.add_argument('--backlog', type=int, default=2048, help='Очередь соединений сокета')
+    parser.add_argument('--preload', action='store_true', help='Загрузить приложение в мастере до fork')
+    parser.add_argument('--access-log', action='store_true', help='Строка в лог на каждый запрос')
+    return parser.parse_args()
+
+
+def load_app():
+    from wsgi import app
+    return app
+
+
+def listen(host, port, backlog, reuse_port):
+    """Слушающий сокет; reuse_port - несколько процессов на одном порту"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def serve(app, sock, on_ready=None):
+    """
+    Обслуживает запросы на сокете до SIGTERM (Werkzeug, поток на соединение)
+    Остановка: сокет закрывается, текущие запросы дорабатывают
+    """
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, request_handler=RequestHandler, fd=sock.fileno())
+    # fromfd в make_server дублирует дескриптор
+    sock.close()
+    # server_close() ждет потоки текущих запросов
+    server.daemon_threads = False
+    
+    def stop(signum, frame):
+        # shutdown() ждет выхода из serve_forever - вызывать не из того же потока
+        threading.Thread(target=server.shutdown, daemon=True).start()
+        # Потоки /events бесконечны: закрыть, иначе остановка ждала бы открытые вкладки
+        app.extensions['events'].close()
+    
+    signal.signal(signal.SIGTERM, stop)
+    if on_ready:
+        on_ready()
+    try:
+        # Цикл socketserver напрямую: serve_forever Werkzeug закрывает сокет сразу после
+        # shutdown(), а перед закрытием нужно принять уже пришедшие соединения
+        socketserver.BaseServer.serve_forever(server)
+        drain(server)
+    finally:
+        server.server_close()
+
+
+def drain(server):
+    """
+    Принимает соединения, уже стоящие в очереди сокета, перед его закрытием
+    С SO_REUSEPORT у каждого процесса своя очередь: без этого соединения, которые ядро
+    успело отдать останавливаемому процессу, при перезагрузке получили бы RST
+    """
+    server.timeout = 0
+    while select.select([server.socket], [], [], 0.05)[0]:
+        server.handle_request()
+
+
+class Master:
+    """Запускает процессы, перезапускает упавшие, плавно перезагружает по HUP"""
+    
+    def __init__(self, args):
+        self.args = args
+        self.reuse_port = hasattr(socket, 'SO_REUSEPORT')
+        # Без SO_REUSEPORT сокет открывает мастер, процессы наследуют его при fork
+        self.sock = None if self.reuse_port else listen(args.host, args.port, args.backlog, False)
+        self.app = load_app() if args.preload else None
+        self.workers = {}  # pid -> время запуска
+        self.retiring = {}  # pid -> срок на дообработку запросов
+        self.stopping = False
+        self.reload_requested = False
+    
+    def log(self, message):
+        print(f'[{os.getpid()}] {message}', flush=True)
+    
+    def spawn(self):
+        """fork процесса-обработчика; возвращает (pid, конец канала готовности)"""
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            self._child(ready_w)
+        os.close(ready_w)
+        self.workers[pid] = time.monotonic()
+        return pid, ready_r
+    
+    def _child(self, ready_w):
+        # Обработчики мастера не наследуются: SIGTERM до готовности просто завершает процесс,
+        # Ctrl+C приходит всей группе процессов - останавливает мастер
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        code = 0
+        try:
+            app = self.app or load_app()
+            sock = self.sock or listen(self.args.host, self.args.port, self.args.backlog, True)
+            serve(app, sock, on_ready=lambda: os.write(ready_w, b'1'))
+            # os._exit не вызывает atexit: пул проверки паролей останавливается явно
+            app.extensions['passwords'].shutdown()
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    
+    def wait_ready(self, pipes):
+        """Ждет сигнала готовности от процессов; False - какой-то упал или не успел"""
+        pending = dict(pipes)
+        ready = True
+        deadline = time.monotonic() + READY_TIMEOUT
+        while pending and not self.stopping:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                ready = False
+                break
+            try:
+                readable, _, _ = select.select(list(pending.values()), [], [], min(timeout, 0.5))
+            except InterruptedError:
+                continue
+            for pid, fd in list(pending.items()):
+                if fd in readable:
+                    # Пустое чтение - процесс завершился до готовности
+                    ready = ready and os.read(fd, 1) == b'1'
+                    os.close(fd)
+                    del pending[pid]
+        for fd in pending.values():
+            os.close(fd)
+        return ready and not pending
+    
+    def start_generation(self):
+        """N новых процессов; (pid, готовы ли все)"""
+        spawned = [self.spawn() for _ in range(self.args.workers)]
+        return [pid for pid, _ in spawned], self.wait_ready(spawned)
+    
+    def terminate(self, pids):
+        for pid in pids:
+            self.retiring[pid] = time.monotonic() + GRACEFUL_TIMEOUT
+            self._kill(pid, signal.SIGTERM)
+    
+    def _kill(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+    
+    def reap(self):
+        """Собирает завершившиеся процессы; неожиданно упавшие перезапускает"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                # Дочерних процессов не осталось
+                self.workers.clear()
+                self.retiring.clear()
+                return
+            if pid == 0:
+                break
+            started = self.workers.pop(pid, None)
+            if self.retiring.pop(pid, None) is not None:
+                continue
+            if started is None or self.stopping:
+                continue
+            
+            self.log(f'⚠️ Процесс {pid} завершился (код {os.waitstatus_to_exitcode(status)}), перезапуск')
+            if time.monotonic() - started < RESPAWN_DELAY:
+                time.sleep(RESPAWN_DELAY)
+            self.wait_ready([self.spawn()])
+        
+        # Не уложившиеся в GRACEFUL_TIMEOUT после SIGTERM
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now > deadline:
+                self._kill(pid, signal.SIGKILL)
+                self.retiring[pid] = float('inf')
+    
+    def reload(self):
+        """Новое поколение процессов, затем остановка старого (порт не закрывается ни на миг)"""
+        if self.args.preload:
+            self.log('🔄 Перезагрузка (--preload: код приложения не обновляется)')
+        else:
+            self.log('🔄 Перезагрузка')
+        old = [pid for pid in self.workers if pid not in self.retiring]
+        new, ready = self.start_generation()
+        if not ready:
+            self.log('❌ Новые процессы не запустились - остаются прежние')
+            self.terminate(new)
+            return
+        self.terminate(old)
+        self.log(f'✅ Перезагружено, процессы: {", ".join(map(str, new))}')
+    
+    def stop(self):
+        """Плавная остановка: SIGTERM всем, после GRACEFUL_TIMEOUT - SIGKILL"""
+        self.log('⏹️ Остановка (текущие запросы дорабатывают)...')
+        self.terminate([pid for pid in self.workers if pid not in self.retiring])
+        while self.workers:
+            self.reap()
+            time.sleep(0.1)
+    
+    def run(self):
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        
+        local_events = os.environ.get('EVENTS_BACKEND') == 'local'
+        if self.args.workers > 1 and local_events and os.environ.get('CACHE_BACKEND', 'local') == 'local':
+            # Сброс кэша виден только в своем процессе: отозванная ссылка открывалась бы
+            # в остальных до SHARED_CACHE_TTL
+            self.log('❌ CACHE_BACKEND=local и EVENTS_BACKEND=local: процессы не узнают о сбросе '
+                     'кэшей друг друга. Нужен EVENTS_BACKEND=socket (по умолчанию), '
+                     'CACHE_BACKEND=redis или --workers 1')
+            return 2
+        
+        mode = 'SO_REUSEPORT' if self.reuse_port else 'общий сокет'
+        self.log(f'🚀 MyTasks на http://{self.args.host}:{self.args.port}, '
+                 f'процессов: {self.args.workers} ({mode})')
+        if self.args.workers > 1 and local_events:
+            self.log('⚠️ EVENTS_BACKEND=local: вкладка получает события только от своего процесса. '
+                     'Между процессами: EVENTS_BACKEND=socket')
+        _, ready = self.start_generation()
+        if not ready:
+            self.log('❌ Процессы не запустились')
+            self.stopping = True
+            self.stop()
+            return 1
+        
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            self.reap()
+            time.sleep(0.2)
+        self.stop()
+        return 0
+    
+    def _on_reload(self, signum, frame):
+        self.reload_requested = True
+    
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+
+def main():
+    args = parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.INFO if args.access_log else logging.WARNING)
+    
+    if not hasattr(os, 'fork'):
+        print(f'⚠️ fork недоступен - один процесс на http://{args.host}:{args.port}')
+        serve(load_app(), listen(args.host, args.port, args.backlog, False))
+        return 0
+    return Master(args).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
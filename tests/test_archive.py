@@ -0,0 +1,160 @@
+"""
+Архив задач (app/tasks/archive.py): id архивных задач не выдаются новым задачам,
+а задача, вернувшаяся из архива, снова находится поиском
+
+Запуск: python -m pytest tests
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.extensions import db
+from app.models import Task, TaskArchive, User
+from app.tasks.archive import archive_completed
+
+PASSWORD = 'secret1'
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config['WTF_CSRF_ENABLED'] = False
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """Вошедший пользователь с тремя задачами; самая новая завершена давно"""
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'username': 'archive', 'email': 'archive@example.com',
+        'password': PASSWORD, 'confirm_password': PASSWORD,
+    })
+    client.post('/auth/login', data={'email': 'archive@example.com', 'password': PASSWORD})
+    for title in ('Горячая один', 'Горячая два', 'Старая заметка'):
+        assert client.post('/tasks/create', data={'title': title, 'priority': 'low'}).status_code == 302
+
+    with app.app_context():
+        newest = Task.query.order_by(Task.id.desc()).first()
+        newest.completed = True
+        newest.completed_at = datetime.now() - timedelta(days=400)
+        db.session.commit()
+        client.newest = newest.id
+    return client
+
+
+def _search(client, query):
+    return [task['id'] for task in client.get(f'/tasks/api/search?q={query}').json['tasks']]
+
+
+def test_newest_task_stays_archived(app, client):
+    with app.app_context():
+        assert archive_completed(180)['archived'] == 1
+        assert db.session.get(TaskArchive, client.newest) is not None
+        assert db.session.get(Task, client.newest) is None
+        # Повторный перенос ничего не находит: задача не вернулась в tasks
+        assert archive_completed(180)['archived'] == 0
+
+    assert _search(client, 'заметка') == []
+    assert len(_search(client, 'Горячая')) == 2
+
+
+def test_archived_ids_are_not_reused(app, client):
+    with app.app_context():
+        archive_completed(180)
+        # Удалены и все горячие задачи: max(id) в tasks пуст
+        user = User.query.filter_by(email='archive@example.com').one()
+        hot = [task.id for task in Task.query.filter_by(user_id=user.id)]
+    for task_id in hot:
+        assert client.post(f'/tasks/{task_id}/delete').status_code == 302
+
+    assert client.post('/tasks/create', data={'title': 'После архива', 'priority': 'low'}).status_code == 302
+    with app.app_context():
+        created = Task.query.filter_by(title='После архива').one()
+        assert created.id > client.newest
+        assert db.session.get(TaskArchive, client.newest).title == 'Старая заметка'
+    assert _search(client, 'архива') == [created.id]
+
+
+def test_restored_task_is_searchable(app, client):
+    with app.app_context():
+        archive_completed(180)
+
+    assert client.post(f'/tasks/{client.newest}/toggle').status_code == 200
+    with app.app_context():
+        assert db.session.get(TaskArchive, client.newest) is None
+    assert _search(client, 'заметка') == [client.newest]
+
+
+def test_task_reopened_during_batch_is_not_archived(app, client, monkeypatch):
+    """Задачу открыли заново между выборкой пачки и переносом - она остается активной"""
+    from app.tasks import archive
+
+    copy = archive._copy
+
+    def reopen_then_copy(source, target, condition):
+        db.session.query(Task).filter(Task.id == client.newest).update(
+            {Task.completed: False, Task.completed_at: None}, synchronize_session=False
+        )
+        return copy(source, target, condition)
+
+    with app.app_context():
+        monkeypatch.setattr(archive, '_copy', reopen_then_copy)
+        assert archive.archive_completed(180)['archived'] == 0
+        assert db.session.get(TaskArchive, client.newest) is None
+        assert db.session.get(Task, client.newest).completed is False
+
+
+@pytest.mark.parametrize('data, csrf', [
+    ({'title': 'no', 'priority': 'low'}, False),  # короче 3 символов
+    ({'title': 'Правильное название', 'priority': 'low'}, True),  # без CSRF токена
+])
+def test_rejected_edit_keeps_task_archived(app, client, data, csrf):
+    with app.app_context():
+        archive_completed(180)
+    app.config['WTF_CSRF_ENABLED'] = csrf
+
+    assert client.post(f'/tasks/{client.newest}/edit', data=data).status_code == 200
+    with app.app_context():
+        assert db.session.get(TaskArchive, client.newest).title == 'Старая заметка'
+        assert db.session.get(Task, client.newest) is None
+
+
+def test_edit_form_keeps_task_archived(app, client):
+    with app.app_context():
+        archive_completed(180)
+
+    response = client.get(f'/tasks/{client.newest}/edit')
+    assert response.status_code == 200
+    assert 'Старая заметка' in response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.get(Task, client.newest) is None
+
+
+def test_edit_restores_archived_task(app, client):
+    with app.app_context():
+        archive_completed(180)
+
+    response = client.post(f'/tasks/{client.newest}/edit', data={'title': 'Новая заметка', 'priority': 'high'})
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(TaskArchive, client.newest) is None
+        assert db.session.get(Task, client.newest).title == 'Новая заметка'
+    assert _search(client, 'Новая') == [client.newest]
+
+
+def test_optimize_search_command(app, client):
+    with app.app_context():
+        archive_completed(180)
+    result = app.test_cli_runner().invoke(args=['tasks', 'optimize-search'])
+    assert result.exit_code == 0, result.output
+    assert 'оптимизирован' in result.output
+    assert len(_search(client, 'Горячая')) == 2
@@ -0,0 +1,78 @@
+"""
+Пакетные операции (POST /tasks/api/batch, app/tasks/batch.py): неверная
+операция - ошибка этой операции, остальные операции пакета применяются
+
+Запуск: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.extensions import db
+from app.models import Task
+
+PASSWORD = 'secret1'
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config['WTF_CSRF_ENABLED'] = False
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """Вошедший пользователь с одной задачей"""
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'username': 'batch', 'email': 'batch@example.com',
+        'password': PASSWORD, 'confirm_password': PASSWORD,
+    })
+    client.post('/auth/login', data={'email': 'batch@example.com', 'password': PASSWORD})
+    client.post('/tasks/create', data={'title': 'Первая задача', 'priority': 'low'})
+    with app.app_context():
+        client.task_id = Task.query.one().id
+    return client
+
+
+@pytest.mark.parametrize('item, error', [
+    ({'op': 'create', 'title': 123}, {'title': ['Ожидается строка']}),
+    ({'op': 'create', 'title': ['Список']}, {'title': ['Ожидается строка']}),
+    ({'op': 'create', 'title': 'Нормальное', 'description': {'a': 1}}, {'description': ['Ожидается строка']}),
+    ({'op': 'create', 'title': 'Нормальное', 'priority': 3}, {'priority': ['Ожидается строка']}),
+    ({'op': 'complete', 'id': 2 ** 70}, 'id вне допустимого диапазона'),
+    ({'op': 'complete', 'id': -1}, 'id вне допустимого диапазона'),
+    ({'op': 'delete', 'id': True}, 'Нужен числовой id'),
+    ({'op': 'delete', 'id': 1.5}, 'Нужен числовой id'),
+    ({'op': 'priority', 'id': 1, 'priority': ['high']}, 'Неверный приоритет'),
+    ({'op': 'rename', 'id': 1}, 'Неизвестная операция'),
+    ('complete', 'Неизвестная операция'),
+])
+def test_malformed_item_is_item_error(app, client, item, error):
+    response = client.post('/tasks/api/batch', json={'operations': [
+        item,
+        {'op': 'complete', 'id': client.task_id},
+    ]})
+    assert response.status_code == 200, response.get_data(as_text=True)[:500]
+    bad, good = response.json['results']
+    assert bad['ok'] is False
+    assert bad.get('errors', bad.get('error')) == error
+    assert good == {'index': 1, 'ok': True, 'id': client.task_id}
+    assert response.json['applied'] == 1
+    with app.app_context():
+        assert db.session.get(Task, client.task_id).completed is True
+
+
+@pytest.mark.parametrize('payload', [[1, 2], 'operations', {'operations': {'op': 'create'}}])
+def test_malformed_batch_is_400(client, payload):
+    response = client.post('/tasks/api/batch', json=payload)
+    assert response.status_code == 400
+    assert response.json['error']
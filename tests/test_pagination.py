@@ -0,0 +1,106 @@
+"""
+Пагинация по курсору (app/tasks/pagination.py): страницы идут подряд без
+пропусков и повторов, поврежденный курсор не доходит до SQL
+
+Запуск: python -m pytest tests
+"""
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.extensions import db
+from app.models import Task
+
+PASSWORD = 'secret1'
+TASKS = 12
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config['WTF_CSRF_ENABLED'] = False
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """Вошедший пользователь: задачи всех приоритетов, часть завершена"""
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'username': 'pages', 'email': 'pages@example.com',
+        'password': PASSWORD, 'confirm_password': PASSWORD,
+    })
+    client.post('/auth/login', data={'email': 'pages@example.com', 'password': PASSWORD})
+    for i in range(TASKS):
+        # Слово "отчет" в названии у четных задач, в описании - у нечетных (разный ранг поиска)
+        title, description = (f'Отчет {i}', '') if i % 2 == 0 else (f'Задача {i}', 'отчет')
+        client.post('/tasks/create', data={
+            'title': title, 'description': description, 'priority': ('low', 'medium', 'high')[i % 3],
+        })
+    with app.app_context():
+        ids = [task.id for task in Task.query.order_by(Task.id)]
+    for task_id in ids[::3]:
+        client.post(f'/tasks/{task_id}/toggle')
+    return client
+
+
+def _cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _walk(client, url):
+    """Все страницы по next_cursor (limit=2 - границы диапазонов внутри страниц)"""
+    ids, cursor = [], None
+    while True:
+        page = client.get(url + (f'&cursor={cursor}' if cursor else '')).json
+        ids += [task['id'] for task in page['tasks']]
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+
+
+def test_pages_follow_list_order(app, client):
+    with app.app_context():
+        expected = [task.id for task in Task.query.order_by(
+            Task.completed, Task.priority_rank.desc(), Task.created_at.desc(), Task.id.desc()
+        )]
+    assert _walk(client, '/tasks/api/list?limit=2') == expected
+
+
+def test_search_pages_cross_rank(client):
+    ids = _walk(client, '/tasks/api/search?q=отчет&limit=2')
+    assert len(ids) == len(set(ids)) == TASKS
+    first = client.get('/tasks/api/search?q=отчет&limit=50').json['tasks']
+    assert ids == [task['id'] for task in first]
+    assert all(task['title'].startswith('Отчет') for task in first[:TASKS // 2])
+
+
+@pytest.mark.parametrize('values', [
+    [1, 2, 3, 'a'],
+    [False, 1, '2024-01-01T00:00:00', 'a'],
+    [False, 1, {'dt': '2024-01-01T00:00:00'}, 'a'],
+    [False, True, {'dt': '2024-01-01T00:00:00'}, 1],
+    [False, 1, {'dt': 'вчера'}, 1],
+    [False, 1, {'dt': '2024-01-01T00:00:00'}, 2 ** 70],
+    [False, 1, None, 1, 5],
+    'не список',
+])
+def test_tampered_cursor(client, values):
+    cursor = _cursor(values)
+    response = client.get(f'/tasks/api/list?cursor={cursor}')
+    assert response.status_code == 400
+    assert response.json['error']
+
+    response = client.get(f'/tasks/?cursor={cursor}&filter=all')
+    assert response.status_code == 302
+    assert 'cursor' not in response.headers['Location']
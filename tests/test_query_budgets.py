@@ -0,0 +1,229 @@
+"""
+Бюджеты SQL-запросов маршрутов (@query_budget, app/query_budget.py)
+testing-конфигурация проверяет бюджеты (QUERY_BUDGET_ENFORCE): маршрут, выполнивший
+больше запросов, чем разрешено, поднимает QueryBudgetExceeded и роняет тест.
+Пользователь с задачами (часть завершена, часть по общим ссылкам, часть в архиве)
+проходит все маршруты с бюджетом - N+1 на любом из них виден сразу
+
+Запуск: python -m pytest tests
+"""
+import io
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.extensions import db
+from app.jobs.queue import enqueue
+from app.models import SharedTask, Task, TaskArchive, User
+from app.tasks.archive import archive_completed
+
+
+# Задач с общими ссылками больше страницы списка (10): лишний запрос на строку
+# в списке (N+1 по shared_task) выходит за бюджет и на первой, и на второй странице
+TASKS = 25
+COMPLETED = 8
+SHARED = 12
+ARCHIVED = 3
+PASSWORD = 'secret1'
+
+# Импорт затрагивает все сводки: итоги, несколько дней, время выполнения
+IMPORT_CSV = (
+    'title,priority,completed,created_at,completed_at\n'
+    'Импорт один,high,,,\n'
+    'Импорт два,low,true,2024-01-02T10:00:00,2024-01-05T12:00:00\n'
+    'Импорт три,medium,true,2024-02-10T09:00:00,2024-02-10T09:30:00\n'
+)
+
+# (endpoint, метод, URL, аргументы запроса, ожидаемый статус); в URL подставляются
+# id задач ({task}, {archived}, ...), токен ссылки, курсор второй страницы списка
+# и id фоновой задачи
+CASES = [
+    ('auth.login', 'GET', '/auth/login', {}, 302),
+    ('auth.register', 'GET', '/auth/register', {}, 302),
+    ('tasks.task_list', 'GET', '/tasks/', {}, 200),
+    ('tasks.task_list', 'GET', '/tasks/?cursor={list_cursor}', {}, 200),
+    ('tasks.task_list', 'GET', '/tasks/?filter=completed', {}, 200),
+    ('tasks.task_list', 'GET', '/tasks/?filter=archived', {}, 200),
+    ('tasks.api_list', 'GET', '/tasks/api/list?limit=50', {}, 200),
+    ('tasks.search', 'GET', '/tasks/search?q=Задача', {}, 200),
+    ('tasks.api_search', 'GET', '/tasks/api/search?q=Задача&limit=50', {}, 200),
+    ('tasks.export_tasks', 'GET', '/tasks/export?format=csv', {}, 200),
+    ('tasks.export_tasks', 'GET', '/tasks/export?format=jsonl', {'headers': {'Accept-Encoding': 'gzip'}}, 200),
+    ('tasks.import_tasks_view', 'GET', '/tasks/import', {}, 200),
+    ('tasks.import_tasks_view', 'POST', '/tasks/import', {
+        'data': lambda: {'file': (io.BytesIO(IMPORT_CSV.encode()), 'tasks.csv')},
+        'content_type': 'multipart/form-data',
+    }, 200),
+    # Все виды операций: число запросов пакета не зависит от числа задач и дней
+    ('tasks.api_batch', 'POST', '/tasks/api/batch', {'json': {'operations': [
+        {'op': 'create', 'title': 'Из пакета'},
+        {'op': 'complete', 'id': '{task}'},
+        {'op': 'uncomplete', 'id': '{completed_other}'},
+        {'op': 'priority', 'id': '{shared}', 'priority': 'low'},
+        {'op': 'priority', 'id': '{other}', 'priority': 'high'},
+        {'op': 'delete', 'id': '{completed}'},
+    ]}}, 200),
+    ('tasks.create_task', 'GET', '/tasks/create', {}, 200),
+    ('tasks.create_task', 'POST', '/tasks/create', {'data': {'title': 'Еще одна', 'priority': 'low'}}, 302),
+    ('tasks.view_task', 'GET', '/tasks/{shared}', {}, 200),
+    ('tasks.view_task', 'GET', '/tasks/{archived}', {}, 200),
+    ('tasks.edit_task', 'POST', '/tasks/{shared}/edit', {'data': {'title': 'Изменена', 'priority': 'high'}}, 302),
+    ('tasks.edit_task', 'POST', '/tasks/{archived}/edit', {'data': {'title': 'Из архива', 'priority': 'high'}}, 302),
+    ('tasks.delete_task', 'POST', '/tasks/{shared}/delete', {}, 302),
+    ('tasks.delete_task', 'POST', '/tasks/{archived}/delete', {}, 302),
+    ('tasks.toggle_task', 'POST', '/tasks/{shared}/toggle', {}, 200),
+    ('tasks.toggle_task', 'POST', '/tasks/{archived}/toggle', {}, 200),
+    ('tasks.share_task', 'GET', '/tasks/{shared}/share', {}, 200),
+    ('tasks.share_task', 'POST', '/tasks/{task}/share', {}, 302),
+    ('tasks.share_task', 'POST', '/tasks/{archived}/share', {}, 302),
+    ('tasks.unshare_task', 'POST', '/tasks/{shared}/unshare', {}, 302),
+    ('shared.view_shared_task', 'GET', '/shared/task/{token}', {}, 200),
+    ('shared.view_shared_task', 'GET', '/shared/task/{archived_token}', {}, 200),
+    ('statistics.dashboard', 'GET', '/statistics/dashboard', {}, 200),
+    ('statistics.api_daily_stats', 'GET', '/statistics/api/daily-stats', {}, 200),
+    ('statistics.api_weekly_stats', 'GET', '/statistics/api/weekly-stats', {}, 200),
+    ('statistics.api_range', 'GET', '/statistics/api/range', {}, 200),
+    ('statistics.statistics', 'GET', '/statistics/', {}, 200),
+    ('jobs.job_status', 'GET', '/jobs/{job}', {}, 200),
+]
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config['WTF_CSRF_ENABLED'] = False
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """
+    Вошедший пользователь: TASKS задач через маршруты, COMPLETED завершены
+    (ARCHIVED из них - давно и перенесены в архив), SHARED - с общими ссылками
+    """
+    client = app.test_client()
+    assert client.post('/auth/register', data={
+        'username': 'budget', 'email': 'budget@example.com',
+        'password': PASSWORD, 'confirm_password': PASSWORD,
+    }).status_code == 302
+    assert client.post('/auth/login', data={'email': 'budget@example.com', 'password': PASSWORD}).status_code == 302
+
+    for i in range(TASKS):
+        response = client.post('/tasks/create', data={
+            'title': f'Задача {i}', 'description': 'Описание', 'priority': ('low', 'medium', 'high')[i % 3],
+        })
+        assert response.status_code == 302
+
+    with app.app_context():
+        user = User.query.filter_by(email='budget@example.com').one()
+        ids = [task.id for task in Task.query.filter_by(user_id=user.id).order_by(Task.id)]
+
+    for task_id in ids[:COMPLETED]:
+        assert client.post(f'/tasks/{task_id}/toggle').status_code == 200
+    for task_id in ids[:ARCHIVED] + ids[-SHARED:]:
+        assert client.post(f'/tasks/{task_id}/share').status_code == 302
+
+    with app.app_context():
+        # Первые ARCHIVED задач завершены давно
+        long_ago = datetime.now() - timedelta(days=400)
+        for task in Task.query.filter(Task.id.in_(ids[:ARCHIVED])):
+            task.completed_at = long_ago
+        db.session.commit()
+        assert archive_completed(180)['archived'] == ARCHIVED
+
+        job = enqueue('tasks.import', {'path': os.devnull, 'fmt': 'csv'}, user_id=user.id)
+        tokens = {link.task_id: link.token for link in SharedTask.query}
+        client.ids = {
+            'task': ids[-SHARED - 1],
+            'other': ids[-SHARED - 2],
+            'completed': ids[COMPLETED - 1],
+            'completed_other': ids[COMPLETED - 2],
+            'shared': ids[-1],
+            'archived': ids[0],
+            'token': tokens[ids[-1]],
+            'archived_token': tokens[ids[1]],
+            'job': job.id,
+            'list_cursor': client.get('/tasks/api/list?limit=10').json['next_cursor'],
+        }
+        assert db.session.get(TaskArchive, ids[0]) is not None
+    return client
+
+
+def _fill(value, ids):
+    """Подставляет id задач и токены в URL и тело запроса"""
+    if isinstance(value, str):
+        if value.startswith('{') and value.endswith('}') and value[1:-1] in ids:
+            return ids[value[1:-1]]
+        return value.format(**ids)
+    if isinstance(value, dict):
+        return {key: _fill(item, ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, ids) for item in value]
+    return value
+
+
+@pytest.mark.parametrize(
+    'endpoint, method, url, kwargs, status', CASES,
+    ids=[f'{method} {url}' for _, method, url, _, _ in CASES]
+)
+def test_route_within_budget(client, endpoint, method, url, kwargs, status):
+    url = _fill(url, client.ids)
+    assert client.application.url_map.bind('localhost').match(url.split('?')[0], method=method)[0] == endpoint
+    kwargs = {key: value() if callable(value) else _fill(value, client.ids) for key, value in kwargs.items()}
+
+    # Потоковый ответ проверяет бюджет, когда тело прочитано до конца (get_data)
+    response = client.open(url, method=method, **kwargs)
+    response.get_data()
+    assert response.status_code == status, response.get_data(as_text=True)[:500]
+
+
+def test_login_and_register_within_budget(app):
+    """Вход и регистрация без сессии (в CASES пользователь уже вошел)"""
+    client = app.test_client()
+    assert client.get('/auth/register').status_code == 200
+    assert client.get('/auth/login').status_code == 200
+    data = {'username': 'newcomer', 'email': 'newcomer@example.com', 'password': PASSWORD, 'confirm_password': PASSWORD}
+    assert client.post('/auth/register', data=data).status_code == 302
+    assert client.post('/auth/register', data=data).status_code == 200  # занято - ошибка формы
+    assert client.post('/auth/login', data={'email': 'newcomer@example.com', 'password': 'wrong'}).status_code == 200
+    assert client.post('/auth/login', data={'email': 'newcomer@example.com', 'password': PASSWORD}).status_code == 302
+
+
+def test_login_with_rehash_within_budget(app):
+    """Хеш со старыми параметрами пересчитывается при входе (самый дорогой вход)"""
+    client = app.test_client()
+    data = {'username': 'rehash', 'email': 'rehash@example.com', 'password': PASSWORD, 'confirm_password': PASSWORD}
+    assert client.post('/auth/register', data=data).status_code == 302
+    with app.app_context():
+        user = User.query.filter_by(email='rehash@example.com').one()
+        user.password_hash = generate_password_hash(PASSWORD, 'pbkdf2:sha256:500')
+        db.session.commit()
+    assert client.post('/auth/login', data={'email': 'rehash@example.com', 'password': PASSWORD}).status_code == 302
+    with app.app_context():
+        assert not User.query.filter_by(email='rehash@example.com').one().password_needs_rehash()
+
+
+def test_large_import_goes_to_queue_within_budget(app, client):
+    app.config['IMPORT_SYNC_MAX_BYTES'] = 0
+    response = client.post(
+        '/tasks/import',
+        data={'file': (io.BytesIO('title\nВ очередь\n'.encode()), 'tasks.csv')},
+        content_type='multipart/form-data',
+        headers={'Accept': 'application/json'},
+    )
+    assert response.status_code == 202
+
+
+def test_every_budgeted_route_is_covered(app):
+    """Новый маршрут с @query_budget должен попасть в CASES"""
+    budgeted = {endpoint for endpoint, view in app.view_functions.items() if hasattr(view, 'query_budget')}
+    assert budgeted == {endpoint for endpoint, *_ in CASES}
@@ -0,0 +1,18 @@
+"""
+WSGI точка входа для production-серверов
+
+    python serve.py --workers 4              # встроенный pre-fork запуск
+    gunicorn -w 4 -b 0.0.0.0:8000 wsgi:app   # или любой WSGI сервер
+
+Без FLASK_ENV - конфигурация production (без отладчика, без автомиграций)
+"""
+import os
+from dotenv import load_dotenv
+
+# До импорта app: config читает переменные окружения при импорте
+load_dotenv()
+
+from app import create_app
+
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))